@@ -1,8 +1,18 @@
 from mcp.server.fastmcp import FastMCP
 import requests
+from requests.adapters import HTTPAdapter
+import functools
 import os
 import re
+import sys
+import threading
+import time
 import ipaddress
+from pathlib import Path
+
+# Shared modules live in the AI_Voice project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from module.profiling import profiled
 
 
 # Initialize FastMCP server
@@ -12,6 +22,369 @@ mcp = FastMCP("dns-manager")
 # Configuration
 DNS_URL = os.getenv("DNS_SERVER_URL", "http://localhost:5380")
 API_TOKEN = os.getenv("DNS_API_TOKEN", "6ee8a572a97dc8dd2827d3f9fa55e17eb651969ed1149aba47666bc449670077")
+REQUEST_TIMEOUT = 10
+# Keep-alive connections kept open to the DNS server
+POOL_SIZE = int(os.getenv("DNS_POOL_SIZE", "8"))
+# Seconds a cached zone list (or zone entry) is trusted before asking the server again
+ZONE_CACHE_TTL = float(os.getenv("DNS_ZONE_CACHE_TTL", "60"))
+# Seconds between background rebuilds of the reverse IP index
+INDEX_RECONCILE = float(os.getenv("DNS_INDEX_RECONCILE", "300"))
+
+
+class DnsApiError(Exception):
+    """A failed Technitium API call, carrying the tools' error fields"""
+
+    def __init__(self, error: str, details):
+        super().__init__(f"{error}: {details}")
+        self.error = error
+        self.details = details
+
+    def result(self, error: str = None) -> dict:
+        """The tool response for this failure, optionally under a more specific error label"""
+        return {
+            "success": False,
+            "error": error or self.error,
+            "details": self.details
+        }
+
+
+class TechnitiumClient:
+    """
+    Technitium HTTP API over one pooled keep-alive requests.Session
+    
+    The token and endpoint URLs are built once. Every call returns the "response"
+    object of an "ok" reply and raises DnsApiError for everything else (timeout,
+    connection failure, HTTP status, non-JSON body, API-level error).
+    """
+    
+    def __init__(self, base_url: str, token: str, timeout: int = REQUEST_TIMEOUT, pool_size: int = POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._auth = {"token": token}
+        self._urls = {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
+    def url(self, path: str) -> str:
+        url = self._urls.get(path)
+        if url is None:
+            url = self._urls[path] = f"{self.base_url}{path}"
+        return url
+    
+    def get(self, path: str, **params) -> dict:
+        return self._request("GET", path, params)
+    
+    def post(self, path: str, **data) -> dict:
+        return self._request("POST", path, data)
+    
+    def _request(self, method: str, path: str, fields: dict) -> dict:
+        # None means "not sent", so callers can pass optional fields directly
+        fields = {**self._auth, **{k: v for k, v in fields.items() if v is not None}}
+        try:
+            if method == "GET":
+                response = self.session.get(self.url(path), params=fields, timeout=self.timeout)
+            else:
+                response = self.session.post(self.url(path), data=fields, timeout=self.timeout)
+            response.raise_for_status()
+            result = response.json()
+        except requests.exceptions.Timeout:
+            raise DnsApiError("Request timeout", f"DNS server did not respond within {self.timeout} seconds")
+        except requests.exceptions.ConnectionError:
+            raise DnsApiError("Connection failed", f"Cannot connect to DNS server at {self.base_url}")
+        except requests.exceptions.HTTPError as e:
+            raise DnsApiError("HTTP error", f"Server returned {e.response.status_code}")
+        except ValueError:
+            raise DnsApiError("Invalid response", "DNS server did not return JSON")
+        
+        if result.get("status") != "ok":
+            raise DnsApiError("DNS server error", result.get("errorMessage") or result.get("error") or "Unknown error")
+        return result.get("response", {})
+
+
+api = TechnitiumClient(DNS_URL, API_TOKEN)
+
+
+def api_errors(function):
+    """Return DnsApiError and unexpected exceptions as the tool's error response"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except DnsApiError as e:
+            return e.result()
+        except Exception as e:
+            return {
+                "success": False,
+                "error": "Unexpected error",
+                "details": str(e)
+            }
+    return wrapper
+
+
+class ZoneCache:
+    """
+    Zone directory (name -> zone info from /api/zones/list), valid for `ttl` seconds
+    
+    The full list is only downloaded when every zone is needed (all()) and the
+    copy is older than the TTL. Existence checks (get()) are a dict lookup; on a
+    miss or an expired entry they ask the server about that one zone instead.
+    create/delete_dns_zone update the cache in place through put() and discard().
+    """
+    
+    def __init__(self, client: TechnitiumClient, ttl: float = ZONE_CACHE_TTL):
+        self.client = client
+        self.ttl = ttl
+        self._zones = {}  # name -> (zone info, cached at)
+        self._listed_at = None
+        self._lock = threading.Lock()
+    
+    def _fresh(self, since: float) -> bool:
+        return time.monotonic() - since < self.ttl
+    
+    def refresh(self) -> list:
+        """Download the full zone list and replace the cache with it"""
+        zones = self.client.get("/api/zones/list").get("zones", [])
+        now = time.monotonic()
+        with self._lock:
+            self._zones = {z.get("name"): (z, now) for z in zones if z.get("name")}
+            self._listed_at = now
+        return zones
+    
+    def all(self) -> list:
+        """Every zone, from the cache while the last full list is within the TTL"""
+        with self._lock:
+            if self._listed_at is not None and self._fresh(self._listed_at):
+                return [z for z, _ in self._zones.values()]
+        return self.refresh()
+    
+    def closest(self, name: str):
+        """The most specific known zone containing `name` (the one Technitium picks), or None"""
+        with self._lock:
+            listed = self._listed_at is not None and self._fresh(self._listed_at)
+        if not listed:
+            self.refresh()
+        labels = name.split(".")
+        with self._lock:
+            for i in range(len(labels)):
+                candidate = ".".join(labels[i:])
+                if candidate in self._zones:
+                    return candidate
+        return None
+    
+    def get(self, name: str):
+        """Zone info for `name`, or None if the server has no such zone"""
+        with self._lock:
+            entry = self._zones.get(name)
+        if entry is not None and self._fresh(entry[1]):
+            return entry[0]
+        
+        # Miss or expired: ask for this zone only
+        try:
+            zone_info = self.client.get(
+                "/api/zones/records/get", domain=name, zone=name, listZone="false"
+            ).get("zone", {})
+        except DnsApiError as e:
+            if e.error != "DNS server error" or "no such zone" not in str(e.details).lower():
+                raise  # Auth, permission and other server errors are not "zone does not exist"
+            zone_info = {}
+        
+        if zone_info.get("name") != name:
+            self.discard(name)
+            return None
+        self.put(zone_info)
+        return zone_info
+    
+    def put(self, zone_info: dict) -> None:
+        with self._lock:
+            self._zones[zone_info["name"]] = (zone_info, time.monotonic())
+    
+    def discard(self, name: str) -> None:
+        with self._lock:
+            self._zones.pop(name, None)
+
+
+zone_cache = ZoneCache(api)
+
+
+def record_zone(name: str, response: dict = None, zone: str = None):
+    """Zone a record lives in: from the API response, the caller, or the closest known zone"""
+    resolved = (response or {}).get("zone", {}).get("name") or zone
+    if resolved:
+        return resolved
+    try:
+        return zone_cache.closest(name)
+    except DnsApiError:
+        return None  # Left for the next reconcile
+
+
+class ReverseIndex:
+    """
+    IP address -> {(name, zone, type): {"ttl", "disabled"}} for the A/AAAA records of every zone
+    
+    Built on the first lookup (one zone list plus one dump per zone), then kept
+    current by the record tools, so find_domain_by_ip answers with a dict lookup.
+    Changes made behind our back (other clients, the web console) are picked up by
+    a background rebuild once the index is older than `reconcile_every` seconds.
+    Zones that cannot be read during a build are listed in `failed_zones` and keep
+    their previous entries.
+    
+    A zone of None in a change means "whichever zone the record is in".
+    """
+    
+    def __init__(self, client: TechnitiumClient, zones: ZoneCache, reconcile_every: float = INDEX_RECONCILE):
+        self.client = client
+        self.zones = zones
+        self.reconcile_every = reconcile_every
+        self.failed_zones = []
+        self._by_ip = {}
+        self._built_at = None
+        self._reconciling = False
+        self._pending = None  # Changes made while a build runs, replayed onto its result
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+    
+    def build(self) -> None:
+        """Download every zone and replace the index"""
+        with self._build_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                by_ip, failed = {}, []
+                for zone_info in self.zones.all():
+                    zone_name = zone_info.get("name")
+                    if not zone_name:
+                        continue
+                    try:
+                        records = self.client.get("/api/zones/records/get", domain=zone_name, listZone="true").get("records", [])
+                    except DnsApiError as e:
+                        failed.append({"zone": zone_name, "error": e.error, "details": e.details})
+                        continue
+                    for record in records:
+                        if record.get("type") in ["A", "AAAA"]:
+                            self._add(by_ip, record.get("rData", {}).get("ipAddress"), record.get("name"), zone_name,
+                                      record.get("type"), record.get("ttl"), record.get("disabled", False))
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            
+            with self._lock:
+                # Keep what we knew about the zones that could not be read this time
+                failed_names = {f["zone"] for f in failed}
+                for ip, entries in self._by_ip.items():
+                    for (name, zone, record_type), details in entries.items():
+                        if zone in failed_names:
+                            by_ip.setdefault(ip, {})[(name, zone, record_type)] = details
+                for change, args in self._pending:
+                    change(by_ip, *args)
+                self._by_ip, self._pending = by_ip, None
+                self.failed_zones = failed
+                self._built_at = time.monotonic()
+    
+    def _reconcile(self) -> None:
+        try:
+            self.build()
+        except Exception as e:
+            # Keep serving the current index and try again after another interval
+            with self._lock:
+                self._built_at = time.monotonic()
+            print(f"⚠️ Reverse IP index reconcile failed: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._reconciling = False
+    
+    def lookup(self, ip: str, zone: str = None) -> list:
+        """Records pointing to `ip`, optionally only those in `zone`"""
+        if self._built_at is None:
+            self.build()
+        
+        with self._lock:
+            # At most one reconcile in flight
+            reconcile = not self._reconciling and time.monotonic() - self._built_at > self.reconcile_every
+            if reconcile:
+                self._reconciling = True
+            entries = list(self._by_ip.get(ip, {}).items())
+        if reconcile:
+            threading.Thread(target=self._reconcile, daemon=True).start()
+        
+        return [
+            {"name": name, "zone": record_zone, "type": record_type, "ttl": details["ttl"], "ip": ip, "disabled": details["disabled"]}
+            for (name, record_zone, record_type), details in sorted(entries, key=lambda entry: entry[0])
+            if zone is None or record_zone == zone
+        ]
+    
+    def _change(self, change, *args) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((change, args))
+            change(self._by_ip, *args)
+    
+    def add(self, ip: str, name: str, zone: str, record_type: str = "A", ttl: int = None, disabled: bool = False) -> None:
+        self._change(self._add, ip, name, zone, record_type, ttl, disabled)
+    
+    def remove(self, ip: str, name: str, zone: str = None, record_type: str = "A") -> None:
+        self._change(self._remove, ip, name, zone, record_type)
+    
+    def move(self, old_ip: str, new_ip: str, name: str, zone: str = None, record_type: str = "A", ttl: int = None,
+             disabled: bool = False, new_zone: str = None) -> None:
+        """
+        The record's address changed (update_dns_record)
+        
+        Args:
+            zone: Zone reported by the server or given by the caller (None: any zone)
+            new_zone: Zone to index the record under if it was not indexed at old_ip
+        """
+        self._change(self._move, old_ip, new_ip, name, zone, record_type, ttl, disabled, new_zone or zone)
+    
+    def rename(self, ip: str, old_name: str, new_name: str, zone: str = None, record_type: str = "A") -> None:
+        self._change(self._rename, ip, old_name, new_name, zone, record_type)
+    
+    def drop_zone(self, zone: str) -> None:
+        self._change(self._drop_zone, zone)
+    
+    @staticmethod
+    def _add(by_ip: dict, ip: str, name: str, zone: str, record_type: str, ttl, disabled: bool) -> None:
+        if ip and name and zone:  # A record whose zone is unknown waits for the next build
+            by_ip.setdefault(ip, {})[(name, zone, record_type)] = {"ttl": ttl, "disabled": disabled}
+    
+    @staticmethod
+    def _remove(by_ip: dict, ip: str, name: str, zone, record_type: str) -> dict:
+        entries = by_ip.get(ip, {})
+        removed = {key: entries.pop(key) for key in list(entries)
+                   if key[0] == name and key[2] == record_type and (zone is None or key[1] == zone)}
+        if not entries:
+            by_ip.pop(ip, None)
+        return removed
+    
+    @staticmethod
+    def _move(by_ip: dict, old_ip: str, new_ip: str, name: str, zone, record_type: str, ttl, disabled: bool, new_zone) -> None:
+        removed = ReverseIndex._remove(by_ip, old_ip, name, zone, record_type)
+        if any(key[0] == name and key[2] == record_type for key in by_ip.get(new_ip, {})):
+            return  # Already indexed at the new address (e.g. replayed over a build that saw the update)
+        if not removed:  # Not indexed yet (e.g. created elsewhere since the last build)
+            removed = {(name, new_zone, record_type): {"ttl": None}}
+        for (_, record_zone, _), details in removed.items():
+            ReverseIndex._add(by_ip, new_ip, name, record_zone, record_type,
+                              ttl if ttl is not None else details["ttl"], disabled)
+    
+    @staticmethod
+    def _rename(by_ip: dict, ip: str, old_name: str, new_name: str, zone, record_type: str) -> None:
+        for (_, record_zone, _), details in ReverseIndex._remove(by_ip, ip, old_name, zone, record_type).items():
+            ReverseIndex._add(by_ip, ip, new_name, record_zone, record_type, details["ttl"], details["disabled"])
+    
+    @staticmethod
+    def _drop_zone(by_ip: dict, zone: str) -> None:
+        for ip in list(by_ip):
+            entries = by_ip[ip]
+            for key in [key for key in entries if key[1] == zone]:
+                del entries[key]
+            if not entries:
+                del by_ip[ip]
+
+
+ip_index = ReverseIndex(api, zone_cache)
 
 
 def validate_domain(domain: str) -> bool:
@@ -61,6 +434,8 @@ def validate_record_name(name: str) -> bool:
 
 
 @mcp.tool()
+@profiled("dns.add_dns_record", own_turn=True)
+@api_errors
 def add_dns_record(
     domain: str, 
     name: str, 
@@ -108,68 +483,29 @@ def add_dns_record(
     full_domain = f"{name}.{domain}" if name != "@" else domain
     
     # Make API request
-    try:
-        response = requests.post(
-            f"{DNS_URL}/api/zones/records/add",
-            data={
-                "token": API_TOKEN,
-                "domain": full_domain,
-                "type": "A",
-                "ipAddress": ip,
-                "ttl": ttl
-            },
-            timeout=10
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        if result.get("status") == "ok":
-            return {
-                "success": True,
-                "message": f"Record added: {full_domain} -> {ip}",
-                "details": {
-                    "domain": full_domain,
-                    "ip": ip,
-                    "ttl": ttl
-                }
-            }
-        else:
-            return {
-                "success": False,
-                "error": "DNS server error",
-                "details": result.get("error", "Unknown error")
-            }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timeout",
-            "details": "DNS server did not respond within 10 seconds"
-        }
-            
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Connection failed",
-            "details": f"Cannot connect to DNS server at {DNS_URL}"
-        }
-            
-    except requests.exceptions.HTTPError as e:
-        return {
-            "success": False,
-            "error": "HTTP error",
-            "details": f"Server returned {e.response.status_code}"
-        }
-            
-    except Exception as e:
-        return {
-            "success": False,
-            "error": "Unexpected error",
-            "details": str(e)
+    response = api.post(
+        "/api/zones/records/add",
+        domain=full_domain,
+        type="A",
+        ipAddress=ip,
+        ttl=ttl
+    )
+    ip_index.add(ip, full_domain, record_zone(full_domain, response), "A", ttl)
+    
+    return {
+        "success": True,
+        "message": f"Record added: {full_domain} -> {ip}",
+        "details": {
+            "domain": full_domain,
+            "ip": ip,
+            "ttl": ttl
         }
+    }
+
 
 @mcp.tool()
+@profiled("dns.get_dns_records", own_turn=True)
+@api_errors
 def get_dns_records(
     domain: str,
     zone: str = None,
@@ -205,115 +541,70 @@ def get_dns_records(
     if zone:
         zone = zone.strip().lower()
     
-    # Build request parameters
-    params = {
-        "token": API_TOKEN,
-        "domain": domain,
-        "listZone": "true" if list_zone else "false"
-    }
+    # Make API request
+    response = api.get(
+        "/api/zones/records/get",
+        domain=domain,
+        zone=zone or None,
+        listZone="true" if list_zone else "false"
+    )
     
-    if zone:
-        params["zone"] = zone
+    zone_info = response.get("zone", {})
+    records = response.get("records", [])
     
-    # Make API request
-    try:
-        response = requests.get(
-            f"{DNS_URL}/api/zones/records/get",
-            params=params,
-            timeout=10
-        )
-        response.raise_for_status()
+    # Simplify records - filter out DNSSEC records for cleaner output
+    simplified_records = []
+    for record in records:
+        # Skip DNSSEC-related records for cleaner output
+        if record.get("type") in ["RRSIG", "DNSKEY", "NSEC3", "NSEC3PARAM", "DS"]:
+            continue
         
-        result = response.json()
+        simplified_record = {
+            "name": record.get("name"),
+            "type": record.get("type"),
+            "ttl": record.get("ttl"),
+            "disabled": record.get("disabled", False)
+        }
         
-        if result.get("status") == "ok":
-            zone_info = result.get("response", {}).get("zone", {})
-            records = result.get("response", {}).get("records", [])
-            
-            # Simplify records - filter out DNSSEC records for cleaner output
-            simplified_records = []
-            for record in records:
-                # Skip DNSSEC-related records for cleaner output
-                if record.get("type") in ["RRSIG", "DNSKEY", "NSEC3", "NSEC3PARAM", "DS"]:
-                    continue
-                
-                simplified_record = {
-                    "name": record.get("name"),
-                    "type": record.get("type"),
-                    "ttl": record.get("ttl"),
-                    "disabled": record.get("disabled", False)
-                }
-                
-                # Add type-specific data
-                rdata = record.get("rData", {})
-                if record.get("type") == "A":
-                    simplified_record["ip"] = rdata.get("ipAddress")
-                elif record.get("type") == "AAAA":
-                    simplified_record["ip"] = rdata.get("ipAddress")
-                elif record.get("type") == "CNAME":
-                    simplified_record["cname"] = rdata.get("cname")
-                elif record.get("type") == "MX":
-                    simplified_record["exchange"] = rdata.get("exchange")
-                    simplified_record["preference"] = rdata.get("preference")
-                elif record.get("type") == "TXT":
-                    simplified_record["text"] = rdata.get("text")
-                elif record.get("type") == "NS":
-                    simplified_record["nameServer"] = rdata.get("nameServer")
-                elif record.get("type") == "SOA":
-                    simplified_record["primaryNameServer"] = rdata.get("primaryNameServer")
-                    simplified_record["responsiblePerson"] = rdata.get("responsiblePerson")
-                    simplified_record["serial"] = rdata.get("serial")
-                else:
-                    simplified_record["data"] = rdata
-                
-                simplified_records.append(simplified_record)
-            
-            return {
-                "success": True,
-                "zone": {
-                    "name": zone_info.get("name"),
-                    "type": zone_info.get("type"),
-                    "disabled": zone_info.get("disabled", False)
-                },
-                "record_count": len(simplified_records),
-                "records": simplified_records
-            }
+        # Add type-specific data
+        rdata = record.get("rData", {})
+        if record.get("type") == "A":
+            simplified_record["ip"] = rdata.get("ipAddress")
+        elif record.get("type") == "AAAA":
+            simplified_record["ip"] = rdata.get("ipAddress")
+        elif record.get("type") == "CNAME":
+            simplified_record["cname"] = rdata.get("cname")
+        elif record.get("type") == "MX":
+            simplified_record["exchange"] = rdata.get("exchange")
+            simplified_record["preference"] = rdata.get("preference")
+        elif record.get("type") == "TXT":
+            simplified_record["text"] = rdata.get("text")
+        elif record.get("type") == "NS":
+            simplified_record["nameServer"] = rdata.get("nameServer")
+        elif record.get("type") == "SOA":
+            simplified_record["primaryNameServer"] = rdata.get("primaryNameServer")
+            simplified_record["responsiblePerson"] = rdata.get("responsiblePerson")
+            simplified_record["serial"] = rdata.get("serial")
         else:
-            return {
-                "success": False,
-                "error": "DNS server error",
-                "details": result.get("error", "Unknown error")
-            }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timeout",
-            "details": "DNS server did not respond within 10 seconds"
-        }
-            
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Connection failed",
-            "details": f"Cannot connect to DNS server at {DNS_URL}"
-        }
-            
-    except requests.exceptions.HTTPError as e:
-        return {
-            "success": False,
-            "error": "HTTP error",
-            "details": f"Server returned {e.response.status_code}"
-        }
-            
-    except Exception as e:
-        return {
-            "success": False,
-            "error": "Unexpected error",
-            "details": str(e)
-        }
+            simplified_record["data"] = rdata
+        
+        simplified_records.append(simplified_record)
+    
+    return {
+        "success": True,
+        "zone": {
+            "name": zone_info.get("name"),
+            "type": zone_info.get("type"),
+            "disabled": zone_info.get("disabled", False)
+        },
+        "record_count": len(simplified_records),
+        "records": simplified_records
+    }
+
 
 @mcp.tool()
+@profiled("dns.find_domain_by_ip", own_turn=True)
+@api_errors
 def find_domain_by_ip(
     ip: str,
     zone: str = ""
@@ -343,159 +634,41 @@ def find_domain_by_ip(
         }
     
     ip = ip.strip()
+    zone = zone.strip().lower() if zone else None
+    
+    # Answered from the reverse index: no zone dumps per lookup
+    try:
+        matching_domains = ip_index.lookup(ip, zone)
+    except DnsApiError as e:
+        return e.result("Failed to list zones")
+    
+    result = {
+        "success": True,
+        "ip": ip,
+        "found_count": len(matching_domains),
+        "domains": matching_domains
+    }
     
     # If zone is specified, search within that zone
     if zone:
-        zone = zone.strip().lower()
-        params = {
-            "token": API_TOKEN,
-            "domain": zone,
-            "listZone": "true"
-        }
-        
-        try:
-            response = requests.get(
-                f"{DNS_URL}/api/zones/records/get",
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get("status") == "ok":
-                records = result.get("response", {}).get("records", [])
-                matching_domains = []
-                
-                # Search for matching IP
-                for record in records:
-                    if record.get("type") in ["A", "AAAA"]:
-                        rdata = record.get("rData", {})
-                        if rdata.get("ipAddress") == ip:
-                            matching_domains.append({
-                                "name": record.get("name"),
-                                "type": record.get("type"),
-                                "ttl": record.get("ttl"),
-                                "ip": ip,
-                                "disabled": record.get("disabled", False)
-                            })
-                
-                if matching_domains:
-                    return {
-                        "success": True,
-                        "ip": ip,
-                        "zone": zone,
-                        "found_count": len(matching_domains),
-                        "domains": matching_domains
-                    }
-                else:
-                    return {
-                        "success": True,
-                        "ip": ip,
-                        "zone": zone,
-                        "found_count": 0,
-                        "domains": [],
-                        "message": f"No domains found pointing to {ip} in zone {zone}"
-                    }
-            else:
-                return {
-                    "success": False,
-                    "error": "DNS server error",
-                    "details": result.get("error", "Unknown error")
-                }
-                
-        except Exception as e:
-            return {
-                "success": False,
-                "error": "Request failed",
-                "details": str(e)
-            }
-    
-    else:
-        # Search across all zones
-        try:
-            # First, get list of all zones
-            list_response = requests.get(
-                f"{DNS_URL}/api/zones/list",
-                params={"token": API_TOKEN},
-                timeout=10
-            )
-            list_response.raise_for_status()
-            list_result = list_response.json()
-            
-            if list_result.get("status") != "ok":
-                return {
-                    "success": False,
-                    "error": "Failed to list zones",
-                    "details": list_result.get("error", "Unknown error")
-                }
-            
-            zones = list_result.get("response", {}).get("zones", [])
-            all_matching_domains = []
-            
-            # Search each zone
-            for zone_info in zones:
-                zone_name = zone_info.get("name")
-                if not zone_name:
-                    continue
-                
-                # Get records for this zone
-                params = {
-                    "token": API_TOKEN,
-                    "domain": zone_name,
-                    "listZone": "true"
-                }
-                
-                try:
-                    response = requests.get(
-                        f"{DNS_URL}/api/zones/records/get",
-                        params=params,
-                        timeout=10
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    if result.get("status") == "ok":
-                        records = result.get("response", {}).get("records", [])
-                        
-                        for record in records:
-                            if record.get("type") in ["A", "AAAA"]:
-                                rdata = record.get("rData", {})
-                                if rdata.get("ipAddress") == ip:
-                                    all_matching_domains.append({
-                                        "name": record.get("name"),
-                                        "zone": zone_name,
-                                        "type": record.get("type"),
-                                        "ttl": record.get("ttl"),
-                                        "ip": ip,
-                                        "disabled": record.get("disabled", False)
-                                    })
-                except:
-                    continue  # Skip zones that fail
-            
-            if all_matching_domains:
-                return {
-                    "success": True,
-                    "ip": ip,
-                    "found_count": len(all_matching_domains),
-                    "domains": all_matching_domains
-                }
-            else:
-                return {
-                    "success": True,
-                    "ip": ip,
-                    "found_count": 0,
-                    "domains": [],
-                    "message": f"No domains found pointing to {ip} across all zones"
-                }
-                
-        except Exception as e:
-            return {
-                "success": False,
-                "error": "Request failed",
-                "details": str(e)
-            }
+        result["zone"] = zone
+        for domain in matching_domains:
+            del domain["zone"]
+        if not matching_domains:
+            result["message"] = f"No domains found pointing to {ip} in zone {zone}"
+    elif not matching_domains:
+        result["message"] = f"No domains found pointing to {ip} across all zones"
+    
+    # Zones that could not be read at the last rebuild are answered from older data
+    if ip_index.failed_zones:
+        result["stale_zones"] = ip_index.failed_zones
+    
+    return result
+
 
 @mcp.tool()
+@profiled("dns.update_dns_record", own_turn=True)
+@api_errors
 def update_dns_record(
     domain: str,
     current_ip: str,
@@ -554,83 +727,43 @@ def update_dns_record(
     if zone:
         zone = zone.strip().lower()
     
-    # Build request parameters
-    params = {
-        "token": API_TOKEN,
-        "domain": domain,
-        "type": "A",
-        "ipAddress": current_ip,
-        "newIpAddress": new_ip,
-        "disable": "true" if disable else "false"
-    }
-    
-    if zone:
-        params["zone"] = zone
+    # Make API request
+    response = api.post(
+        "/api/zones/records/update",
+        domain=domain,
+        type="A",
+        ipAddress=current_ip,
+        newIpAddress=new_ip,
+        disable="true" if disable else "false",
+        zone=zone or None,
+        ttl=ttl
+    )
     
-    if ttl is not None:
-        params["ttl"] = ttl
+    updated_record = response.get("updatedRecord", {})
+    ip_index.move(
+        current_ip, new_ip, domain,
+        zone=response.get("zone", {}).get("name") or zone or None,
+        ttl=updated_record.get("ttl", ttl),
+        disabled=updated_record.get("disabled", disable),
+        new_zone=record_zone(domain, response, zone)
+    )
     
-    # Make API request
-    try:
-        response = requests.post(
-            f"{DNS_URL}/api/zones/records/update",
-            data=params,
-            timeout=10
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        if result.get("status") == "ok":
-            updated_record = result.get("response", {}).get("updatedRecord", {})
-            
-            return {
-                "success": True,
-                "message": f"Record updated: {domain} changed from {current_ip} to {new_ip}",
-                "details": {
-                    "domain": domain,
-                    "old_ip": current_ip,
-                    "new_ip": new_ip,
-                    "ttl": updated_record.get("ttl"),
-                    "disabled": updated_record.get("disabled", False)
-                }
-            }
-        else:
-            return {
-                "success": False,
-                "error": "DNS server error",
-                "details": result.get("error", "Unknown error")
-            }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timeout",
-            "details": "DNS server did not respond within 10 seconds"
-        }
-            
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Connection failed",
-            "details": f"Cannot connect to DNS server at {DNS_URL}"
-        }
-            
-    except requests.exceptions.HTTPError as e:
-        return {
-            "success": False,
-            "error": "HTTP error",
-            "details": f"Server returned {e.response.status_code}"
-        }
-            
-    except Exception as e:
-        return {
-            "success": False,
-            "error": "Unexpected error",
-            "details": str(e)
+    return {
+        "success": True,
+        "message": f"Record updated: {domain} changed from {current_ip} to {new_ip}",
+        "details": {
+            "domain": domain,
+            "old_ip": current_ip,
+            "new_ip": new_ip,
+            "ttl": updated_record.get("ttl"),
+            "disabled": updated_record.get("disabled", False)
         }
+    }
+
 
 @mcp.tool()
+@profiled("dns.rename_dns_record", own_turn=True)
+@api_errors
 def rename_dns_record(
     old_domain: str,
     new_domain: str,
@@ -674,144 +807,86 @@ def rename_dns_record(
         zone = zone.strip().lower()
     
     # First, get the existing record to know its current values
-    get_params = {
-        "token": API_TOKEN,
+    try:
+        existing = api.get("/api/zones/records/get", domain=old_domain, zone=zone or None, listZone="false")
+    except DnsApiError as e:
+        return e.result("Failed to get existing record")
+    
+    # Find the record we want to rename
+    records = existing.get("records", [])
+    target_record = None
+    
+    for record in records:
+        if record.get("name") == old_domain and record.get("type") == record_type:
+            target_record = record
+            break
+    
+    if not target_record:
+        return {
+            "success": False,
+            "error": "Record not found",
+            "details": f"No {record_type} record found for {old_domain}"
+        }
+    
+    # Build update request based on record type
+    update_params = {
         "domain": old_domain,
-        "listZone": "false"
+        "type": record_type,
+        "newDomain": new_domain,
+        "ttl": target_record.get("ttl", 3600)
     }
+    
     if zone:
-        get_params["zone"] = zone
+        update_params["zone"] = zone
     
-    try:
-        # Get existing record
-        get_response = requests.get(
-            f"{DNS_URL}/api/zones/records/get",
-            params=get_params,
-            timeout=10
-        )
-        get_response.raise_for_status()
-        get_result = get_response.json()
-        
-        if get_result.get("status") != "ok":
-            return {
-                "success": False,
-                "error": "Failed to get existing record",
-                "details": get_result.get("error", "Unknown error")
-            }
-        
-        # Find the record we want to rename
-        records = get_result.get("response", {}).get("records", [])
-        target_record = None
-        
-        for record in records:
-            if record.get("name") == old_domain and record.get("type") == record_type:
-                target_record = record
-                break
-        
-        if not target_record:
-            return {
-                "success": False,
-                "error": "Record not found",
-                "details": f"No {record_type} record found for {old_domain}"
-            }
-        
-        # Build update request based on record type
-        update_params = {
-            "token": API_TOKEN,
-            "domain": old_domain,
-            "type": record_type,
-            "newDomain": new_domain,
-            "ttl": target_record.get("ttl", 3600)
-        }
-        
-        if zone:
-            update_params["zone"] = zone
-        
-        # Add type-specific parameters
-        rdata = target_record.get("rData", {})
-        
-        if record_type == "A":
-            ip_address = rdata.get("ipAddress")
-            if not ip_address:
-                return {
-                    "success": False,
-                    "error": "Missing IP address",
-                    "details": "Could not find IP address in existing record"
-                }
-            update_params["ipAddress"] = ip_address
-        elif record_type == "CNAME":
-            cname = rdata.get("cname")
-            if not cname:
-                return {
-                    "success": False,
-                    "error": "Missing CNAME",
-                    "details": "Could not find CNAME in existing record"
-                }
-            update_params["cname"] = cname
-        else:
+    # Add type-specific parameters
+    rdata = target_record.get("rData", {})
+    
+    if record_type == "A":
+        ip_address = rdata.get("ipAddress")
+        if not ip_address:
             return {
                 "success": False,
-                "error": "Unsupported record type",
-                "details": f"Renaming {record_type} records is not yet supported. Only A and CNAME records can be renamed."
-            }
-        
-        # Make API request to rename
-        response = requests.post(
-            f"{DNS_URL}/api/zones/records/update",
-            data=update_params,
-            timeout=10
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        if result.get("status") == "ok":
-            return {
-                "success": True,
-                "message": f"Record renamed: {old_domain} → {new_domain}",
-                "details": {
-                    "old_domain": old_domain,
-                    "new_domain": new_domain,
-                    "type": record_type,
-                    "ttl": update_params["ttl"]
-                }
+                "error": "Missing IP address",
+                "details": "Could not find IP address in existing record"
             }
-        else:
+        update_params["ipAddress"] = ip_address
+    elif record_type == "CNAME":
+        cname = rdata.get("cname")
+        if not cname:
             return {
                 "success": False,
-                "error": "DNS server error",
-                "details": result.get("error", "Unknown error")
+                "error": "Missing CNAME",
+                "details": "Could not find CNAME in existing record"
             }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timeout",
-            "details": "DNS server did not respond within 10 seconds"
-        }
-            
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Connection failed",
-            "details": f"Cannot connect to DNS server at {DNS_URL}"
-        }
-            
-    except requests.exceptions.HTTPError as e:
+        update_params["cname"] = cname
+    else:
         return {
             "success": False,
-            "error": "HTTP error",
-            "details": f"Server returned {e.response.status_code}"
+            "error": "Unsupported record type",
+            "details": f"Renaming {record_type} records is not yet supported. Only A and CNAME records can be renamed."
         }
-            
-    except Exception as e:
-        return {
-            "success": False,
-            "error": "Unexpected error",
-            "details": str(e)
+    
+    # Make API request to rename
+    api.post("/api/zones/records/update", **update_params)
+    if record_type == "A":
+        ip_index.rename(update_params["ipAddress"], old_domain, new_domain, existing.get("zone", {}).get("name") or zone or None)
+    
+    return {
+        "success": True,
+        "message": f"Record renamed: {old_domain} → {new_domain}",
+        "details": {
+            "old_domain": old_domain,
+            "new_domain": new_domain,
+            "type": record_type,
+            "ttl": update_params["ttl"]
         }
+    }
+
 
 @mcp.tool()
+@profiled("dns.delete_dns_record", own_turn=True)
+@api_errors
 def delete_dns_record(
     domain: str,
     record_type: str = "A",
@@ -867,7 +942,6 @@ def delete_dns_record(
     
     # Build request parameters
     params = {
-        "token": API_TOKEN,
         "domain": domain,
         "type": record_type
     }
@@ -896,70 +970,32 @@ def delete_dns_record(
             params["preference"] = "10"  # Default
     
     # Make API request to delete
-    try:
-        response = requests.post(
-            f"{DNS_URL}/api/zones/records/delete",
-            data=params,
-            timeout=10
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        if result.get("status") == "ok":
-            message = f"Record deleted: {domain}"
-            if record_type in ["A", "AAAA"]:
-                message += f" ({record_type}: {ip})"
-            elif value:
-                message += f" ({record_type}: {value})"
-            else:
-                message += f" ({record_type})"
-            
-            return {
-                "success": True,
-                "message": message,
-                "details": {
-                    "domain": domain,
-                    "type": record_type,
-                    "zone": zone if zone else "auto-detected"
-                }
-            }
-        else:
-            return {
-                "success": False,
-                "error": "DNS server error",
-                "details": result.get("error", "Unknown error")
-            }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timeout",
-            "details": "DNS server did not respond within 10 seconds"
-        }
-            
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Connection failed",
-            "details": f"Cannot connect to DNS server at {DNS_URL}"
-        }
-            
-    except requests.exceptions.HTTPError as e:
-        return {
-            "success": False,
-            "error": "HTTP error",
-            "details": f"Server returned {e.response.status_code}"
-        }
-            
-    except Exception as e:
-        return {
-            "success": False,
-            "error": "Unexpected error",
-            "details": str(e)
+    api.post("/api/zones/records/delete", **params)
+    if record_type in ["A", "AAAA"]:
+        ip_index.remove(ip, domain, zone or None, record_type)
+    
+    message = f"Record deleted: {domain}"
+    if record_type in ["A", "AAAA"]:
+        message += f" ({record_type}: {ip})"
+    elif value:
+        message += f" ({record_type}: {value})"
+    else:
+        message += f" ({record_type})"
+    
+    return {
+        "success": True,
+        "message": message,
+        "details": {
+            "domain": domain,
+            "type": record_type,
+            "zone": zone if zone else "auto-detected"
         }
+    }
+
 
 @mcp.tool()
+@profiled("dns.create_dns_zone", own_turn=True)
+@api_errors
 def create_dns_zone(
     zone: str,
     zone_type: str = "Primary",
@@ -997,34 +1033,19 @@ def create_dns_zone(
     
     # Check if zone already exists
     try:
-        list_response = requests.get(
-            f"{DNS_URL}/api/zones/list",
-            params={"token": API_TOKEN},
-            timeout=10
-        )
-        list_response.raise_for_status()
-        list_result = list_response.json()
-        
-        if list_result.get("status") == "ok":
-            zones = list_result.get("response", {}).get("zones", [])
-            
-            for z in zones:
-                if z.get("name") == zone:
-                    return {
-                        "success": False,
-                        "error": "Zone already exists",
-                        "details": f"Zone '{zone}' already exists as {z.get('type')} zone"
-                    }
-    except Exception as e:
+        existing = zone_cache.get(zone)
+    except DnsApiError as e:
+        return e.result("Failed to check existing zones")
+    
+    if existing is not None:
         return {
             "success": False,
-            "error": "Failed to check existing zones",
-            "details": str(e)
+            "error": "Zone already exists",
+            "details": f"Zone '{zone}' already exists as {existing.get('type')} zone"
         }
     
     # Build request parameters
     params = {
-        "token": API_TOKEN,
         "zone": zone,
         "type": zone_type
     }
@@ -1033,64 +1054,25 @@ def create_dns_zone(
         params["useSoaSerialDateScheme"] = "true"
     
     # Make API request to create zone
-    try:
-        response = requests.post(
-            f"{DNS_URL}/api/zones/create",
-            data=params,
-            timeout=10
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        if result.get("status") == "ok":
-            created_domain = result.get("response", {}).get("domain", zone)
-            
-            return {
-                "success": True,
-                "message": f"Zone created: {created_domain}",
-                "details": {
-                    "zone": created_domain,
-                    "type": zone_type,
-                    "soa_serial_date_scheme": use_soa_serial_date_scheme
-                }
-            }
-        else:
-            return {
-                "success": False,
-                "error": "DNS server error",
-                "details": result.get("error", "Unknown error")
-            }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timeout",
-            "details": "DNS server did not respond within 10 seconds"
-        }
-            
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Connection failed",
-            "details": f"Cannot connect to DNS server at {DNS_URL}"
-        }
-            
-    except requests.exceptions.HTTPError as e:
-        return {
-            "success": False,
-            "error": "HTTP error",
-            "details": f"Server returned {e.response.status_code}"
-        }
-            
-    except Exception as e:
-        return {
-            "success": False,
-            "error": "Unexpected error",
-            "details": str(e)
+    response = api.post("/api/zones/create", **params)
+    
+    created_domain = response.get("domain", zone)
+    zone_cache.put({"name": created_domain, "type": zone_type, "disabled": False, "internal": False})
+    
+    return {
+        "success": True,
+        "message": f"Zone created: {created_domain}",
+        "details": {
+            "zone": created_domain,
+            "type": zone_type,
+            "soa_serial_date_scheme": use_soa_serial_date_scheme
         }
+    }
+
 
 @mcp.tool()
+@profiled("dns.list_dns_zones", own_turn=True)
+@api_errors
 def list_dns_zones() -> dict:
     """
     List all DNS zones in Technitium DNS server.
@@ -1098,72 +1080,31 @@ def list_dns_zones() -> dict:
     Shows all zones with their type, status, and record count.
     """
     
-    try:
-        response = requests.get(
-            f"{DNS_URL}/api/zones/list",
-            params={"token": API_TOKEN},
-            timeout=10
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        if result.get("status") == "ok":
-            zones = result.get("response", {}).get("zones", [])
-            
-            # Simplify zone information
-            simplified_zones = []
-            for zone in zones:
-                simplified_zones.append({
-                    "name": zone.get("name"),
-                    "type": zone.get("type"),
-                    "disabled": zone.get("disabled", False),
-                    "internal": zone.get("internal", False),
-                    "dnssec_status": zone.get("dnssecStatus", "Unknown")
-                })
-            
-            return {
-                "success": True,
-                "zone_count": len(simplified_zones),
-                "zones": simplified_zones
-            }
-        else:
-            return {
-                "success": False,
-                "error": "DNS server error",
-                "details": result.get("error", "Unknown error")
-            }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timeout",
-            "details": "DNS server did not respond within 10 seconds"
-        }
-            
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Connection failed",
-            "details": f"Cannot connect to DNS server at {DNS_URL}"
-        }
-            
-    except requests.exceptions.HTTPError as e:
-        return {
-            "success": False,
-            "error": "HTTP error",
-            "details": f"Server returned {e.response.status_code}"
-        }
-            
-    except Exception as e:
-        return {
-            "success": False,
-            "error": "Unexpected error",
-            "details": str(e)
-        }
+    # An explicit listing always asks the server, and refreshes the cache on the way
+    zones = zone_cache.refresh()
+    
+    # Simplify zone information
+    simplified_zones = []
+    for zone in zones:
+        simplified_zones.append({
+            "name": zone.get("name"),
+            "type": zone.get("type"),
+            "disabled": zone.get("disabled", False),
+            "internal": zone.get("internal", False),
+            "dnssec_status": zone.get("dnssecStatus", "Unknown")
+        })
+    
+    return {
+        "success": True,
+        "zone_count": len(simplified_zones),
+        "zones": simplified_zones
+    }
+
 
 
 @mcp.tool()
+@profiled("dns.delete_dns_zone", own_turn=True)
+@api_errors
 def delete_dns_zone(
     zone: str,
     confirm: bool = False
@@ -1199,96 +1140,32 @@ def delete_dns_zone(
     
     # First, check if zone exists and get info
     try:
-        list_response = requests.get(
-            f"{DNS_URL}/api/zones/list",
-            params={"token": API_TOKEN},
-            timeout=10
-        )
-        list_response.raise_for_status()
-        list_result = list_response.json()
-        
-        if list_result.get("status") == "ok":
-            zones = list_result.get("response", {}).get("zones", [])
-            zone_exists = False
-            zone_info = None
-            
-            for z in zones:
-                if z.get("name") == zone:
-                    zone_exists = True
-                    zone_info = z
-                    break
-            
-            if not zone_exists:
-                return {
-                    "success": False,
-                    "error": "Zone not found",
-                    "details": f"Zone '{zone}' does not exist"
-                }
-    except Exception as e:
+        zone_info = zone_cache.get(zone)
+    except DnsApiError as e:
+        return e.result("Failed to verify zone")
+    
+    if zone_info is None:
         return {
             "success": False,
-            "error": "Failed to verify zone",
-            "details": str(e)
+            "error": "Zone not found",
+            "details": f"Zone '{zone}' does not exist"
         }
     
     # Make API request to delete zone
-    try:
-        response = requests.post(
-            f"{DNS_URL}/api/zones/delete",
-            data={
-                "token": API_TOKEN,
-                "zone": zone
-            },
-            timeout=10
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        if result.get("status") == "ok":
-            return {
-                "success": True,
-                "message": f"Zone deleted: {zone}",
-                "details": {
-                    "zone": zone,
-                    "type": zone_info.get("type") if zone_info else "unknown",
-                    "warning": "All records in this zone have been permanently deleted"
-                }
-            }
-        else:
-            return {
-                "success": False,
-                "error": "DNS server error",
-                "details": result.get("error", "Unknown error")
-            }
-            
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "error": "Request timeout",
-            "details": "DNS server did not respond within 10 seconds"
-        }
-            
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "error": "Connection failed",
-            "details": f"Cannot connect to DNS server at {DNS_URL}"
-        }
-            
-    except requests.exceptions.HTTPError as e:
-        return {
-            "success": False,
-            "error": "HTTP error",
-            "details": f"Server returned {e.response.status_code}"
-        }
-            
-    except Exception as e:
-        return {
-            "success": False,
-            "error": "Unexpected error",
-            "details": str(e)
+    api.post("/api/zones/delete", zone=zone)
+    zone_cache.discard(zone)
+    ip_index.drop_zone(zone)
+    
+    return {
+        "success": True,
+        "message": f"Zone deleted: {zone}",
+        "details": {
+            "zone": zone,
+            "type": zone_info.get("type") if zone_info else "unknown",
+            "warning": "All records in this zone have been permanently deleted"
         }
+    }
+
 
 
 if __name__ == "__main__":
@@ -2,8 +2,25 @@
 import asyncio
 import ollama
 from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport
 import json
+import os
+import sys
 import time
+from pathlib import Path
+
+# Shared modules live in the AI_Voice project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from module.tool_registry import ToolRegistry, ToolValidationError
+from module.intent_parser import IntentParser
+from module.llm_backends import BACKENDS_ENV, HEDGE_ENV, BackendRouter, build_backends
+from module.loop_guard import LoopGuard
+from module.model_router import SMALL_MODEL_ENV, ModelRouter
+from module.plan_cache import PlanCache
+from module.profiling import child_env, profile_turn
+from module.ollama_session import OllamaSession, preload_model
+from module.tracing import tracer
+from module.warmup import Warmup
 
 SYSTEM_PROMPT = """DNS assistant with Technitium API. Execute immediately. Max 2 sentences.
 
@@ -41,33 +58,32 @@ EXAMPLES:
 "create zone x.com and add test.x.com to 1.1.1.1"  
 -> call: create_dns_zone(zone="x.com") AND add_dns_record(domain="x.com",name="test",ip="1.1.1.1")"""
 
-async def convert_mcp_tools_to_ollama(tools):
-    ollama_tools = []
-    for tool in tools:
-        ollama_tool = {
-            'type': 'function',
-            'function': {
-                'name': tool.name,
-                'description': tool.description or '',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {},
-                    'required': []
-                }
-            }
-        }
-        if hasattr(tool, 'inputSchema') and tool.inputSchema:
-            schema = tool.inputSchema
-            if 'properties' in schema:
-                ollama_tool['function']['parameters']['properties'] = schema['properties']
-            if 'required' in schema:
-                ollama_tool['function']['parameters']['required'] = schema['required']
-        ollama_tools.append(ollama_tool)
-    return ollama_tools
+OLLAMA_HOST = 'http://localhost:11434'
+OLLAMA_MODEL = 'qwen2.5:7b-instruct-q4_0'
+OLLAMA_OPTIONS = {
+    'temperature': 0,
+    'num_ctx': 2048,
+    'num_predict': 40,
+    'top_k': 5,
+    'top_p': 0.8
+}
+KEEP_ALIVE = '30m'
+
+# Set OLLAMA_COMPACT_TOOLS=1 to constrain tool calls to a short JSON schema. Constrained
+# output always ends with a closing brace, so it gets a budget that fits two calls
+# instead of num_predict 40, which cut off verbose native tool calls.
+COMPACT_TOOLS = os.getenv("OLLAMA_COMPACT_TOOLS", "0") == "1"
+COMPACT_NUM_PREDICT = 128
+COMPACT_MAX_REPLY_CHARS = 160
+
+# Set OLLAMA_SMALL_MODEL (e.g. qwen2.5:1.5b-instruct) to send simple single-record
+# commands to a smaller model; invalid tool calls are retried on OLLAMA_MODEL
+SMALL_MODEL = os.getenv(SMALL_MODEL_ENV)
 
 async def execute_tool(client, tool_name, arguments):
     try:
-        result = await client.call_tool(tool_name, arguments)
+        with tracer.span("mcp.call_tool", tool=tool_name):
+            result = await client.call_tool(tool_name, arguments)
         if hasattr(result, 'content') and result.content:
             text_result = result.content[0].text if hasattr(result.content[0], 'text') else str(result.content[0])
             try:
@@ -82,26 +98,95 @@ def truncate(text, max_len=50):
     """Truncate text for display"""
     return text if len(text) <= max_len else text[:max_len-3] + "..."
 
+async def run_planned_calls(registry, messages, calls):
+    """Run tool calls planned without the LLM (fast path or cached plan)"""
+    messages.append({
+        'role': 'assistant',
+        'content': '',
+        'tool_calls': [{'function': {'name': name, 'arguments': args}} for name, args in calls]
+    })
+    for tool_name, tool_args in calls:
+        print(f"  🔧 {tool_name}({', '.join(f'{k}={truncate(str(v), 15)}' for k, v in tool_args.items())})")
+        try:
+            result = await registry.dispatch(tool_name, tool_args)
+        except ToolValidationError as e:
+            result = {'success': False, 'error': str(e)}
+        if isinstance(result, dict) and result.get('success') is False:
+            print(f"     ❌ {truncate(result.get('error', 'Failed'), 50)}")
+        elif isinstance(result, dict):
+            print(f"     ✅ {truncate(result.get('message', 'Done'), 60)}")
+        messages.append({
+            'role': 'tool',
+            'content': json.dumps(result) if isinstance(result, dict) else str(result),
+            'tool_name': tool_name,
+        })
+
 async def chat_with_ollama():
+    # Load the model in Ollama while the MCP server starts, not on the first chat
+    ollama_client = ollama.Client(host=OLLAMA_HOST)
+    warmup = Warmup().add(
+        "ollama", preload_model, ollama_client, OLLAMA_MODEL, KEEP_ALIVE, OLLAMA_OPTIONS['num_ctx'],
+        required=True
+    )
+    if SMALL_MODEL:
+        warmup.add("ollama small", preload_model, ollama_client, SMALL_MODEL, KEEP_ALIVE, OLLAMA_OPTIONS['num_ctx'])
+    warmup.start()
+    
     print("🔄 Connecting to DNS MCP server...")
     
-    async with Client("dns_server.py") as client:
+    # The MCP server only gets a minimal environment; pass VOICE_PROFILE* so its tools are profiled too
+    async with Client(PythonStdioTransport("dns_server.py", env=child_env())) as client:
         print("✅ Connected to MCP server")
         
         tools_list = await client.list_tools()
         print(f"🛠️  Loaded {len(tools_list)} tools")
         
-        ollama_tools = await convert_mcp_tools_to_ollama(tools_list)
-        ollama_client = ollama.Client(host='http://localhost:11434')
+        # Schemas are converted once; every chat round reuses the same tool list
+        registry = ToolRegistry()
+        registry.register_mcp_tools(
+            tools_list,
+            lambda name, arguments: execute_tool(client, name, arguments)
+        )
+        ollama_tools = registry.ollama_tools()
+        fast_path = IntentParser(registry)
+        plan_cache = PlanCache()
+        # Repeated (tool, args) calls reuse their result; 3 rounds max, stop early on pure repeats
+        loop_guard = LoopGuard(max_rounds=3)
         
-        try:
-            ollama_client.list()
-            print("✅ Connected to Ollama")
-        except Exception as e:
-            print(f"❌ Could not connect to Ollama: {e}")
+        await asyncio.to_thread(warmup.wait)
+        if not warmup.ready:
+            print(f"❌ Could not connect to Ollama: {warmup.task('ollama').error}")
             return
+        print(f"✅ Connected to Ollama, {OLLAMA_MODEL} loaded")
+        print(warmup.report())
         
-        messages = [{'role': 'system', 'content': SYSTEM_PROMPT}]
+        # Same system prompt, tools and num_ctx on every call so Ollama reuses the prefix KV cache;
+        # keep_alive keeps the model loaded between turns
+        session_settings = dict(
+            client=ollama_client,
+            system_prompt=SYSTEM_PROMPT,
+            tools=ollama_tools,
+            options={**OLLAMA_OPTIONS, 'num_predict': COMPACT_NUM_PREDICT} if COMPACT_TOOLS else OLLAMA_OPTIONS,
+            keep_alive=KEEP_ALIVE,
+            compact_tools=COMPACT_TOOLS,
+            max_reply_chars=COMPACT_MAX_REPLY_CHARS
+        )
+        # LLM_BACKENDS (e.g. "ollama:qwen2.5:7b-instruct-q4_0,ollama:qwen2.5:7b-instruct-q4_0@http://gpu-box:11434")
+        # routes every call to the fastest healthy backend; LLM_HEDGE=1 also hedges slow calls
+        backends_spec = os.getenv(BACKENDS_ENV)
+        if backends_spec:
+            session = BackendRouter(
+                build_backends(backends_spec, registry, **session_settings),
+                hedge=os.getenv(HEDGE_ENV, "0") == "1"
+            )
+        else:
+            session = OllamaSession(model=OLLAMA_MODEL, **session_settings)
+        router = ModelRouter(
+            large=session,
+            small=OllamaSession(model=SMALL_MODEL, **session_settings) if SMALL_MODEL else None,
+            registry=registry
+        )
+        messages = []
         
         print("\n" + "="*60)
         print("💬 DNS Manager (type 'exit' to quit)")
@@ -118,37 +203,49 @@ async def chat_with_ollama():
             if not user_input:
                 continue
             
+            profile_turn(tracer.new_turn())
+            if plan_cache.is_forget_command(user_input):
+                print("🗑️  Forgot the last cached plan\n" if plan_cache.invalidate_last() else "ℹ️  No cached plan to forget\n")
+                continue
+            
             messages.append({'role': 'user', 'content': user_input})
             print("\n🤖 ", end='', flush=True)
             
+            # Fast path: formulaic commands go straight to the tool, no LLM round
+            intent = fast_path.parse(user_input)
+            if intent:
+                print("[⚡ fast path]")
+                await run_planned_calls(registry, messages, [intent])
+                print(f"  {fast_path.report()}\n")
+                continue
+            
+            # Plan cache: same request shape as an earlier turn, replay its tool calls
+            plan = plan_cache.lookup(user_input)
+            if plan:
+                print("[📦 cached plan]")
+                await run_planned_calls(registry, messages, plan)
+                print(f"  {plan_cache.report()}\n")
+                continue
+            
+            turn_plan = []  # (tool_name, arguments, succeeded) for this turn
+            loop_guard.start_turn()
+            router.start_turn(user_input)
             try:
-                max_rounds = 3
                 current_round = 0
                 
-                while current_round < max_rounds:
+                while True:
                     start = time.time()
                     
-                    response = ollama_client.chat(
-                        model='qwen2.5:7b-instruct-q4_0',
-                        messages=messages,
-                        tools=ollama_tools,
-                        options={
-                            'temperature': 0,
-                            'num_ctx': 2048,
-                            'num_predict': 40,
-                            'top_k': 5,
-                            'top_p': 0.8
-                        }
-                    )
+                    response = router.chat(messages)
                     
                     elapsed = time.time() - start
                     
                     if response['message'].get('tool_calls'):
                         # Show timing
                         if current_round == 0:
-                            print(f"[{elapsed:.1f}s]")
+                            print(f"[{elapsed:.1f}s | {router.current.model} | {router.last_stats.report()}]")
                         else:
-                            print(f"  [Round {current_round + 1}, {elapsed:.1f}s]")
+                            print(f"  [Round {current_round + 1}, {elapsed:.1f}s | {router.last_stats.report()}]")
                         
                         messages.append(response['message'])
                         
@@ -163,7 +260,21 @@ async def chat_with_ollama():
                             )
                             print(f"  🔧 {tool_name}({args_display})")
                             
-                            result = await execute_tool(client, tool_name, tool_args)
+                            earlier = loop_guard.lookup(tool_name, tool_args)
+                            if earlier is not None:
+                                result = earlier
+                                print("     ♻️ repeated call, earlier result reused")
+                            else:
+                                try:
+                                    result = await registry.dispatch(tool_name, tool_args)
+                                except ToolValidationError as e:
+                                    result = {'success': False, 'error': str(e)}
+                                loop_guard.record(tool_name, tool_args, result)
+                                turn_plan.append((
+                                    tool_name,
+                                    dict(tool_args),
+                                    not (isinstance(result, dict) and result.get('success') is False)
+                                ))
                             
                             if isinstance(result, dict):
                                 if result.get('success') is False:
@@ -176,24 +287,22 @@ async def chat_with_ollama():
                             messages.append({
                                 'role': 'tool',
                                 'content': json.dumps(result) if isinstance(result, dict) else str(result),
+                                'tool_name': tool_name,
                             })
                         
                         current_round += 1
+                        if not loop_guard.end_round():
+                            break
                         
                     else:
                         # No more tool calls
                         if current_round > 0:
                             # Get summary after tools
                             try:
-                                final = ollama_client.chat(
-                                    model='qwen2.5:7b-instruct-q4_0',
-                                    messages=messages,
-                                    options={
-                                        'temperature': 0,
-                                        'num_predict': 30,
-                                        'num_ctx': 1024
-                                    }
-                                )
+                                # Same prefix and num_ctx as the tool rounds (a different
+                                # num_ctx would force a model reload). In compact mode the reply
+                                # is wrapped in the JSON schema, which 30 tokens would cut off
+                                final = router.chat(messages, num_predict=COMPACT_NUM_PREDICT if COMPACT_TOOLS else 30)
                                 print(f"\n  ✨ {final['message']['content']}\n")
                                 messages.append(final['message'])
                             except Exception as e:
@@ -205,8 +314,16 @@ async def chat_with_ollama():
                         
                         break
                 
-                if current_round >= max_rounds:
-                    print(f"\n  ⚠️ Stopped at {max_rounds} rounds. Try simpler tasks.\n")
+                if loop_guard.stop_reason:
+                    print(f"\n  ⚠️ Stopped: {loop_guard.stop_reason}. Try simpler tasks.\n")
+                    print(f"  {loop_guard.report()}\n")
+                elif turn_plan and all(ok for _, _, ok in turn_plan):
+                    # Every call succeeded: remember the plan for utterances of the same shape
+                    plan_cache.store(user_input, [(name, args) for name, args, _ in turn_plan])
+                if router.small:
+                    print(f"  {router.report()}\n")
+                if backends_spec:
+                    print(f"{session.report()}\n")
                     
             except Exception as e:
                 print(f"❌ Error: {e}\n")
@@ -1,177 +1,358 @@
-import ollama
 import os
-from dotenv import load_dotenv, set_key, unset_key, find_dotenv
-from pathlib import Path
-from module.audio import whisper_transcription
+from contextlib import contextmanager
+from module.history import ConversationHistory, make_ollama_summarizer
+from module.streaming import stream_chat
+from module.env_store import EnvWriteError, get_env_store
+from module.env_tools import registry
+from module.intent_parser import IntentParser
+from module.llm_backends import BACKENDS_ENV, HEDGE_ENV, BackendRouter, build_backends
+from module.loop_guard import LoopGuard
+from module.model_router import SMALL_MODEL_ENV, ModelRouter
+from module.plan_cache import PlanCache
+from module.profiling import profile_turn
+from module.ollama_session import OllamaSession
+from module.tool_registry import ToolValidationError
+from module.tracing import tracer
+from module.warmup import WARMUP_ENABLED, Warmup, open_microphone, warm_up_whisper
 
+# Set WHISPER_TWO_PASS=1 to show a tiny.en draft first and refine it with small.en
+TWO_PASS = os.getenv("WHISPER_TWO_PASS", "0") == "1"
 
-# Define .env manipulation functions
+# Set OLLAMA_STREAM=1 to print tokens as they arrive and run tools as soon as they are called
+STREAM = os.getenv("OLLAMA_STREAM", "0") == "1"
 
-def read_env_value(key: str) -> str:
+# Set OLLAMA_COMPACT_TOOLS=1 to constrain tool calls to a short JSON schema (fewer output tokens)
+COMPACT_TOOLS = os.getenv("OLLAMA_COMPACT_TOOLS", "0") == "1"
+
+
+def execute_tool_call(tool):
     """
-    Read a value from .env file
+    Run one tool call from the model
     
     Args:
-        key: The environment variable key to read
+        tool: The tool call (function name and arguments) from the model response
     
     Returns:
-        The value of the key or error message
+        Tool message for the conversation
     """
+    print(f"   📌 {tool.function.name}({tool.function.arguments})")
+    
+    # The same call already ran this turn: answer it from that result
+    earlier = loop_guard.lookup(tool.function.name, tool.function.arguments)
+    if earlier is not None:
+        print(f"   ♻️  Repeated call, earlier result: {earlier}")
+        return {
+            'role': 'tool',
+            'content': earlier,
+            'tool_name': tool.function.name
+        }
+    
     try:
-        dotenv_path = find_dotenv()
-        if not dotenv_path:
-            dotenv_path = ".env"
-        load_dotenv(dotenv_path, override=True)
-        value = os.getenv(key)
-        if value is None:
-            return f"❌ Key '{key}' not found in .env file"
-        return f"✅ {key}={value}"
-    except Exception as e:
-        return f"❌ Error reading .env: {str(e)}"
-
-
-def update_env_value(key: str, value: str) -> str:
+        result = registry.dispatch(tool.function.name, tool.function.arguments)
+    except ToolValidationError as e:
+        result = f"❌ Invalid tool call: {str(e)}"
+    print(f"   {result}")
+    loop_guard.record(tool.function.name, tool.function.arguments, result)
+    turn_plan.append((tool.function.name, dict(tool.function.arguments or {}), not result.startswith("❌")))
+    return {
+        'role': 'tool',
+        'content': result,
+        'tool_name': tool.function.name
+    }
+
+
+def print_token(text):
+    """Print streamed text, starting the assistant line on the first token"""
+    if not print_token.started:
+        print("\n🤖 Assistant: ", end='')
+        print_token.started = True
+    print(text, end='', flush=True)
+
+
+@contextmanager
+def env_batch(tool_results):
     """
-    Update or create a key-value pair in .env file
+    Group every .env write made by the tool calls of one response into a single file write
     
-    Args:
-        key: The environment variable key
-        value: The new value to set
+    Only a failed write is handled here; errors from the block itself (e.g. Ollama
+    being unreachable mid-stream) propagate unchanged and nothing is written.
     
-    Returns:
-        Success message
+    Args:
+        tool_results: Tool messages for this response; a failure note is added if the write fails
     """
     try:
-        dotenv_path = find_dotenv()
-        if not dotenv_path:
-            dotenv_path = ".env"
-            Path(dotenv_path).touch(mode=0o600, exist_ok=True)
-        
-        set_key(dotenv_path, key, value)
-        return f"✅ Updated: {key}={value}"
-    except Exception as e:
-        return f"❌ Error updating .env: {str(e)}"
+        with get_env_store().transaction(export=False):
+            yield
+    except EnvWriteError as e:
+        print(f"   ❌ Error writing .env: {e}")
+        turn_plan.append((None, {}, False))  # Never cache a plan whose writes failed
+        tool_results.append({
+            'role': 'tool',
+            'content': f"❌ Error writing .env, changes were not saved: {str(e)}",
+            'tool_name': 'update_env_value'
+        })
 
 
-def delete_env_value(key: str) -> str:
+def run_planned_calls(calls):
     """
-    Delete a key from .env file
+    Execute tool calls planned without the LLM (fast path or cached plan)
     
     Args:
-        key: The environment variable key to delete
-    
-    Returns:
-        Success message
+        calls: [(tool_name, arguments), ...]
     """
-    try:
-        dotenv_path = find_dotenv()
-        if not dotenv_path:
-            return "❌ .env file not found"
-        
-        unset_key(dotenv_path, key)
-        return f"✅ Deleted key: {key}"
-    except Exception as e:
-        return f"❌ Error deleting from .env: {str(e)}"
+    import ollama
+    tools = [
+        ollama.Message.ToolCall(function=ollama.Message.ToolCall.Function(name=name, arguments=arguments))
+        for name, arguments in calls
+    ]
+    conversation_history.append({'role': 'assistant', 'content': '', 'tool_calls': tools})
+    tool_results = []
+    with env_batch(tool_results):
+        for tool in tools:
+            tool_results.append(execute_tool_call(tool))
+    for tool_message in tool_results:
+        conversation_history.append(tool_message)
 
 
-def create_file(filename: str, content: str) -> str:
+def match_without_llm(text, record=True):
     """
-    Create a new file with content
+    Plan an utterance without the LLM: fast-path intent first, then the plan cache
     
     Args:
-        filename: The name of the file to create
-        content: The content to write to the file
+        text: The utterance
+        record: Count the match in the hit rates (False while speculating on a draft)
     
     Returns:
-        Success message
+        ("fast" or "cached", [(tool_name, arguments), ...]), or None to ask the LLM
     """
-    try:
-        with open(filename, 'w') as f:
-            f.write(content)
-        return f"✅ File '{filename}' created successfully!"
-    except Exception as e:
-        return f"❌ Error: {str(e)}"
-
-
-# Map function names to functions
-available_functions = {
-    'create_file': create_file,
-    'read_env_value': read_env_value,
-    'update_env_value': update_env_value,
-    'delete_env_value': delete_env_value,
-}
-
-# Initialize conversation history
-conversation_history = []
-
-print("🤖 Ollama Assistant with .env Tools")
-print("=" * 50)
-print("Commands:")
-print("  - Type your request (e.g., 'Update my in .env to NewValue')")
-print("  - Type 'exit' or 'quit' to stop")
-print("=" * 50)
-
-# # Main interactive loop
-# while True:
-#     # Get user input
-#     user_input = input("\n👤 You: ").strip()
-    
-#     # Check for exit commands
-#     if user_input.lower() in ['exit', 'quit', 'bye', 'q']:
-#         print("\n👋 Goodbye!")
-#         break
-    
-#     if not user_input:
-#         continue
-
-while True:   
-    user_input = whisper_transcription()
-    if user_input is None:
-        print("❌ No transcription received.")
-        break
-    
-    # Add user message to conversation
-    conversation_history.append({
-        'role': 'user',
-        'content': user_input
-    })
-    
-    # Agent loop for this turn
-    while True:
-        response = ollama.chat(
+    intent = fast_path.parse(text, record=record)
+    if intent:
+        return "fast", [intent]
+    plan = plan_cache.lookup(text, record=record)
+    if plan:
+        return "cached", plan
+    return None
+
+
+def record_match(text, match):
+    """Count a speculative match_without_llm() result that is being acted on"""
+    fast_path.record(match[1][0] if match and match[0] == "fast" else None)
+    if not match or match[0] == "cached":
+        plan_cache.record(text, match is not None)
+
+
+def stop_agent_loop():
+    """Print why the loop stopped and close the turn so the history stays well-formed"""
+    print(f"\n⚠️  Stopped: {loop_guard.stop_reason}")
+    conversation_history.append({'role': 'assistant', 'content': f"(Stopped: {loop_guard.stop_reason})"})
+
+
+# Formulaic commands ("set X to Y", "delete key X") skip the LLM entirely
+fast_path = IntentParser(registry)
+
+# Tool-call plans from the LLM, replayed for utterances with the same shape
+plan_cache = PlanCache(max_plans=int(os.getenv("PLAN_CACHE_SIZE", "256")))
+turn_plan = []  # (tool_name, arguments, succeeded) for the current turn
+
+# Repeated tool calls are answered from earlier results; non-progressing loops are cut
+loop_guard = LoopGuard(max_rounds=int(os.getenv("MAX_TOOL_ROUNDS", "8")))
+
+
+# Initialize conversation history (bounded; old turns are summarized by the chat model,
+# whose session is set up in main())
+conversation_history = ConversationHistory(token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "1500")))
+
+
+def main():
+    """Console entry point: load the models, then listen and answer until transcription stops"""
+    # Set LLM_BACKENDS (e.g. "ollama:llama3.2,ollama:llama3.2@http://gpu-box:11434") to send
+    # each call to the fastest healthy backend; LLM_HEDGE=1 also hedges slow calls
+    backends_spec = os.getenv(BACKENDS_ENV)
+    if backends_spec:
+        session = BackendRouter(
+            build_backends(
+                backends_spec,
+                registry,
+                keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+                compact_tools=COMPACT_TOOLS
+            ),
+            hedge=os.getenv(HEDGE_ENV, "0") == "1"
+        )
+    else:
+        # Keeps llama3.2 loaded between turns and sends the same tool prefix every round
+        session = OllamaSession(
             model='llama3.2',
-            messages=conversation_history,
-            tools=[create_file, read_env_value, update_env_value, delete_env_value]
+            tools=registry.ollama_tools(),
+            keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+            compact_tools=COMPACT_TOOLS
         )
+
+    # Summaries go through the session so they keep its keep_alive and num_ctx
+    conversation_history.summarizer = make_ollama_summarizer(session)
+
+    # Set OLLAMA_SMALL_MODEL (e.g. llama3.2:1b) to answer simple one-step requests with a
+    # smaller model; invalid tool calls from it are retried on llama3.2
+    small_model = os.getenv(SMALL_MODEL_ENV)
+    router = ModelRouter(
+        large=session,
+        small=OllamaSession(
+            model=small_model,
+            tools=registry.ollama_tools(),
+            keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+            compact_tools=COMPACT_TOOLS
+        ) if small_model else None,
+        registry=registry
+    )
+
+    print("🤖 Ollama Assistant with .env Tools")
+    print("=" * 50)
+    print("Commands:")
+    print("  - Type your request (e.g., 'Update my in .env to NewValue')")
+    print("  - Type 'exit' or 'quit' to stop")
+    print("=" * 50)
+
+    # Load Whisper (and import faster-whisper), load llama3.2 in Ollama and open the
+    # microphone at the same time, instead of one after another on the first turn
+    if WARMUP_ENABLED:
+        warmup = Warmup()
+        warmup.add("whisper", warm_up_whisper, "small.en", required=True)
+        if TWO_PASS:
+            warmup.add("whisper draft", warm_up_whisper, "tiny.en", "int8")
+        warmup.add("ollama", session.preload, required=True)
+        if router.small:
+            warmup.add("ollama small", router.small.preload)
+        warmup.add("microphone", open_microphone, required=True)
+        if not warmup.run():
+            print("❌ Not starting: a required start-up task failed (see above)")
+            return
+
+    # Imported after the warm-up so faster-whisper loads in the warm-up thread
+    from module.audio import whisper_transcription, whisper_transcription_two_pass
+
+    while True:   
+        # Capture, transcription, LLM rounds and tools share one trace id (and one profile)
+        profile_turn(tracer.new_turn())
+        draft = {}
+        if TWO_PASS:
+            # The draft is matched against the fast path and plan cache while it is refined
+            transcript = whisper_transcription_two_pass(
+                on_draft=lambda text: draft.update(text=text, match=match_without_llm(text, record=False))
+            )
+            # The draft's match is only used if the refinement confirms the draft
+            user_input = transcript.wait_final() if transcript else None
+            if transcript:
+                print(f"⏱️  Draft: {transcript.draft_latency:.2f}s | Final: {transcript.final_latency:.2f}s")
+        else:
+            user_input = whisper_transcription()
+        if user_input is None:
+            print("❌ No transcription received.")
+            break
         
-        # Add assistant response to history
-        conversation_history.append(response.message)
+        # "Forget that" drops the cached plan that was just replayed
+        if plan_cache.is_forget_command(user_input):
+            if plan_cache.invalidate_last():
+                print("🗑️  Forgot the last cached plan")
+            else:
+                print("ℹ️  No cached plan to forget")
+            continue
         
-        # Display assistant's text response
-        if response.message.content:
-            print(f"\n🤖 Assistant: {response.message.content}")
+        # Add user message to conversation
+        conversation_history.append({
+            'role': 'user',
+            'content': user_input
+        })
+        turn_plan.clear()
+        loop_guard.start_turn()
+        router.start_turn(user_input)
         
-        # Check for tool calls
-        if response.message.tool_calls:
-            print(f"\n🔧 Executing {len(response.message.tool_calls)} tool(s):")
-            
-            for tool in response.message.tool_calls:
-                print(f"   📌 {tool.function.name}({tool.function.arguments})")
+        # Fast path: a confident pattern match runs the tool without an LLM round-trip.
+        # Plan cache: the same request shape replays the earlier tool calls with new values.
+        if draft and draft['text'] == user_input:
+            match = draft['match']
+            record_match(user_input, match)
+        else:
+            match = match_without_llm(user_input)  # Single pass, or the refinement changed the text
+        if match:
+            source, calls = match
+            print("\n⚡ Fast path:" if source == "fast" else "\n📦 Cached plan:")
+            run_planned_calls(calls)
+            print(fast_path.report() if source == "fast" else plan_cache.report())
+            continue
+        
+        # Agent loop for this turn
+        while True:
+            if STREAM:
+                # Tools run while the rest of the response is still streaming
+                tool_results = []
+                print_token.started = False
+                # All .env edits from this response are written once when the stream ends
+                with env_batch(tool_results):
+                    message, timing = stream_chat(
+                        router.chat,
+                        on_tool_call=lambda tool: tool_results.append(execute_tool_call(tool)),
+                        on_token=print_token,
+                        messages=conversation_history.messages()
+                    )
+                print(f"\n{timing.report()}")
+                if router.last_stats:
+                    print(f"📊 {router.last_stats.report()}")
                 
-                # Execute function
-                function_to_call = available_functions.get(tool.function.name)
-                if function_to_call:
-                    result = function_to_call(**tool.function.arguments)
-                    print(f"   {result}")
-                    
-                    # Add tool result to conversation
-                    conversation_history.append({
-                        'role': 'tool',
-                        'content': result,
-                        'tool_name': tool.function.name
-                    })
+                conversation_history.append(message)
+                for tool_message in tool_results:
+                    if tool_message:
+                        conversation_history.append(tool_message)
+                
+                if not message.get('tool_calls'):
+                    break
+                if not loop_guard.end_round():
+                    stop_agent_loop()
+                    break
+                continue
             
-            print()  # Blank line after tools
-        else:
-            # No more tool calls, break inner loop and wait for next user input
-            break
+            response = router.chat(conversation_history.messages())
+            print(f"📊 {router.current.model}: {router.last_stats.report()}")
+            
+            # Add assistant response to history
+            conversation_history.append(response.message)
+            
+            # Display assistant's text response
+            if response.message.content:
+                print(f"\n🤖 Assistant: {response.message.content}")
+            
+            # Check for tool calls
+            if response.message.tool_calls:
+                print(f"\n🔧 Executing {len(response.message.tool_calls)} tool(s):")
+                
+                # All .env edits from this response are written in one transaction
+                tool_results = []
+                with env_batch(tool_results):
+                    for tool in response.message.tool_calls:
+                        tool_results.append(execute_tool_call(tool))
+                
+                # Add tool results to conversation
+                for tool_message in tool_results:
+                    if tool_message:
+                        conversation_history.append(tool_message)
+                
+                print()  # Blank line after tools
+                if not loop_guard.end_round():
+                    stop_agent_loop()
+                    break
+            else:
+                # No more tool calls, break inner loop and wait for next user input
+                break
+        
+        # Cache the plan only if every tool call in it succeeded and the guard did not cut the turn
+        if turn_plan and all(ok for _, _, ok in turn_plan) and not loop_guard.stop_reason:
+            plan_cache.store(user_input, [(name, arguments) for name, arguments, _ in turn_plan])
+        print(fast_path.report())
+        if loop_guard.repeats_answered or loop_guard.loops_cut or loop_guard.round_limit_hits:
+            print(loop_guard.report())
+        if router.small:
+            print(router.report())
+        if backends_spec:
+            print(session.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,129 @@
 import os
 import dotenv
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from google.genai import types
+from module.env_store import EnvWriteError, get_env_store
+from module.streaming import stream_gemini
+from module.tool_registry import ToolRegistry, ToolValidationError
 
 dotenv.load_dotenv()
 
+env_store = get_env_store()
+
 def change_setting(key: str, value: str) -> str:
     """Updates key-value pairs in the .env file."""
     env_key = key.upper().replace(" ", "_")
-    dotenv.set_key(".env", env_key, str(value))
-    dotenv.load_dotenv(override=True) 
+    # Writes the key and updates os.environ without re-parsing the whole file
+    env_store.set(env_key, str(value))
     print(f"\n[SYSTEM]: Changed {env_key} to {value}")
     return f"Confirmed. I have updated {env_key} to {value}."
 
+# Tool schemas are built once at startup and shared with the Gemini config
+tools = ToolRegistry()
+tools.register(change_setting)
+
+# Tools that write .env; their calls share one transaction (one file write per response)
+ENV_WRITERS = {"change_setting"}
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", "8"))
+
+# Set GEMINI_STREAM=1 to print replies as they stream in
+STREAM = os.getenv("GEMINI_STREAM", "0") == "1"
+
+# Set GEMINI_FAKE=1 to talk to the offline stand-in client (no network, no API key)
+FAKE = os.getenv("GEMINI_FAKE", "0") == "1"
+
+
+def call_tool(function_call):
+    """Run one Gemini function call and return the result text"""
+    try:
+        return tools.dispatch(function_call.name, dict(function_call.args or {}))
+    except ToolValidationError as e:
+        return f"Error: {e}"
+
+
+def function_calls(response) -> list:
+    """Every function call in a response, in order"""
+    content = response.candidates[0].content if response.candidates else None
+    return [part.function_call for part in (content.parts if content and content.parts else [])
+            if getattr(part, 'function_call', None)]
+
+
+def print_text(response):
+    content = response.candidates[0].content if response.candidates else None
+    for part in (content.parts if content and content.parts else []):
+        if part.text:
+            print(f"AI: {part.text}")
+
+
+def print_token(text):
+    """Print streamed text, starting the AI line on the first chunk"""
+    if not print_token.started:
+        print("AI: ", end='')
+        print_token.started = True
+    print(text, end='', flush=True)
+
+
+def send(chat, message) -> list:
+    """
+    Send a message, print the reply and return its function calls
+
+    In streaming mode text is printed chunk by chunk and time-to-first-chunk is reported.
+    """
+    if not STREAM:
+        response = chat.send_message(message)
+        print_text(response)
+        return function_calls(response)
+
+    print_token.started = False
+    _, calls, timing = stream_gemini(chat, message, on_token=print_token)
+    if print_token.started:
+        print()
+    print(timing.report())
+    return calls
+
+
+def run_function_calls(calls, executor) -> list:
+    """
+    Run every function call of one response and build the replies for a single send_message
+
+    .env writes run together in one transaction; calls to other tools are
+    independent and run concurrently in the executor meanwhile.
+
+    Returns:
+        One function-response Part per call, in call order
+    """
+    results = [None] * len(calls)
+    futures = {
+        i: executor.submit(call_tool, call)
+        for i, call in enumerate(calls) if call.name not in ENV_WRITERS
+    }
+    env_calls = [i for i, call in enumerate(calls) if call.name in ENV_WRITERS]
+    try:
+        with env_store.transaction():
+            for i in env_calls:
+                results[i] = call_tool(calls[i])
+    except EnvWriteError as e:
+        for i in env_calls:
+            results[i] = f"Error writing .env, changes were not saved: {e}"
+    for i, future in futures.items():
+        results[i] = future.result()
+
+    return [
+        types.Part.from_function_response(name=call.name, response={'result': result})
+        for call, result in zip(calls, results)
+    ]
+
 def run_chatbot():
-    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    if FAKE:
+        from module.gemini_stub import FakeGeminiClient
+        client = FakeGeminiClient(first_chunk_latency=0.3, chunk_latency=0.02)
+    else:
+        client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
     
     # Create config with function tool
     config = types.GenerateContentConfig(
-        tools=[change_setting],
+        tools=tools.gemini_tools(),
         system_instruction="You are a system manager. Use 'change_setting' tool to update .env files."
     )
     
@@ -27,6 +132,7 @@ def run_chatbot():
     
     # Create chat session
     chat = client.chats.create(model="gemini-2.5-flash", config=config)
+    tool_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tools")
     
     while True:
         try:
@@ -34,31 +140,23 @@ def run_chatbot():
             if user_input.lower() in ['exit', 'quit']:
                 break
             
-            response = chat.send_message(user_input)
+            calls = send(chat, user_input)
             
-            # Process response parts
-            for part in response.candidates[0].content.parts:
-                if hasattr(part, 'function_call') and part.function_call:
-                    # Execute the function
-                    result = change_setting(**dict(part.function_call.args))
-                    
-                    # Send function result back to model
-                    tool_response = chat.send_message(
-                        types.Part.from_function_response(
-                            name=part.function_call.name,
-                            response={'result': result}
-                        )
-                    )
-                    if tool_response.text:
-                        print(f"AI: {tool_response.text}")
-                elif part.text:
-                    print(f"AI: {part.text}")
+            # All calls of a response go back in one message; repeat until the model stops calling
+            rounds = 0
+            while calls:
+                if rounds >= MAX_TOOL_ROUNDS:
+                    print(f"[SYSTEM]: Stopped after {MAX_TOOL_ROUNDS} tool rounds")
+                    break
+                calls = send(chat, run_function_calls(calls, tool_executor))
+                rounds += 1
                     
         except KeyboardInterrupt:
             print("\nClosed by user.")
             break
         except Exception as e:
             print(f"[ERROR]: {e}")
+    tool_executor.shutdown()
 
 if __name__ == "__main__":
     run_chatbot()
@@ -0,0 +1,348 @@
+# AI_Voice/module/async_agent.py
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from .env_store import EnvWriteError, get_env_store
+from .env_tools import registry
+from .history import SUMMARY_OPTIONS, ConversationHistory, summary_messages
+from .intent_parser import IntentParser
+from .loop_guard import LoopGuard
+from .ollama_session import OllamaSession
+from .plan_cache import PlanCache
+from .tool_registry import ToolValidationError
+from .tracing import in_context, tracer
+
+
+MODEL = 'llama3.2'
+MAX_TOOL_ROUNDS = 8
+QUEUE_SIZE = 2  # Utterances buffered between stages before capture waits
+
+
+def run_tool_batch(tool_calls) -> list:
+    """
+    Run every tool call of one response in a single .env transaction (executor thread)
+
+    Args:
+        tool_calls: [(tool_name, arguments), ...]
+
+    Returns:
+        [(tool_name, arguments, result), ...]
+    """
+    results = []
+    try:
+        with get_env_store().transaction(export=False):
+            for name, arguments in tool_calls:
+                try:
+                    result = registry.dispatch(name, arguments)
+                except ToolValidationError as e:
+                    result = f"❌ Invalid tool call: {str(e)}"
+                results.append((name, arguments, result))
+    except EnvWriteError as e:
+        results.append(("update_env_value", {}, f"❌ Error writing .env, changes were not saved: {str(e)}"))
+    return results
+
+
+class AsyncVoiceAgent:
+    """
+    Voice agent whose stages run concurrently
+
+    capture -> audio_queue -> transcribe -> text_queue -> agent
+
+    Capture and transcription run in executor threads, so the next utterance is
+    recorded and transcribed while the current LLM and tool round is in progress.
+    With barge_in enabled, a new utterance cancels the turn that is still running.
+
+    Transcription is single-pass (small.en): the draft/refine mode of WHISPER_TWO_PASS
+    is only used by lamma_in_action, since here the next utterance is already being
+    transcribed while a turn runs.
+    """
+
+    def __init__(
+        self,
+        capture: Callable = None,
+        transcribe: Callable = None,
+        client=None,
+        model: str = MODEL,
+        barge_in: bool = False,
+        session: Optional[OllamaSession] = None,
+        scheduler=None,
+        name: str = "local",
+        tool_executor: Optional[ThreadPoolExecutor] = None
+    ):
+        """
+        Args:
+            capture: Returns one utterance of audio (default: the microphone)
+            transcribe: Turns audio into text (default: Whisper small.en)
+            client: ollama.AsyncClient used when no session is given
+            model: Ollama model name
+            barge_in: Cancel the running turn when a new utterance arrives
+            session: OllamaSession shared with other agents (e.g. one per server)
+            scheduler: FairScheduler that admits this agent's LLM requests
+            name: Identifies this agent to the scheduler
+            tool_executor: Executor shared with other agents; it is not shut down here
+        """
+        if capture is None:
+            from .audio_capture import record_audio
+            capture = record_audio
+        if transcribe is None:
+            from .audio import transcribe_audio
+            transcribe = transcribe_audio
+        if client is None and session is None:
+            import ollama
+            client = ollama.AsyncClient()
+
+        self.capture = capture
+        self.transcribe = transcribe
+        self.barge_in = barge_in
+        self.session = session or OllamaSession(model=model, client=client, tools=registry.ollama_tools())
+        self.scheduler = scheduler
+        self.name = name
+        self.history = ConversationHistory(summarizer=self.summarize)
+        self.fast_path = IntentParser(registry)
+        self.plan_cache = PlanCache()
+        self.loop_guard = LoopGuard(max_rounds=MAX_TOOL_ROUNDS)
+
+        self.audio_queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.text_queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
+        self.asr_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asr")
+        self._owns_tool_executor = tool_executor is None
+        self.tool_executor = tool_executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="tools")
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # Set by run_turn()
+        self.current_turn: Optional[asyncio.Task] = None
+        self.tasks = []
+        self.stopping = asyncio.Event()
+        self.turns_completed = 0
+        self.turns_cancelled = 0
+
+    # Stages
+
+    async def capture_stage(self):
+        loop = asyncio.get_running_loop()
+        while not self.stopping.is_set():
+            start = time.perf_counter()
+            audio = await loop.run_in_executor(self.capture_executor, in_context(self.capture))
+            if audio is None:
+                print("❌ No audio captured, stopping after pending turns.")
+                await self.drain()
+                await self.stop()
+                return
+            print(f"🎤 Captured [{time.perf_counter() - start:.2f}s]")
+            await self.audio_queue.put(audio)
+
+    async def transcribe_stage(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            audio = await self.audio_queue.get()
+            start = time.perf_counter()
+            try:
+                text = await loop.run_in_executor(self.asr_executor, in_context(self.transcribe, audio))
+            except Exception as e:
+                print(f"❌ Transcription error: {e}")
+                text = None
+            finally:
+                self.audio_queue.task_done()
+            if text:
+                print(f"📝 [{time.perf_counter() - start:.2f}s] {text}")
+                await self.text_queue.put(text)
+
+    async def agent_stage(self):
+        while True:
+            text = await self.text_queue.get()
+            try:
+                if self.current_turn and not self.current_turn.done():
+                    if self.barge_in:
+                        print("\n✋ Barge-in: cancelling the current turn")
+                        self.current_turn.cancel()
+                    # Without barge-in the utterance waits for the running turn
+                    await asyncio.gather(self.current_turn, return_exceptions=True)
+                self.current_turn = asyncio.create_task(self.run_turn(text))
+            finally:
+                self.text_queue.task_done()
+
+    # Turn handling
+
+    def summarize(self, transcript: str) -> str:
+        """
+        History summarizer (runs in the history's summary thread)
+
+        The request goes through the shared session on the agent's event loop, so it
+        uses the same client, keep_alive and num_ctx as the chat calls.
+        """
+        request = self.session.achat(summary_messages(transcript), tools=False, **SUMMARY_OPTIONS)
+        with tracer.span("llm.summarize", model=self.session.model):
+            response = asyncio.run_coroutine_threadsafe(request, self.loop).result()
+        return response['message']['content'].strip()  # ollama responses are subscriptable too
+
+    async def chat(self):
+        """One LLM round, admitted by the scheduler when several agents share the model"""
+        if self.scheduler is None:
+            return await self.session.achat(self.history.messages())
+        async with self.scheduler.slot(self.name):
+            return await self.session.achat(self.history.messages())
+
+    async def run_tools(self, calls) -> list:
+        """
+        Run a tool batch in the tool executor
+
+        A batch that has not started yet is dropped when the turn is cancelled. One
+        that has started cannot be stopped (its .env writes will commit), so
+        cancellation waits for it and records its results before the turn ends.
+        """
+        future = self.tool_executor.submit(in_context(run_tool_batch, calls))
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            if not future.cancel():
+                results = await asyncio.wrap_future(future)
+                print("   ⚠️  Turn cancelled while its tools were running; keeping their results")
+                self._append_results(calls, results)
+            raise
+
+    def _append_results(self, calls, results) -> bool:
+        """Add one assistant tool-call message plus its results; True if every call succeeded"""
+        self.history.append({
+            'role': 'assistant',
+            'content': '',
+            'tool_calls': [{'function': {'name': n, 'arguments': a}} for n, a in calls]
+        })
+        ok = True
+        for name, _, result in results:
+            print(f"   📌 {name}: {result}")
+            ok = ok and not str(result).startswith("❌")
+            self.history.append({'role': 'tool', 'content': str(result), 'tool_name': name})
+        return ok
+
+    async def run_turn(self, text: str):
+        start = time.perf_counter()
+        self.loop = asyncio.get_running_loop()
+        tracer.new_turn()  # Runs in its own task, so the trace id does not leak into other turns
+        self.history.append({'role': 'user', 'content': text})
+        try:
+            await self._run_turn(text)
+            self.turns_completed += 1
+        except asyncio.CancelledError:
+            self.turns_cancelled += 1
+            # Close the turn so the history stays a valid user/assistant sequence
+            self.history.append({'role': 'assistant', 'content': '(interrupted by the user)'})
+            raise
+        finally:
+            print(f"⏱️  Turn: {time.perf_counter() - start:.2f}s")
+
+    async def _run_turn(self, text: str):
+        if self.plan_cache.is_forget_command(text):
+            print("🗑️  Forgot the last cached plan" if self.plan_cache.invalidate_last() else "ℹ️  No cached plan to forget")
+            return
+
+        planned = None
+        intent = self.fast_path.parse(text)
+        if intent:
+            planned = [intent]
+            print("⚡ Fast path:")
+        else:
+            planned = self.plan_cache.lookup(text)
+            if planned:
+                print("📦 Cached plan:")
+        if planned:
+            self._append_results(planned, await self.run_tools(planned))
+            return
+
+        self.loop_guard.start_turn()
+        turn_plan, turn_ok = [], True
+        while True:
+            response = await self.chat()
+            message = response.message
+            if message.content:
+                print(f"\n🤖 Assistant: {message.content}")
+
+            calls = [(c.function.name, dict(c.function.arguments or {})) for c in message.tool_calls or []]
+            if not calls:
+                self.history.append(message)
+                break
+
+            # Calls that already ran this turn are answered from their earlier result
+            earlier = [self.loop_guard.lookup(name, arguments) for name, arguments in calls]
+            fresh = [call for call, result in zip(calls, earlier) if result is None]
+            fresh_results = iter(await self.run_tools(fresh) if fresh else [])
+            results = []
+            for (name, arguments), result in zip(calls, earlier):
+                if result is None:
+                    _, _, result = next(fresh_results)
+                    self.loop_guard.record(name, arguments, result)
+                    turn_plan.append((name, arguments))
+                else:
+                    print(f"   ♻️  Repeated call {name}, using the earlier result")
+                results.append((name, arguments, result))
+            results.extend(fresh_results)  # e.g. a failed .env write
+            turn_ok = self._append_results(calls, results) and turn_ok
+
+            if not self.loop_guard.end_round():
+                print(f"\n⚠️  Stopped: {self.loop_guard.stop_reason}")
+                self.history.append({'role': 'assistant', 'content': f"(Stopped: {self.loop_guard.stop_reason})"})
+                turn_ok = False
+                break
+
+        if turn_plan and turn_ok:
+            self.plan_cache.store(text, turn_plan)
+
+    # Lifecycle
+
+    async def run(self):
+        """Run all stages until stop() is called or capture fails"""
+        self.tasks = [
+            asyncio.create_task(self.capture_stage(), name="capture"),
+            asyncio.create_task(self.transcribe_stage(), name="transcribe"),
+            asyncio.create_task(self.agent_stage(), name="agent"),
+        ]
+        try:
+            await self.stopping.wait()
+        finally:
+            await self.shutdown()
+
+    async def drain(self):
+        """Wait until every queued utterance has been transcribed and answered"""
+        await self.audio_queue.join()
+        await self.text_queue.join()
+        if self.current_turn:
+            await asyncio.gather(self.current_turn, return_exceptions=True)
+
+    async def stop(self):
+        self.stopping.set()
+
+    async def shutdown(self):
+        """Cancel every stage and the running turn, then release the executors"""
+        for task in [*self.tasks, self.current_turn]:
+            if task and not task.done():
+                task.cancel()
+        await asyncio.gather(*[t for t in [*self.tasks, self.current_turn] if t], return_exceptions=True)
+        executors = [self.capture_executor, self.asr_executor]
+        if self._owns_tool_executor:
+            executors.append(self.tool_executor)
+        for executor in executors:
+            # Threads blocked in recording/decoding finish on their own
+            executor.shutdown(wait=False, cancel_futures=True)
+        print(f"👋 Turns completed: {self.turns_completed}, cancelled: {self.turns_cancelled}")
+        print(self.loop_guard.report())
+
+
+def main():
+    print("🤖 Async Ollama Assistant with .env Tools")
+    print("=" * 50)
+    agent_kwargs = {'barge_in': os.getenv("VOICE_BARGE_IN", "0") == "1"}
+
+    async def run():
+        await AsyncVoiceAgent(**agent_kwargs).run()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n👋 Interrupted!")
+
+
+if __name__ == "__main__":
+    main()
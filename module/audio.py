@@ -1,10 +1,77 @@
 # AI_Voice/audio.py
 
-from faster_whisper import WhisperModel
-from .audio_capture import record_audio
+from .audio_capture import RATE, record_audio
 import sys
+import threading
+import time
+from typing import TYPE_CHECKING
 
+from .profiling import profiled
+from .tracing import in_context, tracer
 
+if TYPE_CHECKING:
+    from faster_whisper import WhisperModel
+
+
+# Two-pass settings: a fast greedy draft, then a beam-search refinement
+DRAFT_MODEL = "tiny.en"
+REFINE_MODEL = "small.en"
+
+# Loaded models keyed by (size, compute_type) so repeat turns skip the load
+_models = {}
+_models_lock = threading.Lock()  # Guards _load_locks only
+_load_locks = {}  # One lock per key, so different models load concurrently
+
+
+def load_whisper_model(model_size: str = REFINE_MODEL, compute_type: str = "float32") -> "WhisperModel":
+    """
+    Load a Whisper model once and reuse it for every later call
+    
+    Args:
+        model_size: Model size: tiny.en, base.en, small.en, medium.en, large-v3
+        compute_type: int8 (faster) or float32 (more accurate)
+    
+    Returns:
+        The cached WhisperModel instance
+    """
+    key = (model_size, compute_type)
+    with _models_lock:
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+    with tracer.span("asr.load_model", model=model_size) as span, load_lock:
+        model = _models.get(key)
+        span.set(cached=model is not None)
+        if model is None:
+            # faster-whisper pulls in ctranslate2 and onnxruntime: imported on first load only
+            from faster_whisper import WhisperModel
+            model = WhisperModel(
+                model_size,
+                device="cpu",  # Device: cpu or cuda
+                compute_type=compute_type,
+                num_workers=4,  # Number of parallel workers
+                cpu_threads=8  # CPU threads (adjust based on your CPU)
+            )
+            _models[key] = model
+    return model
+
+
+def warm_up_whisper_model(model_size: str = REFINE_MODEL, compute_type: str = "float32") -> None:
+    """
+    Load a model and decode one second of silence so the first real transcription
+    does not pay for model setup and the first decoder run
+    """
+    import numpy as np
+    model = load_whisper_model(model_size, compute_type=compute_type)
+    segments, _ = model.transcribe(
+        np.zeros(RATE, dtype=np.float32),
+        language="en",
+        beam_size=1,
+        vad_filter=False,
+        without_timestamps=True,
+    )
+    list(segments)  # Decoding is lazy
+
+
+@profiled("asr.whisper_transcription")
 def whisper_transcription():
     """whisper_transcription transcription workflow"""
     print("="*60)
@@ -29,13 +96,7 @@ def whisper_transcription():
     # 3. Initialize Whisper model
     print("📝 Loading Whisper model...")
     try:
-        model = WhisperModel(
-            "small.en",  # Model size: tiny, base, small, medium, large-v3
-            device="cpu",  # Device: cpu or cuda
-            compute_type="float32",  # Compute type: int8 (faster) or float32 (more accurate)
-            num_workers=4,  # Number of parallel workers
-            cpu_threads=8  # CPU threads (adjust based on your CPU)
-        )
+        model = load_whisper_model(REFINE_MODEL, compute_type="float32")
         print("✅ Model loaded successfully\n")
     except Exception as e:
         print(f"❌ Failed to load model: {e}")
@@ -46,38 +107,40 @@ def whisper_transcription():
     print("🎯 Transcribing...\n")
     
     try:
-        segments, info = model.transcribe(
-            audio_data,
-            language="en",  # Language code or None for auto-detect
-
-            patience=1.0,                 # Higher values (e.g. 2.0) make beam search more thorough
-
-            # VAD (Voice Activity Detection) - removes silence
-            vad_filter=True,
-            vad_parameters=dict(
-                threshold=0.5,  # 0.0-1.0, higher = more aggressive filtering
-                min_speech_duration_ms=250,  # Minimum speech segment length
-                max_speech_duration_s=float('inf'),  # Maximum speech segment length
-                min_silence_duration_ms=2000,  # Minimum silence to split segments
-                speech_pad_ms=400  # Padding around speech segments
-                # NOTE: window_size_samples is NOT a valid parameter - it's hardcoded
-            ),
+        with tracer.span("asr.transcribe", beam_size=5):
+            segments, info = model.transcribe(
+                audio_data,
+                language="en",  # Language code or None for auto-detect
+
+                patience=1.0,                 # Higher values (e.g. 2.0) make beam search more thorough
+
+                # VAD (Voice Activity Detection) - removes silence
+                vad_filter=True,
+                vad_parameters=dict(
+                    threshold=0.5,  # 0.0-1.0, higher = more aggressive filtering
+                    min_speech_duration_ms=250,  # Minimum speech segment length
+                    max_speech_duration_s=float('inf'),  # Maximum speech segment length
+                    min_silence_duration_ms=2000,  # Minimum silence to split segments
+                    speech_pad_ms=400  # Padding around speech segments
+                    # NOTE: window_size_samples is NOT a valid parameter - it's hardcoded
+                ),
             
-            # Hallucination prevention parameters
-            beam_size=5,  # Higher = more accurate but slower (1-10)
-            best_of=5,  # Number of candidates to consider
-            temperature=0.0,  # Use 0.0 for deterministic output
-            compression_ratio_threshold=2.4,  # Detect repetitive text
-            log_prob_threshold=-1.0,  # Filter low confidence predictions
-            no_speech_threshold=0.6,  # Threshold for detecting silence
-            condition_on_previous_text=False,  # Reduce context-based hallucinations
+                # Hallucination prevention parameters
+                beam_size=5,  # Higher = more accurate but slower (1-10)
+                best_of=5,  # Number of candidates to consider
+                temperature=0.0,  # Use 0.0 for deterministic output
+                compression_ratio_threshold=2.4,  # Detect repetitive text
+                log_prob_threshold=-1.0,  # Filter low confidence predictions
+                no_speech_threshold=0.6,  # Threshold for detecting silence
+                condition_on_previous_text=False,  # Reduce context-based hallucinations
             
-            # Optional: Word-level timestamps
-            word_timestamps=False,  # Set True for word-by-word timing
+                # Optional: Word-level timestamps
+                word_timestamps=False,  # Set True for word-by-word timing
             
-            # Optional: Initial prompt for better context
-            # initial_prompt="This is a conversation about technical topics."
-        )
+                # Optional: Initial prompt for better context
+                # initial_prompt="This is a conversation about technical topics."
+            )
+            segments = list(segments)  # Decoding happens while the segments are consumed
         
         # 5. Process and display results
         print("="*60)
@@ -134,6 +197,148 @@ def whisper_transcription():
         sys.exit(1)
         return None
 
+def _decode(model, audio_data, beam_size: int) -> str:
+    """Run one decode pass and join the non-empty segment texts"""
+    with tracer.span("asr.transcribe", beam_size=beam_size):
+        return _decode_segments(model, audio_data, beam_size)
+
+
+def _decode_segments(model, audio_data, beam_size: int) -> str:
+    segments, _ = model.transcribe(
+        audio_data,
+        language="en",
+        vad_filter=True,
+        beam_size=beam_size,
+        best_of=beam_size,
+        temperature=0.0,
+        compression_ratio_threshold=2.4,
+        log_prob_threshold=-1.0,
+        no_speech_threshold=0.6,
+        condition_on_previous_text=False,
+        word_timestamps=False,
+    )
+    return " ".join(s.text.strip() for s in segments if s.text.strip())
+
+
+def transcribe_audio(audio_data, model_size: str = REFINE_MODEL):
+    """
+    Transcribe already-recorded audio with a cached model (no recording, no exit on error)
+    
+    Args:
+        audio_data: numpy array (float32, 1D) from record_audio()
+        model_size: Whisper model size to use
+    
+    Returns:
+        The transcription, or None if no speech was found
+    """
+    text = _decode(load_whisper_model(model_size, compute_type="float32"), audio_data, beam_size=5)
+    return text or None
+
+
+class TwoPassTranscription:
+    """Draft text available immediately, refined text filled in by a background thread"""
+    
+    def __init__(self, draft: str, draft_latency: float):
+        self.draft = draft
+        self.draft_latency = draft_latency
+        self.final = None
+        self.final_latency = None
+        self.error = None
+        self._done = threading.Event()
+    
+    @property
+    def text(self) -> str:
+        """Best text so far: the refined text once ready, otherwise the draft"""
+        return self.final if self.final is not None else self.draft
+    
+    @property
+    def changed(self) -> bool:
+        """True when the refinement replaced the draft with different text"""
+        return self.final is not None and self.final != self.draft
+    
+    def is_final(self) -> bool:
+        return self._done.is_set()
+    
+    def wait_final(self, timeout=None) -> str:
+        """
+        Block until the refinement pass finishes
+        
+        Args:
+            timeout: Seconds to wait, or None to wait forever
+        
+        Returns:
+            The refined text, or the draft if refinement failed or timed out
+        """
+        self._done.wait(timeout)
+        return self.text
+
+
+def whisper_transcription_two_pass(
+    audio_data=None,
+    refine_model: str = REFINE_MODEL,
+    on_draft=None,
+    on_final=None
+):
+    """
+    Two-pass transcription: a tiny greedy draft right away, then a beam-search refinement
+    
+    Args:
+        audio_data: Audio to transcribe; recorded from the microphone when None
+        refine_model: Model size for the background refinement pass
+        on_draft: Optional callback(text) called as soon as the draft is ready, in the
+            calling thread while the refinement runs
+        on_final: Optional callback(result) called when the refinement finishes
+    
+    Returns:
+        TwoPassTranscription, or None if recording failed or no speech was found
+    """
+    if audio_data is None:
+        audio_data = record_audio()
+    if audio_data is None:
+        print("\n❌ Recording failed or no valid audio captured.")
+        return None
+    
+    # 1. Draft pass: tiny model, greedy decode
+    start = time.perf_counter()
+    try:
+        draft = _decode(load_whisper_model(DRAFT_MODEL, compute_type="int8"), audio_data, beam_size=1)
+    except Exception as e:
+        print(f"\n❌ Draft transcription error: {e}")
+        return None
+    draft_latency = time.perf_counter() - start
+    
+    if not draft:
+        print("⚠️  No speech detected in audio")
+        return None
+    
+    print(f"📝 Draft [{draft_latency:.2f}s]: {draft}")
+    result = TwoPassTranscription(draft, draft_latency)
+    
+    # 2. Refinement pass: larger model with beam search, in the background
+    def refine():
+        try:
+            final = _decode(load_whisper_model(refine_model, compute_type="float32"), audio_data, beam_size=5)
+            result.final = final or draft
+        except Exception as e:
+            result.error = e
+            print(f"\n⚠️  Refinement failed, keeping draft: {e}")
+        result.final_latency = time.perf_counter() - start
+        result._done.set()
+        
+        if result.changed:
+            print(f"✏️  Refined [{result.final_latency:.2f}s]: {result.final}")
+        else:
+            print(f"✅ Draft confirmed [{result.final_latency:.2f}s]")
+        if on_final:
+            on_final(result)
+    
+    # Refinement spans stay in this turn's trace
+    threading.Thread(target=in_context(refine), daemon=True).start()
+    if on_draft:
+        on_draft(draft)  # Runs while the refinement decodes
+    return result
+
+
 if __name__ == "__whisper_transcription__":
     try:
         whisper_transcription()
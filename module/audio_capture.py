@@ -1,17 +1,23 @@
 # AI_Voice/module/audio_capture.py
 
-import sounddevice as sd
+import os
 import threading
 import numpy as np
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 import time
 
+from .profiling import profiled
+from .tracing import tracer
+
 
 RATE = 16000
 MAX_DURATION = 10
 MIN_RMS_THRESHOLD = 0.01  # Minimum audio energy to consider valid
 MIN_DURATION = 0.5  # Minimum recording duration in seconds
 
+# Set VOICE_CAPTURE_FILES=a.wav:b.wav to replay recordings instead of using the microphone
+CAPTURE_FILES_ENV = "VOICE_CAPTURE_FILES"
+
 
 class AudioRecorder:
     """Thread-safe audio recorder with validation"""
@@ -78,6 +84,8 @@ class AudioRecorder:
             audio_data = audio_data / max_val * 0.95
         return audio_data
     
+    @profiled("capture.record_audio")
+    @tracer.traced("capture.record_audio")
     def record_audio(self) -> Optional[np.ndarray]:
         """
         Record audio with validation
@@ -85,6 +93,8 @@ class AudioRecorder:
         Returns:
             numpy array (float32, 1D) ready for Whisper, or None if invalid
         """
+        import sounddevice as sd  # Needs PortAudio; file replay works without it
+
         print("🎤 Recording... (Press Enter to stop, or wait 60 seconds)")
         
         # Reset state
@@ -179,6 +189,74 @@ class AudioRecorder:
         return audio_data
 
 
+def open_input_device(sample_rate=RATE) -> str:
+    """
+    Initialize PortAudio and open the default input once so the first recording starts immediately
+    
+    Returns:
+        Name of the input device
+    """
+    import sounddevice as sd
+    sd.check_input_settings(samplerate=sample_rate, channels=1)
+    with sd.InputStream(samplerate=sample_rate, channels=1, blocksize=int(sample_rate * 0.1), latency='low'):
+        pass
+    return sd.query_devices(kind='input')['name']
+
+
+class FileAudioRecorder(AudioRecorder):
+    """Replays recorded audio files in order instead of the microphone"""
+    
+    def __init__(self, paths: List[str], sample_rate=RATE):
+        super().__init__(sample_rate=sample_rate)
+        self.paths = list(paths)
+        self.position = 0
+        self.last_path = None
+        self.last_duration = 0.0
+    
+    @profiled("capture.record_audio")
+    @tracer.traced("capture.record_audio")
+    def record_audio(self) -> Optional[np.ndarray]:
+        """
+        Load the next file, resampled to mono at the recorder's sample rate
+        
+        Returns:
+            numpy array (float32, 1D) ready for Whisper, or None if no files are left or invalid
+        """
+        if self.position >= len(self.paths):
+            print("❌ No more audio files to replay")
+            return None
+        
+        path = self.paths[self.position]
+        self.position += 1
+        self.last_path = path
+        print(f"📂 Replaying {os.path.basename(path)}")
+        
+        try:
+            from faster_whisper.audio import decode_audio
+            audio_data = decode_audio(path, sampling_rate=self.sample_rate).astype(np.float32)
+        except Exception as e:
+            print(f"❌ Could not read {path}: {e}")
+            return None
+        
+        is_valid, message = self.validate_audio(audio_data)
+        if not is_valid:
+            print(f"❌ Invalid audio: {message}")
+            return None
+        
+        self.last_duration = len(audio_data) / self.sample_rate
+        return self.normalize_audio(audio_data)
+
+
+# Recorder used by record_audio(); None means a new microphone recorder per call
+_capture_source: Optional[AudioRecorder] = None
+
+
+def set_capture_source(recorder: Optional[AudioRecorder]) -> None:
+    """Make record_audio() use this recorder (e.g. a FileAudioRecorder); None restores the microphone"""
+    global _capture_source
+    _capture_source = recorder
+
+
 # Simple wrapper function for backward compatibility
 def record_audio() -> Optional[np.ndarray]:
     """
@@ -187,5 +265,9 @@ def record_audio() -> Optional[np.ndarray]:
     Returns:
         numpy array (float32, 1D) or None if recording failed
     """
+    if _capture_source is None and os.getenv(CAPTURE_FILES_ENV):
+        set_capture_source(FileAudioRecorder(os.getenv(CAPTURE_FILES_ENV).split(os.pathsep)))
+    if _capture_source is not None:
+        return _capture_source.record_audio()
     recorder = AudioRecorder(sample_rate=RATE, max_duration=MAX_DURATION)
     return recorder.record_audio()
@@ -0,0 +1,131 @@
+# AI_Voice/module/compact_calls.py
+
+import json
+from typing import List, Optional, Tuple
+
+
+# Set OLLAMA_COMPACT_TOOLS=1 to constrain tool calls to the compact JSON format below
+COMPACT_ENV = "OLLAMA_COMPACT_TOOLS"
+
+# Properties that only document a parameter; they don't constrain the output
+_DOC_KEYS = ("description", "title", "examples")
+
+
+def _value_schema(schema: dict) -> dict:
+    """A parameter schema without documentation keys (nested schemas included)"""
+    if not isinstance(schema, dict):
+        return schema
+    cleaned = {}
+    for key, value in schema.items():
+        if key in _DOC_KEYS:
+            continue
+        if isinstance(value, dict):
+            value = {k: _value_schema(v) for k, v in value.items()} if key == "properties" else _value_schema(value)
+        elif isinstance(value, list) and key in ("anyOf", "oneOf", "allOf"):
+            value = [_value_schema(v) for v in value]
+        cleaned[key] = value
+    return cleaned
+
+
+def compact_schema(tools: List[dict], max_reply_chars: Optional[int] = None) -> dict:
+    """
+    JSON schema for Ollama's `format` parameter: {"calls": [{tool: {args}}], "reply": text}
+
+    The tool name is the only key of each call object, so the model never spends
+    tokens on "name"/"arguments" wrappers, and the grammar only admits known tools
+    with their own parameters.
+
+    Args:
+        tools: Tool list in Ollama format (ToolRegistry.ollama_tools())
+        max_reply_chars: Optional cap on the reply text
+    """
+    variants = []
+    for tool in tools:
+        function = tool["function"]
+        parameters = function.get("parameters") or {}
+        arguments = {
+            "type": "object",
+            "properties": {k: _value_schema(v) for k, v in (parameters.get("properties") or {}).items()},
+            "required": list(parameters.get("required") or []),
+            "additionalProperties": False,
+        }
+        variants.append({
+            "type": "object",
+            "properties": {function["name"]: arguments},
+            "required": [function["name"]],
+            "additionalProperties": False,
+        })
+
+    reply = {"type": "string"}
+    if max_reply_chars:
+        reply["maxLength"] = max_reply_chars
+    return {
+        "type": "object",
+        "properties": {
+            "calls": {"type": "array", "items": {"anyOf": variants}},
+            "reply": reply,
+        },
+        "required": ["calls", "reply"],
+    }
+
+
+def compact_instructions(tools: List[dict]) -> str:
+    """System prompt text that explains the compact format and lists the tools in one line each"""
+    lines = [
+        'Answer with JSON only: {"calls": [{"tool_name": {"arg": value}}], "reply": "short text"}.',
+        'Put every tool call needed now in "calls" (empty list when none); "reply" is shown to the user.',
+        "Tools:",
+    ]
+    for tool in tools:
+        function = tool["function"]
+        parameters = function.get("parameters") or {}
+        required = set(parameters.get("required") or [])
+        arguments = ", ".join(
+            name if name in required else f"{name}?"
+            for name in (parameters.get("properties") or {})
+        )
+        description = function.get("description") or ""
+        lines.append(f"- {function['name']}({arguments}){': ' + description if description else ''}")
+    return "\n".join(lines)
+
+
+def decode_compact(content: str) -> Tuple[Optional[List[Tuple[str, dict]]], str]:
+    """
+    Turn compact output back into [(tool_name, arguments), ...] plus the reply text
+
+    If the output was cut off after the calls (e.g. inside "reply"), the complete
+    "calls" array is still used.
+
+    Returns:
+        (calls, reply); calls is None if no call list could be decoded
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        data = _truncated_calls(content)
+        if data is None:
+            return None, content
+    if not isinstance(data, dict) or not isinstance(data.get("calls", []), list):
+        return None, content
+
+    calls = []
+    for item in data.get("calls") or []:
+        if not isinstance(item, dict) or len(item) != 1:
+            return None, content
+        (name, arguments), = item.items()
+        calls.append((name, arguments if isinstance(arguments, dict) else {}))
+    return calls, str(data.get("reply") or "")
+
+
+def _truncated_calls(content: str) -> Optional[dict]:
+    start = content.find('"calls"')
+    if start < 0:
+        return None
+    bracket = content.find("[", start)
+    if bracket < 0:
+        return None
+    try:
+        calls, _ = json.JSONDecoder().raw_decode(content, bracket)
+    except json.JSONDecodeError:
+        return None
+    return {"calls": calls, "reply": ""}
@@ -0,0 +1,266 @@
+# AI_Voice/module/env_store.py
+
+import io
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from dotenv import dotenv_values, find_dotenv
+from dotenv.parser import parse_stream
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+_UNSET = object()  # Marks a key removed inside a transaction
+
+
+class EnvWriteError(OSError):
+    """The .env file could not be rewritten; nothing was changed"""
+
+
+def _format_line(key: str, value: str) -> str:
+    """Same quoting as dotenv.set_key (quote_mode='always')"""
+    return "{}='{}'\n".format(key, value.replace("'", "\\'"))
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on '<path>.lock' shared with other processes editing the file"""
+    with open(path + ".lock", "a+") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class EnvTransaction:
+    """Set/unset operations collected in memory and written to the .env file once"""
+
+    def __init__(self, store: "EnvStore", export: bool = True):
+        self.store = store
+        self.export = export
+        self.ops: Dict[str, object] = {}  # key -> value or _UNSET, last write wins
+
+    def set(self, key: str, value: str) -> None:
+        self.ops[key] = value
+
+    def unset(self, key: str) -> None:
+        self.ops[key] = _UNSET
+
+    def pending(self, key: str):
+        """Pending value for key, _UNSET if removed, or None if untouched"""
+        return self.ops.get(key)
+
+    def commit(self) -> None:
+        if self.ops:
+            self.store._write(self.ops, export=self.export)
+        self.ops = {}
+
+
+class EnvStore:
+    """In-memory view of a .env file, re-parsed only when the file changes on disk"""
+
+    def __init__(self, dotenv_path: Optional[str] = None):
+        self._path = dotenv_path
+        self._values: Dict[str, Optional[str]] = {}
+        self._stat_key = None  # (inode, mtime_ns, size) of the parsed file
+        self.lock = threading.RLock()
+        self.loads = 0  # How many times the file was actually parsed
+        self.writes = 0  # How many times the file was actually rewritten
+        self._local = threading.local()  # Active transaction per thread
+
+    @property
+    def path(self) -> str:
+        """The .env path, resolved once per store"""
+        if self._path is None:
+            self._path = find_dotenv(usecwd=True) or ".env"
+        return self._path
+
+    def exists(self) -> bool:
+        return self._file_stat() is not None
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def refresh(self, force: bool = False) -> None:
+        """Re-parse the file if its inode/mtime/size changed (or when forced)"""
+        with self.lock:
+            stat_key = self._file_stat()
+            if not force and stat_key == self._stat_key:
+                return
+            self._values = dict(dotenv_values(self.path)) if stat_key else {}
+            self._stat_key = stat_key
+            self.loads += 1
+
+    def _active(self) -> Optional[EnvTransaction]:
+        return getattr(self._local, "transaction", None)
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        transaction = self._active()
+        if transaction and key in transaction.ops:
+            value = transaction.pending(key)
+            return default if value is _UNSET else value
+        with self.lock:
+            self.refresh()
+            return self._values.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        transaction = self._active()
+        if transaction and key in transaction.ops:
+            return transaction.pending(key) is not _UNSET
+        with self.lock:
+            self.refresh()
+            return key in self._values
+
+    def all(self) -> Dict[str, Optional[str]]:
+        with self.lock:
+            self.refresh()
+            values = dict(self._values)
+        transaction = self._active()
+        if transaction:
+            for key, value in transaction.ops.items():
+                if value is _UNSET:
+                    values.pop(key, None)
+                else:
+                    values[key] = value
+        return values
+
+    @contextmanager
+    def transaction(self, export: bool = True):
+        """
+        Group set/unset calls into one atomic write of the .env file
+
+        Inside the block, set() and unset() on this store (from the same thread)
+        are collected in memory; the file is rewritten once when the block exits.
+        Nothing is written if the block raises. Nested blocks join the outer one.
+
+        Args:
+            export: Also update os.environ for the changed keys on commit
+        """
+        outer = self._active()
+        if outer:
+            yield outer
+            return
+
+        transaction = EnvTransaction(self, export=export)
+        self._local.transaction = transaction
+        try:
+            yield transaction
+        finally:
+            self._local.transaction = None
+        transaction.commit()
+
+    def set(self, key: str, value: str, export: bool = True) -> None:
+        """
+        Write a key to the .env file and update the cache in place
+
+        Args:
+            key: The environment variable key
+            value: The value to store
+            export: Also update os.environ so the running process sees it
+        """
+        transaction = self._active()
+        if transaction:
+            transaction.set(key, value)
+        else:
+            self._write({key: value}, export=export)
+
+    def unset(self, key: str, export: bool = True) -> None:
+        """Remove a key from the .env file and from the cache"""
+        transaction = self._active()
+        if transaction:
+            transaction.unset(key)
+        else:
+            self._write({key: _UNSET}, export=export)
+
+    def _write(self, ops: Dict[str, object], export: bool) -> None:
+        """Apply ops to the file with one temp-file write and rename, under the file lock"""
+        try:
+            self._rewrite(ops, export)
+        except EnvWriteError:
+            raise
+        except OSError as e:
+            error = EnvWriteError(*e.args)
+            error.filename = e.filename
+            raise error from e
+
+    def _rewrite(self, ops: Dict[str, object], export: bool) -> None:
+        path = os.path.abspath(self.path)
+        with self.lock, _file_lock(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    source = f.read()
+                mode = os.stat(path).st_mode & 0o777
+            except FileNotFoundError:
+                source, mode = "", 0o600
+
+            bindings = list(parse_stream(io.StringIO(source)))
+            # A duplicated key takes its last value (as dotenv reads it): the new value
+            # replaces that binding and every other binding of the key is dropped
+            last = {binding.key: index for index, binding in enumerate(bindings) if binding.key in ops}
+            remaining = {key: value for key, value in ops.items() if key not in last}
+            lines = []
+            for index, binding in enumerate(bindings):
+                if binding.key not in ops:
+                    lines.append(binding.original.string)
+                elif index == last[binding.key] and ops[binding.key] is not _UNSET:
+                    lines.append(_format_line(binding.key, ops[binding.key]))
+            if lines and not lines[-1].endswith("\n"):
+                lines[-1] += "\n"
+            for key, value in remaining.items():
+                if value is not _UNSET:
+                    lines.append(_format_line(key, value))
+
+            fd, tmp_path = tempfile.mkstemp(prefix=".env.", suffix=".tmp", dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(tmp_path, mode)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            self.writes += 1
+            self.refresh(force=True)
+            if export:
+                for key, value in ops.items():
+                    if value is _UNSET:
+                        os.environ.pop(key, None)
+                    else:
+                        os.environ[key] = value
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_env_store() -> EnvStore:
+    """Process-wide EnvStore for the project's .env file"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = EnvStore()
+        return _default_store
@@ -0,0 +1,92 @@
+# AI_Voice/module/env_tools.py
+
+from .env_store import get_env_store
+from .tool_registry import ToolRegistry
+
+
+# Define .env manipulation functions
+
+def read_env_value(key: str) -> str:
+    """
+    Read a value from .env file
+    
+    Args:
+        key: The environment variable key to read
+    
+    Returns:
+        The value of the key or error message
+    """
+    try:
+        value = get_env_store().get(key)
+        if value is None:
+            return f"❌ Key '{key}' not found in .env file"
+        return f"✅ {key}={value}"
+    except Exception as e:
+        return f"❌ Error reading .env: {str(e)}"
+
+
+def update_env_value(key: str, value: str) -> str:
+    """
+    Update or create a key-value pair in .env file
+    
+    Args:
+        key: The environment variable key
+        value: The new value to set
+    
+    Returns:
+        Success message
+    """
+    try:
+        get_env_store().set(key, value, export=False)
+        return f"✅ Updated: {key}={value}"
+    except Exception as e:
+        return f"❌ Error updating .env: {str(e)}"
+
+
+def delete_env_value(key: str) -> str:
+    """
+    Delete a key from .env file
+    
+    Args:
+        key: The environment variable key to delete
+    
+    Returns:
+        Success message
+    """
+    try:
+        store = get_env_store()
+        if not store.exists():
+            return "❌ .env file not found"
+        
+        store.unset(key, export=False)
+        return f"✅ Deleted key: {key}"
+    except Exception as e:
+        return f"❌ Error deleting from .env: {str(e)}"
+
+
+def create_file(filename: str, content: str) -> str:
+    """
+    Create a new file with content
+    
+    Args:
+        filename: The name of the file to create
+        content: The content to write to the file
+    
+    Returns:
+        Success message
+    """
+    try:
+        with open(filename, 'w') as f:
+            f.write(content)
+        return f"✅ File '{filename}' created successfully!"
+    except Exception as e:
+        return f"❌ Error: {str(e)}"
+
+
+# Shared tool registry: schemas are computed once here and reused by every agent loop
+registry = ToolRegistry()
+for _function in (create_file, read_env_value, update_env_value, delete_env_value):
+    registry.register(_function)
+
+# Map function names to functions
+available_functions = {name: tool.handler for name, tool in registry.tools.items()}
@@ -0,0 +1,183 @@
+# AI_Voice/module/gemini_stub.py
+
+import argparse
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from .streaming import StreamTiming, stream_gemini
+
+
+DEFAULT_REPLY = "Done."
+
+
+class FunctionCall:
+    def __init__(self, name: str, args: Optional[dict] = None):
+        self.name = name
+        self.args = dict(args or {})
+
+
+class Part:
+    def __init__(self, text: Optional[str] = None, function_call: Optional[FunctionCall] = None):
+        self.text = text
+        self.function_call = function_call
+
+
+class Content:
+    def __init__(self, parts: List[Part], role: str = "model"):
+        self.parts = parts
+        self.role = role
+
+
+class Candidate:
+    def __init__(self, content: Content):
+        self.content = content
+
+
+class Response:
+    """Just the fields of GenerateContentResponse the chat loop reads"""
+
+    def __init__(self, parts: List[Part]):
+        self.candidates = [Candidate(Content(parts))]
+
+    @property
+    def text(self) -> Optional[str]:
+        texts = [part.text for part in self.candidates[0].content.parts if part.text]
+        return "".join(texts) if texts else None
+
+    @property
+    def function_calls(self) -> Optional[List[FunctionCall]]:
+        calls = [part.function_call for part in self.candidates[0].content.parts if part.function_call]
+        return calls or None
+
+
+def reply(text: str = "", calls=None) -> dict:
+    """
+    One scripted model turn
+
+    Args:
+        text: Text of the reply
+        calls: [(name, args), ...] function calls sent with it
+    """
+    return {'text': text, 'calls': list(calls or [])}
+
+
+class FakeChat:
+    """Stand-in for a google-genai Chat: send_message() and send_message_stream()"""
+
+    def __init__(self, client: "FakeGeminiClient", model: str, config=None):
+        self.client = client
+        self.model = model
+        self.config = config
+        self.history = []
+
+    def _next(self, message) -> dict:
+        self.history.append(message)
+        return self.client._next_reply(message)
+
+    def send_message(self, message):
+        scripted = self._next(message)
+        # The whole response arrives at once: first-chunk latency plus every chunk
+        words = scripted['text'].split()
+        time.sleep(self.client.first_chunk_latency + self.client.chunk_latency * max(0, len(words) - 1))
+        parts = [Part(text=scripted['text'])] if scripted['text'] else []
+        parts += [Part(function_call=FunctionCall(name, args)) for name, args in scripted['calls']]
+        return Response(parts)
+
+    def send_message_stream(self, message):
+        scripted = self._next(message)
+        time.sleep(self.client.first_chunk_latency)
+        words = scripted['text'].split()
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.client.chunk_latency)
+            yield Response([Part(text=word if i == 0 else f" {word}")])
+        # Gemini sends each function call whole, in its own chunk
+        for name, args in scripted['calls']:
+            yield Response([Part(function_call=FunctionCall(name, args))])
+
+
+class _Chats:
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+
+    def create(self, model: str, config=None, history=None) -> FakeChat:
+        return FakeChat(self._client, model, config)
+
+
+class FakeGeminiClient:
+    """
+    Offline stand-in for genai.Client with scripted replies and simulated latency
+
+    Replies queued with script() are returned in order; when the queue is empty,
+    the model answers DEFAULT_REPLY. Every message sent (user text or a list of
+    function responses) is kept in `requests`, so a test can count round-trips.
+
+        client = FakeGeminiClient(first_chunk_latency=0.3)
+        client.script([reply(calls=[("change_setting", {"key": "debug", "value": "true"})]), reply("Updated.")])
+        chat = client.chats.create(model="gemini-2.5-flash")
+    """
+
+    def __init__(self, first_chunk_latency: float = 0.0, chunk_latency: float = 0.0):
+        self.first_chunk_latency = first_chunk_latency
+        self.chunk_latency = chunk_latency
+        self.chats = _Chats(self)
+        self.requests = []
+        self._replies = deque()
+        self._lock = threading.Lock()
+
+    def script(self, replies) -> "FakeGeminiClient":
+        """Queue replies: reply() dicts or plain strings"""
+        for item in replies:
+            self._replies.append(reply(item) if isinstance(item, str) else item)
+        return self
+
+    def _next_reply(self, message) -> dict:
+        with self._lock:
+            self.requests.append(message)
+            return self._replies.popleft() if self._replies else reply(DEFAULT_REPLY)
+
+
+def benchmark(turns: int, words: int, first_chunk_latency: float, chunk_latency: float) -> dict:
+    """Time to first visible text, blocking send_message vs send_message_stream"""
+    text = " ".join(["word"] * words)
+    client = FakeGeminiClient(first_chunk_latency, chunk_latency)
+    chat = client.chats.create(model="fake")
+
+    blocking = []
+    for _ in range(turns):
+        client.script([text])
+        start = time.perf_counter()
+        chat.send_message("hello")
+        blocking.append(time.perf_counter() - start)
+
+    streaming = []
+    for _ in range(turns):
+        client.script([text])
+        timing = StreamTiming()
+        stream_gemini(chat, "hello", on_token=lambda token: None, timing=timing)
+        streaming.append(timing.first_chunk)
+
+    return {
+        'blocking_first_output': sum(blocking) / turns,
+        'streaming_first_chunk': sum(streaming) / turns,
+    }
+
+
+def main(argv=None):
+    """python -m module.gemini_stub [--turns 5] [--words 40] [--first-chunk 0.4] [--chunk 0.03]"""
+    parser = argparse.ArgumentParser(description="Compare blocking and streamed Gemini replies on the offline client")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--words", type=int, default=40, help="Words per reply (one chunk each)")
+    parser.add_argument("--first-chunk", type=float, default=0.4, help="Seconds before the first chunk")
+    parser.add_argument("--chunk", type=float, default=0.03, help="Seconds between chunks")
+    args = parser.parse_args(argv)
+
+    result = benchmark(args.turns, args.words, args.first_chunk, args.chunk)
+    print(f"⏱️  blocking, text shown after: {result['blocking_first_output']:.2f}s")
+    print(f"⏱️  streaming, first chunk after: {result['streaming_first_chunk']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
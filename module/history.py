@@ -0,0 +1,232 @@
+# AI_Voice/module/history.py
+
+import contextvars
+import threading
+from typing import Callable, List, Optional
+
+from .tracing import tracer
+
+
+# Rough token estimate: ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 1500
+KEEP_RECENT_TURNS = 3
+COLLAPSED_TOOL_CHARS = 80
+
+SUMMARY_PROMPT = (
+    "Summarize this conversation between a user and an assistant that manages .env "
+    "settings and files. Keep every key, value, file name and decision that was made. "
+    "Reply with the summary only, in at most 5 short sentences."
+)
+SUMMARY_OPTIONS = {'temperature': 0, 'num_predict': 200}
+
+
+def _field(message, name: str, default=None):
+    """Read a field from a dict message or an ollama Message object"""
+    if isinstance(message, dict):
+        return message.get(name, default)
+    return getattr(message, name, default)
+
+
+def estimate_tokens(message) -> int:
+    """Cheap token estimate for one message (content plus tool call arguments)"""
+    chars = len(_field(message, 'content') or '')
+    for call in _field(message, 'tool_calls') or []:
+        function = _field(call, 'function')
+        chars += len(str(_field(function, 'name', ''))) + len(str(_field(function, 'arguments', '')))
+    return chars // CHARS_PER_TOKEN + 4  # + role/formatting overhead
+
+
+def summary_messages(transcript: str) -> list:
+    return [
+        {'role': 'system', 'content': SUMMARY_PROMPT},
+        {'role': 'user', 'content': transcript},
+    ]
+
+
+def make_ollama_summarizer(session) -> Callable[[str], str]:
+    """
+    Build a summarizer that asks the chat session's model to condense old turns
+
+    The request goes through the session, so it uses the same client, keep_alive
+    and num_ctx as the chat calls and never unloads or reloads the model.
+
+    Args:
+        session: OllamaSession (or BackendRouter) with a synchronous chat()
+
+    Returns:
+        Function taking a transcript string and returning its summary
+    """
+    def summarize(transcript: str) -> str:
+        with tracer.span("llm.summarize", model=session.model):
+            response = session.chat(summary_messages(transcript), tools=False, **SUMMARY_OPTIONS)
+        return _field(_field(response, 'message'), 'content').strip()
+    return summarize
+
+
+class ConversationHistory:
+    """
+    Token-budgeted chat history: recent turns verbatim, older turns summarized
+
+    append() never waits for the model: when the history goes over budget, the
+    oldest turns are summarized in a background thread and swapped for the
+    summary when it is ready (until then they are still sent verbatim).
+    """
+
+    def __init__(
+        self,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        keep_recent_turns: int = KEEP_RECENT_TURNS,
+        summarizer: Optional[Callable[[str], str]] = None,
+        system_prompt: Optional[str] = None
+    ):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summarizer = summarizer
+        self.system_prompt = system_prompt
+        self.summary = ""
+        self.turns: List[list] = []  # Each turn starts with a user message
+        self.summaries_made = 0
+        self.lock = threading.Lock()
+        self._generation = 0  # Bumped by clear(), so a summary of cleared turns is dropped
+        self._summarizing = False
+        self._idle = threading.Event()  # Set while no summary is being made
+        self._idle.set()
+
+    def append(self, message) -> None:
+        """Add a message; a user message starts a new turn"""
+        with self.lock:
+            if _field(message, 'role') == 'user' or not self.turns:
+                self.turns.append([])
+            self.turns[-1].append(message)
+            job = self._compact()
+        if job:
+            self._start_summary(*job)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a summary in progress; False if it is still running after timeout"""
+        return self._idle.wait(timeout)
+
+    def pop(self):
+        """Remove and return the last message (e.g. to drop a failed user turn)"""
+        with self.lock:
+            if not self.turns:
+                return None
+            message = self.turns[-1].pop()
+            if not self.turns[-1]:
+                self.turns.pop()
+            return message
+
+    def clear(self) -> None:
+        with self.lock:
+            self.turns = []
+            self.summary = ""
+            self._generation += 1
+
+    def messages(self) -> list:
+        """Messages to send to the model: system prompt, summary, then turns"""
+        with self.lock:
+            result = []
+            if self.system_prompt:
+                result.append({'role': 'system', 'content': self.system_prompt})
+            if self.summary:
+                result.append({'role': 'system', 'content': f"Summary of the earlier conversation: {self.summary}"})
+            for index, turn in enumerate(self.turns):
+                recent = index >= len(self.turns) - self.keep_recent_turns
+                for message in turn:
+                    result.append(message if recent else self._collapse(message))
+            return result
+
+    def token_count(self) -> int:
+        return sum(estimate_tokens(m) for m in self.messages())
+
+    def __len__(self) -> int:
+        return sum(len(turn) for turn in self.turns)
+
+    def _collapse(self, message):
+        """Shorten an old tool result; other messages are kept as-is"""
+        if _field(message, 'role') != 'tool':
+            return message
+        content = _field(message, 'content') or ''
+        if len(content) <= COLLAPSED_TOOL_CHARS:
+            return message
+        collapsed = {'role': 'tool', 'content': content[:COLLAPSED_TOOL_CHARS - 3] + "..."}
+        if _field(message, 'tool_name'):
+            collapsed['tool_name'] = _field(message, 'tool_name')
+        return collapsed
+
+    def _estimated_tokens(self) -> int:
+        total = estimate_tokens({'content': self.summary}) if self.summary else 0
+        for index, turn in enumerate(self.turns):
+            recent = index >= len(self.turns) - self.keep_recent_turns
+            total += sum(estimate_tokens(m if recent else self._collapse(m)) for m in turn)
+        return total
+
+    def _compact(self):
+        """
+        Fold the oldest turns into the summary while over the token budget (lock held)
+
+        Returns:
+            (turns, transcript, generation) to summarize outside the lock, or None
+        """
+        if self._summarizing or self._estimated_tokens() <= self.token_budget:
+            return None
+
+        old_turns = self.turns[:-self.keep_recent_turns] if self.keep_recent_turns else self.turns[:]
+        if not old_turns:
+            return None  # Only recent turns left; keep them verbatim
+
+        if not self.summarizer:
+            # Without a summarizer the oldest turns are simply dropped
+            self.turns = self.turns[len(old_turns):]
+            return None
+
+        transcript_lines = []
+        if self.summary:
+            transcript_lines.append(f"Earlier summary: {self.summary}")
+        for turn in old_turns:
+            for message in turn:
+                role = _field(message, 'role')
+                content = _field(self._collapse(message), 'content') or ''
+                for call in _field(message, 'tool_calls') or []:
+                    function = _field(call, 'function')
+                    content += f" [called {_field(function, 'name')}({_field(function, 'arguments')})]"
+                if content:
+                    transcript_lines.append(f"{role}: {content}")
+
+        self._summarizing = True
+        self._idle.clear()
+        return old_turns, "\n".join(transcript_lines), self._generation
+
+    def _start_summary(self, old_turns: list, transcript: str, generation: int) -> None:
+        # The summary span stays in the turn's trace
+        context = contextvars.copy_context()
+        threading.Thread(
+            target=context.run, args=(self._summarize, old_turns, transcript, generation),
+            name="history-summary", daemon=True
+        ).start()
+
+    def _summarize(self, old_turns: list, transcript: str, generation: int) -> None:
+        summary = None
+        try:
+            summary = self.summarizer(transcript)
+        except Exception as e:
+            print(f"⚠️  History summary failed, dropping old turns: {e}")
+
+        with self.lock:
+            if generation == self._generation:
+                # Drop the summarized turns that are still at the front (pop() may have removed some)
+                done = 0
+                while done < len(old_turns) and done < len(self.turns) and self.turns[done] is old_turns[done]:
+                    done += 1
+                self.turns = self.turns[done:]
+                if summary:
+                    self.summary = summary
+                    self.summaries_made += 1
+            self._summarizing = False
+            # Messages appended meanwhile may have pushed the history over budget again
+            job = self._compact()
+            if not job:
+                self._idle.set()
+        if job:
+            self._start_summary(*job)
@@ -0,0 +1,115 @@
+# AI_Voice/module/import_budget.py
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+# Importing the CLI must stay cheap: models and heavy runtimes load in the warm-up
+DEFAULT_MODULE = "lamma_in_action"
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "200"))
+# Packages that must never be imported just by importing the CLI
+HEAVY_PACKAGES = ("faster_whisper", "ctranslate2", "onnxruntime", "torch", "torchaudio", "librosa", "av")
+
+# "import time:       self [us] |  cumulative | imported package"
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str = DEFAULT_MODULE, python: str = sys.executable, cwd: Optional[str] = None) -> List[Tuple[str, int, int, int]]:
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Args:
+        module: Module to import
+        python: Interpreter to run
+        cwd: Working directory (defaults to the project root, so top-level modules resolve)
+
+    Returns:
+        [(package, self_us, cumulative_us, depth), ...] in import order
+    """
+    cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        raise RuntimeError(f"import {module} failed: {error[-1] if error else result.returncode}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, package = match.groups()
+            entries.append((package, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def subtree(entries: List[Tuple[str, int, int, int]], module: str) -> List[Tuple[str, int, int, int]]:
+    """Entries imported by `module` (importtime lists children before their parent)"""
+    for index in range(len(entries) - 1, -1, -1):
+        if entries[index][0] == module:
+            depth = entries[index][3]
+            start = index
+            while start > 0 and entries[start - 1][3] > depth:
+                start -= 1
+            return entries[start:index]
+    return []
+
+
+def check(entries: List[Tuple[str, int, int, int]], module: str, budget_ms: float) -> Dict[str, object]:
+    """Total import time of `module` and the heavy packages it pulled in"""
+    total_us = next((cumulative for package, _, cumulative, _ in reversed(entries) if package == module), 0)
+    heavy = sorted({package.split(".")[0] for package, _, _, _ in subtree(entries, module)
+                    if package.split(".")[0] in HEAVY_PACKAGES})
+    return {
+        'module': module,
+        'total_ms': total_us / 1000,
+        'budget_ms': budget_ms,
+        'heavy': heavy,
+        'passed': total_us / 1000 <= budget_ms and not heavy,
+    }
+
+
+def format_report(entries: List[Tuple[str, int, int, int]], result: Dict[str, object], top: int = 15) -> str:
+    lines = [f"⏱️  import {result['module']}: {result['total_ms']:.1f} ms (budget {result['budget_ms']:.0f} ms)"]
+    # Everything the measured module imported, slowest first (interpreter start-up excluded)
+    slowest = sorted(subtree(entries, result['module']), key=lambda entry: entry[2], reverse=True)
+    for package, self_us, cumulative_us, _ in slowest[:top]:
+        lines.append(f"   {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {package}")
+    if result['heavy']:
+        lines.append(f"❌ Heavy packages imported at start-up: {', '.join(result['heavy'])}")
+    if result['total_ms'] > result['budget_ms']:
+        lines.append(f"❌ Over budget by {result['total_ms'] - result['budget_ms']:.1f} ms")
+    if result['passed']:
+        lines.append("✅ Within budget")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """python -m module.import_budget [--module lamma_in_action] [--budget-ms 200] [--runs 3]"""
+    parser = argparse.ArgumentParser(description="Fail when importing the CLI gets slow or pulls in heavy packages")
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="Best of N runs (the first one may hit a cold disk cache)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    best = None
+    for _ in range(max(1, args.runs)):
+        entries = measure(args.module)
+        result = check(entries, args.module, args.budget_ms)
+        if best is None or result['total_ms'] < best[1]['total_ms']:
+            best = (entries, result)
+
+    entries, result = best
+    print(format_report(entries, result, args.top))
+    return 0 if result['passed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
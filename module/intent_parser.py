@@ -0,0 +1,163 @@
+# AI_Voice/module/intent_parser.py
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .env_store import get_env_store
+from .tool_registry import ToolRegistry, ToolValidationError
+
+
+IP = r"(?P<{}>\d{{1,3}}(?:\.\d{{1,3}}){{3}}|[0-9a-f]*:[0-9a-f:]+)"
+DOMAIN = r"(?P<{}>[a-z0-9-]+(?:\.[a-z0-9-]+)+)"
+KEY = r"(?P<key>[a-z_][a-z0-9_ ]{0,60}?)"
+
+
+def env_key(spoken: str) -> str:
+    """'api key' -> 'API_KEY' (same normalization as main.change_setting)"""
+    return "_".join(spoken.strip().split()).upper()
+
+
+def existing_key(arguments: dict) -> Optional[dict]:
+    """Keep a match only if its key is already in the .env file"""
+    return arguments if arguments["key"] in get_env_store() else None
+
+
+class Rule:
+    """One utterance pattern mapped to one tool call"""
+
+    def __init__(self, tool: str, pattern: str, build: Callable[[dict], dict]):
+        self.tool = tool
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.build = build
+
+    def match(self, text: str) -> Optional[dict]:
+        """Tool arguments, or None if the text does not match (build may also return None to reject)"""
+        match = self.regex.fullmatch(text)
+        return self.build(match.groupdict()) if match else None
+
+
+# Patterns for the .env tools in module/env_tools.py
+ENV_RULES = [
+    # "set key X to Y" may create a key; a bare "change X to Y" is only a .env edit
+    # if X is already a key ("change the plan to tomorrow" goes to the LLM)
+    Rule("update_env_value",
+         rf"(?:please )?(?:set|update|change) (?:the )?(?:key |variable ){KEY} (?:to|=|as) (?P<value>\S.*)",
+         lambda g: {"key": env_key(g["key"]), "value": g["value"].strip().strip("'\"")}),
+    Rule("update_env_value",
+         rf"(?:please )?(?:set|update|change) (?:the )?(?:value of (?:the )?)?{KEY} (?:to|=|as) (?P<value>\S.*)",
+         lambda g: existing_key({"key": env_key(g["key"]), "value": g["value"].strip().strip("'\"")})),
+    Rule("delete_env_value",
+         rf"(?:please )?(?:delete|remove|unset) (?:the )?(?:key |variable )?{KEY}",
+         lambda g: {"key": env_key(g["key"])}),
+    Rule("read_env_value",
+         rf"(?:please )?(?:read|get|show)(?: me)? (?:the )?(?:value of (?:the )?|key |variable ){KEY}",
+         lambda g: {"key": env_key(g["key"])}),
+    Rule("create_file",
+         r"(?:please )?create (?:a )?file (?:called |named )?(?P<filename>[\w.\-/]+) with (?:content |text )?(?P<content>.+)",
+         lambda g: {"filename": g["filename"], "content": g["content"].strip().strip("'\"")}),
+]
+
+# Patterns for the Technitium tools in DNS-Server/dns_server.py
+DNS_RULES = [
+    Rule("add_dns_record",
+         rf"(?:please )?(?:add|create|point) (?:a )?(?:record )?{DOMAIN.format('domain')} (?:to|at|->) {IP.format('ip')}",
+         # The whole name goes in as the domain: the server picks the closest zone itself
+         lambda g: {"domain": g["domain"].lower(), "name": "@", "ip": g["ip"]}),
+    Rule("update_dns_record",
+         rf"(?:please )?(?:change|update|modify|move) (?:the )?(?:ip of )?{DOMAIN.format('domain')} (?:ip )?from {IP.format('current_ip')} to {IP.format('new_ip')}",
+         lambda g: {"domain": g["domain"].lower(), "current_ip": g["current_ip"], "new_ip": g["new_ip"]}),
+    Rule("rename_dns_record",
+         rf"(?:please )?rename (?:record )?{DOMAIN.format('old_domain')} to {DOMAIN.format('new_domain')}",
+         lambda g: {"old_domain": g["old_domain"].lower(), "new_domain": g["new_domain"].lower()}),
+    Rule("delete_dns_record",
+         rf"(?:please )?(?:delete|remove) (?:the )?(?:record )?{DOMAIN.format('domain')} (?:pointing to |with ip |at |->)?{IP.format('ip')}",
+         lambda g: {"domain": g["domain"].lower(), "ip": g["ip"]}),
+    Rule("find_domain_by_ip",
+         rf"(?:please )?(?:find|which|what|who)(?: domains?| names?)?(?: points?| pointing)? (?:to |for |at |by ip )?{IP.format('ip')}",
+         lambda g: {"ip": g["ip"]}),
+    Rule("get_dns_records",
+         rf"(?:please )?(?:get|show|list|view) (?:the )?(?:dns )?records (?:for |of |in )?{DOMAIN.format('domain')}",
+         lambda g: {"domain": g["domain"].lower()}),
+    Rule("list_dns_zones",
+         r"(?:please )?(?:list|show)(?: all| me)?(?: the)?(?: dns)? zones",
+         lambda g: {}),
+    Rule("create_dns_zone",
+         rf"(?:please )?create (?:a )?(?:new )?zone {DOMAIN.format('zone')}",
+         lambda g: {"zone": g["zone"].lower()}),
+    # Deleting a whole zone only skips the LLM when the user says "confirm"
+    Rule("delete_dns_zone",
+         rf"(?:please )?confirm(?:ed)? delete (?:the )?zone {DOMAIN.format('zone')}",
+         lambda g: {"zone": g["zone"].lower(), "confirm": True}),
+    Rule("delete_dns_zone",
+         rf"(?:please )?delete (?:the )?zone {DOMAIN.format('zone')},? confirm(?:ed)?",
+         lambda g: {"zone": g["zone"].lower(), "confirm": True}),
+]
+
+# Words that mean the utterance is more than one simple command
+COMPOUND = re.compile(r"\b(and|then|if|unless|also|but)\b", re.IGNORECASE)
+
+
+def normalize(text: str) -> str:
+    """Collapse whitespace and drop the trailing punctuation Whisper adds"""
+    text = " ".join(text.strip().split())
+    return text.rstrip(".!?,;")
+
+
+class IntentParser:
+    """
+    Deterministic fast path: maps formulaic commands straight to tool calls
+
+    Only rules whose tool is registered are used, and every match is validated
+    against that tool's schema; anything else falls back to the LLM.
+    """
+
+    def __init__(self, registry: ToolRegistry, rules: Optional[List[Rule]] = None):
+        self.registry = registry
+        candidates = rules if rules is not None else ENV_RULES + DNS_RULES
+        self.rules = [rule for rule in candidates if rule.tool in registry]
+        self.hits = 0
+        self.misses = 0
+        self.hits_by_tool: Dict[str, int] = {}
+
+    def parse(self, text: str, record: bool = True) -> Optional[Tuple[str, dict]]:
+        """
+        Match an utterance against the rules
+
+        Args:
+            text: The utterance
+            record: Count the result in the hit rate (False for a speculative match, see record())
+
+        Returns:
+            (tool_name, arguments) for a confident match, or None to use the LLM
+        """
+        text = normalize(text or "")
+        intent = None
+        if text and not COMPOUND.search(text):
+            for rule in self.rules:
+                arguments = rule.match(text)
+                if arguments is None:
+                    continue
+                try:
+                    intent = (rule.tool, self.registry.validate(rule.tool, arguments))
+                except ToolValidationError:
+                    continue
+                break
+
+        if record:
+            self.record(intent)
+        return intent
+
+    def record(self, intent: Optional[Tuple[str, dict]]) -> None:
+        """Count a parse result, e.g. a speculative parse of a draft transcript that was kept"""
+        if intent:
+            self.hits += 1
+            self.hits_by_tool[intent[0]] = self.hits_by_tool.get(intent[0], 0) + 1
+        else:
+            self.misses += 1
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self) -> str:
+        return f"⚡ Fast path: {self.hits}/{self.hits + self.misses} handled without the LLM ({self.hit_rate():.0%})"
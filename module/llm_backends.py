@@ -0,0 +1,465 @@
+# AI_Voice/module/llm_backends.py
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional
+
+from .ollama_session import OllamaSession
+from .tracing import percentile, tracer
+
+
+# Set LLM_BACKENDS to route chat calls across several backends, fastest healthy first, e.g.
+#   LLM_BACKENDS="ollama:llama3.2,ollama:llama3.2@http://gpu-box:11434,gemini:gemini-2.5-flash"
+BACKENDS_ENV = "LLM_BACKENDS"
+# Set LLM_HEDGE=1 to send a duplicate request to the next backend once the first one
+# is slower than its own p95
+HEDGE_ENV = "LLM_HEDGE"
+
+LATENCY_WINDOW = 50  # Calls per backend kept for the rolling latency
+MIN_HEDGE_SAMPLES = 5  # A backend's p95 is not trusted before this many calls
+MAX_FAILURES = 3  # Consecutive failures before a backend is taken out of rotation
+COOLDOWN = 30.0  # Seconds an unhealthy backend sits out before it is tried again
+EXPLORE_EVERY = 20  # Every Nth call goes to the backend measured longest ago, so a slow spell is not forever
+
+
+def _field(obj, name: str, default=None):
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def chat_response(model: str, content: str = "", tool_calls=None):
+    """
+    ollama.ChatResponse built from any provider's output
+
+    Every backend answers in this one shape, so the agent loops (which read
+    response.message.tool_calls or response['message']) don't care where it came from.
+
+    Args:
+        tool_calls: [(name, arguments), ...]
+    """
+    import ollama
+    calls = [
+        ollama.Message.ToolCall(function=ollama.Message.ToolCall.Function(name=name, arguments=dict(arguments or {})))
+        for name, arguments in tool_calls or []
+    ]
+    return ollama.ChatResponse(
+        model=model,
+        done=True,
+        message=ollama.Message(role='assistant', content=content, tool_calls=calls or None)
+    )
+
+
+class BackendStats:
+    """Stand-in for CallStats on backends that don't report token counts"""
+
+    def __init__(self, backend: str, latency: float):
+        self.backend = backend
+        self.latency = latency
+
+    def report(self) -> str:
+        return f"{self.backend} in {self.latency:.2f}s"
+
+
+class LatencyTracker:
+    """Rolling latency and health of one backend"""
+
+    def __init__(self, window: int = LATENCY_WINDOW, max_failures: int = MAX_FAILURES, cooldown: float = COOLDOWN):
+        self.samples = deque(maxlen=window)
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.last_used = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.samples.append(seconds)
+            self.last_used = time.monotonic()
+            self.calls += 1
+            self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.calls += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_used = time.monotonic()
+            if self.consecutive_failures >= self.max_failures:
+                self.unhealthy_until = time.monotonic() + self.cooldown
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self.lock:
+            samples = list(self.samples)
+        return percentile(samples, pct) if samples else None
+
+
+class Backend:
+    """
+    One chat provider behind the common interface
+
+    Subclasses implement chat(messages, stream=False, **options) and return an
+    ollama.ChatResponse (or, when streaming, an iterator of chunks).
+    """
+
+    name = "backend"
+    model = None
+    last_stats = None
+
+    def __init__(self):
+        self.latency = LatencyTracker()
+
+    def chat(self, messages: list, stream: bool = False, **options):
+        raise NotImplementedError
+
+    def preload(self):
+        """Load the model ahead of the first call (no-op for hosted providers)"""
+        return None
+
+
+class OllamaBackend(Backend):
+    """An OllamaSession (one host and model) as a backend"""
+
+    def __init__(self, session: OllamaSession, name: Optional[str] = None):
+        super().__init__()
+        self.session = session
+        self.model = session.model
+        self.name = name or f"ollama:{session.model}"
+
+    @property
+    def last_stats(self):
+        return self.session.last_stats
+
+    def chat(self, messages: list, stream: bool = False, **options):
+        return self.session.chat(messages, stream=stream, **options)
+
+    def preload(self):
+        return self.session.preload()
+
+
+class GeminiBackend(Backend):
+    """
+    Gemini through google-genai's generate_content, fed the Ollama-format history
+
+    The history is converted on every call (user/assistant/tool messages become
+    user/model contents with function-call and function-response parts), so this
+    backend can take over a conversation that started on another one. The function
+    responses to one model turn share a single user content, each named after its
+    call, and system messages (e.g. history summaries) join the system instruction.
+    """
+
+    def __init__(self, model: str = "gemini-2.5-flash", tools=None, system_prompt: Optional[str] = None, client=None):
+        super().__init__()
+        from google import genai
+        from google.genai import types
+        self.types = types
+        self.client = client or genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.model = model
+        self.name = f"gemini:{model}"
+        self.tools = tools
+        self.system_prompt = system_prompt
+
+    def _contents(self, messages: list):
+        """
+        Convert Ollama-format messages
+
+        Returns:
+            (contents, system instruction or None)
+        """
+        types = self.types
+        contents = []
+        system = [self.system_prompt] if self.system_prompt else []
+        pending = []  # Names of the last model turn's calls that have no response yet
+        responses = None  # Parts of the user content collecting those responses
+        for message in messages:
+            role = _field(message, 'role')
+            content = _field(message, 'content') or ""
+            if role != 'tool':
+                responses = None
+            if role == 'system':
+                if content:
+                    system.append(content)
+            elif role == 'user':
+                contents.append(types.Content(role="user", parts=[types.Part(text=content)]))
+            elif role == 'assistant':
+                parts = [types.Part(text=content)] if content else []
+                pending = []
+                for call in _field(message, 'tool_calls') or []:
+                    function = _field(call, 'function')
+                    pending.append(_field(function, 'name'))
+                    parts.append(types.Part(function_call=types.FunctionCall(
+                        name=_field(function, 'name'), args=dict(_field(function, 'arguments') or {})
+                    )))
+                if parts:
+                    contents.append(types.Content(role="model", parts=parts))
+            elif role == 'tool':
+                # Pair the response with its call: by name when given, else in call order
+                name = _field(message, 'tool_name')
+                if name in pending:
+                    pending.remove(name)
+                elif pending:
+                    name = pending.pop(0)
+                if name:
+                    part = types.Part.from_function_response(name=name, response={'result': content})
+                else:
+                    part = types.Part(text=f"Tool result: {content}")  # No call to answer
+                if responses is None:
+                    responses = []
+                    contents.append(types.Content(role="user", parts=responses))
+                responses.append(part)
+        return contents, "\n\n".join(system) or None
+
+    def chat(self, messages: list, stream: bool = False, **options):
+        contents, system_instruction = self._contents(messages)
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=contents,
+            config=self.types.GenerateContentConfig(tools=self.tools, system_instruction=system_instruction)
+        )
+        content = response.candidates[0].content if response.candidates else None
+        parts = content.parts if content and content.parts else []
+        result = chat_response(
+            self.model,
+            "".join(part.text for part in parts if part.text and not part.function_call),
+            [(part.function_call.name, part.function_call.args) for part in parts if part.function_call]
+        )
+        # Tool calls arrive whole anyway; a stream is the one response
+        return iter([result]) if stream else result
+
+
+class FakeBackend(Backend):
+    """
+    Local backend for tests and benchmarks: fixed latency, scripted replies, injectable failures
+
+    Args:
+        latency: Seconds per call (or a callable returning them, for jitter)
+        replies: Queue of reply texts or (text, [(tool, args), ...]) tuples; then "Done."
+        fail: Every call raises ConnectionError (set it later to simulate an outage)
+    """
+
+    def __init__(self, name: str = "fake", latency=0.0, replies=None, fail: bool = False):
+        super().__init__()
+        self.name = name
+        self.model = name
+        self.latency_seconds = latency
+        self.replies = deque(replies or [])
+        self.fail = fail
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def chat(self, messages: list, stream: bool = False, **options):
+        if stream:
+            # Lazy like an Ollama stream: nothing happens (or fails) until iterated
+            return self._stream(messages)
+        with self.lock:
+            self.requests += 1
+            scripted = self.replies.popleft() if self.replies else "Done."
+        delay = self.latency_seconds() if callable(self.latency_seconds) else self.latency_seconds
+        time.sleep(delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        text, calls = scripted if isinstance(scripted, tuple) else (scripted, [])
+        return chat_response(self.name, text, calls)
+
+    def _stream(self, messages: list):
+        yield self.chat(messages)
+
+
+class BackendRouter:
+    """
+    Sends each chat call to the fastest healthy backend, failing over on errors
+
+    Backends are ranked by their rolling median latency; a backend that has never
+    been called ranks first so every backend gets measured, and every
+    EXPLORE_EVERY-th call goes to the healthy backend measured longest ago, so one
+    slow spell does not bench a backend for good. After MAX_FAILURES
+    errors in a row a backend sits out for COOLDOWN seconds (if every backend is
+    out, they are all tried anyway).
+
+    With hedge=True, a call still running after the primary backend's p95 is
+    duplicated on the next backend and the first answer wins. The slower call is
+    not cancelled (HTTP clients can't be interrupted), only ignored; its latency
+    still counts. Streams are never hedged. A stream is routed and fails over
+    until its first chunk arrives, and its latency is the time to that chunk; an
+    error later in the stream reaches the caller.
+
+    Works wherever an OllamaSession is expected (chat, model, last_stats, preload).
+    """
+
+    def __init__(self, backends: List[Backend], hedge: bool = False, hedge_percentile: float = 95):
+        if not backends:
+            raise ValueError("BackendRouter needs at least one backend")
+        self.backends = backends
+        self.hedge = hedge and len(backends) > 1
+        self.hedge_percentile = hedge_percentile
+        self.current: Backend = backends[0]
+        self.calls = 0
+        self._last_latency = 0.0
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.executor = ThreadPoolExecutor(max_workers=2 * len(backends), thread_name_prefix="llm") if self.hedge else None
+
+    @property
+    def model(self) -> str:
+        return self.current.name
+
+    @property
+    def last_stats(self):
+        return self.current.last_stats or BackendStats(self.current.name, self._last_latency)
+
+    def ranked(self) -> List[Backend]:
+        order = itertools.count()
+
+        def key(backend: Backend):
+            median = backend.latency.percentile(50)
+            return (not backend.latency.healthy, -1.0 if median is None else median, next(order))
+        ranked = sorted(self.backends, key=key)
+        healthy = [backend for backend in ranked if backend.latency.healthy]
+        if self.calls and self.calls % EXPLORE_EVERY == 0 and len(healthy) > 1:
+            stalest = min(healthy, key=lambda backend: backend.latency.last_used)
+            ranked.remove(stalest)
+            ranked.insert(0, stalest)
+        return ranked
+
+    def _call(self, backend: Backend, messages: list, stream: bool, options: dict):
+        start = time.perf_counter()
+        try:
+            with tracer.span("llm.backend", backend=backend.name):
+                response = backend.chat(messages, stream=stream, **options)
+                if stream:
+                    # Streams are lazy: pull the first chunk here, so a backend that is
+                    # down fails (and fails over) now, and time-to-first-token is recorded
+                    chunks = iter(response)
+                    first = next(chunks, None)
+                    response = chunks if first is None else itertools.chain([first], chunks)
+        except Exception:
+            backend.latency.record_failure()
+            raise
+        backend.latency.record(time.perf_counter() - start)
+        return response, backend, time.perf_counter() - start
+
+    def chat(self, messages: list, stream: bool = False, **options):
+        self.calls += 1
+        candidates = self.ranked()
+        error = None
+        index = 0
+        while index < len(candidates):
+            backend = candidates[index]
+            hedged = (self.hedge and not stream and index + 1 < len(candidates) and
+                      len(backend.latency.samples) >= MIN_HEDGE_SAMPLES)
+            if hedged:
+                deadline = backend.latency.percentile(self.hedge_percentile)
+                result, error, tried = self._hedged(backend, candidates[index + 1], deadline, messages, options)
+            else:
+                tried = 1
+                try:
+                    result = self._call(backend, messages, stream, options)
+                except Exception as e:
+                    result, error = None, e
+            if result is None:
+                index += tried  # Skip the backup only if the hedge actually called it
+                if index < len(candidates):
+                    self.failovers += 1
+                    print(f"⚠️  {backend.name} failed ({error}), trying {candidates[index].name}")
+                continue
+            response, winner, elapsed = result
+            self.current = winner
+            self._last_latency = elapsed
+            return response
+        raise error
+
+    def _hedged(self, primary: Backend, backup: Backend, deadline: float, messages: list, options: dict):
+        """
+        Call primary; if it has not answered by the deadline, call backup as well
+
+        Returns:
+            (result or None, error or None, number of backends called). A primary
+            that fails before the deadline returns 1, so the caller moves on to the backup.
+        """
+        futures = {self.executor.submit(self._call, primary, messages, False, options): primary}
+        done, _ = wait(futures, timeout=deadline)
+        if not done:
+            self.hedges += 1
+            futures[self.executor.submit(self._call, backup, messages, False, options)] = backup
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if futures[future] is backup:
+                    self.hedge_wins += 1
+                return result, None, len(futures)
+        return None, error, len(futures)
+
+    def preload(self):
+        for backend in self.backends:
+            backend.preload()
+
+    def report(self) -> str:
+        lines = []
+        for backend in self.ranked():
+            tracker = backend.latency
+            p50, p95 = tracker.percentile(50), tracker.percentile(95)
+            timing = f"p50 {p50:.2f}s p95 {p95:.2f}s" if p50 is not None else "not measured"
+            state = "" if tracker.healthy else " (cooling down)"
+            lines.append(f"   {backend.name}: {timing}, {tracker.calls} calls, {tracker.failures} failed{state}")
+        hedging = f", {self.hedges} hedged ({self.hedge_wins} won by the backup)" if self.hedge else ""
+        return "\n".join([f"🛰️  Backends: {self.failovers} failovers{hedging}", *lines])
+
+
+def build_backends(spec: str, registry=None, system_prompt: Optional[str] = None, **session_settings) -> List[Backend]:
+    """
+    Backends from a spec such as "ollama:llama3.2,ollama:llama3.2@http://gpu-box:11434,gemini:gemini-2.5-flash"
+
+    Args:
+        spec: Comma-separated provider:model[@host]
+        registry: ToolRegistry; its tools are given to every backend
+        system_prompt: System prompt for every backend
+        **session_settings: Further OllamaSession arguments (options, keep_alive, client, ...)
+    """
+    backends = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        provider, _, model = item.partition(":")
+        model, _, host = model.partition("@")
+        if provider == "ollama":
+            settings = dict(session_settings)
+            settings.pop('tools', None)  # Every backend gets the registry's tools in its own format
+            if host:
+                import ollama
+                settings['client'] = ollama.Client(host=host)
+            session = OllamaSession(
+                model=model,
+                system_prompt=system_prompt,
+                tools=registry.ollama_tools() if registry else None,
+                **settings
+            )
+            backends.append(OllamaBackend(session, name=f"ollama:{model}@{host}" if host else None))
+        elif provider == "gemini":
+            backends.append(GeminiBackend(
+                model or "gemini-2.5-flash",
+                tools=registry.gemini_tools() if registry else None,
+                system_prompt=system_prompt
+            ))
+        elif provider == "fake":
+            backends.append(FakeBackend(model or "fake"))
+        else:
+            raise ValueError(f"Unknown LLM provider '{provider}' in {BACKENDS_ENV}")
+    return backends
@@ -0,0 +1,115 @@
+# AI_Voice/module/loop_guard.py
+
+import json
+from typing import Dict, Optional, Tuple
+
+
+DEFAULT_MAX_ROUNDS = 8
+DEFAULT_MAX_STALLED_ROUNDS = 1  # Rounds in a row made only of repeated calls before the loop is cut
+READ_ONLY_PREFIXES = ("read_", "get_", "find_", "list_")
+
+
+def call_key(name: str, arguments) -> str:
+    """Canonical (tool, args) key; argument order and JSON-string arguments don't matter"""
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        except json.JSONDecodeError:
+            pass
+    return f"{name}:{json.dumps(arguments or {}, sort_keys=True, default=str)}"
+
+
+def is_read_only(name: str) -> bool:
+    return name.startswith(READ_ONLY_PREFIXES)
+
+
+class LoopGuard:
+    """
+    Stops small models from burning LLM rounds on the same tool calls
+
+    Within one turn, a (tool, args) pair that already ran is answered from its
+    earlier result instead of being executed again. A write invalidates the results
+    of earlier rounds (reads could be stale and other writes could be undone), so
+    only calls that would really do the same thing are deduplicated. A round made
+    only of repeats makes no progress; after max_stalled_rounds of them, or after
+    max_rounds in total, end_round() tells the agent loop to stop.
+    """
+
+    def __init__(self, max_rounds: int = DEFAULT_MAX_ROUNDS, max_stalled_rounds: int = DEFAULT_MAX_STALLED_ROUNDS):
+        self.max_rounds = max_rounds
+        self.max_stalled_rounds = max_stalled_rounds
+        self.results: Dict[str, Tuple[object, int]] = {}  # key -> (result, round it ran in)
+        self.round = 0
+        self.stalled_rounds = 0
+        self.round_executed = 0
+        self.round_repeated = 0
+        self.stop_reason: Optional[str] = None
+        # Totals across turns
+        self.repeats_answered = 0
+        self.loops_cut = 0
+        self.round_limit_hits = 0
+
+    def start_turn(self) -> None:
+        self.results.clear()
+        self.round = 0
+        self.stalled_rounds = 0
+        self.round_executed = 0
+        self.round_repeated = 0
+        self.stop_reason = None
+
+    def lookup(self, name: str, arguments):
+        """
+        Earlier result of the same call in this turn, or None if it has to run
+
+        Every hit is counted as a repeat answered without executing the tool.
+        """
+        entry = self.results.get(call_key(name, arguments))
+        if entry is None:
+            return None
+        self.round_repeated += 1
+        self.repeats_answered += 1
+        return entry[0]
+
+    def record(self, name: str, arguments, result) -> None:
+        """Remember the result of a call that was executed"""
+        key = call_key(name, arguments)
+        if not is_read_only(name):
+            self.results = {k: v for k, v in self.results.items() if v[1] == self.round}
+        self.results[key] = (result, self.round)
+        self.round_executed += 1
+
+    def end_round(self) -> bool:
+        """
+        Close one model round
+
+        Returns:
+            True if the agent loop may ask the model again, False to stop the turn
+        """
+        if self.round_repeated and not self.round_executed:
+            self.stalled_rounds += 1
+        else:
+            self.stalled_rounds = 0
+        self.round += 1
+        self.round_executed = 0
+        self.round_repeated = 0
+
+        if self.stalled_rounds >= self.max_stalled_rounds:
+            self.loops_cut += 1
+            self.stop_reason = "the model kept repeating the same tool calls"
+            return False
+        if self.round >= self.max_rounds:
+            self.round_limit_hits += 1
+            self.stop_reason = f"reached {self.max_rounds} tool rounds"
+            return False
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'repeats_answered': self.repeats_answered,
+            'loops_cut': self.loops_cut,
+            'round_limit_hits': self.round_limit_hits,
+        }
+
+    def report(self) -> str:
+        return (f"🔁 Repeated calls answered from earlier results: {self.repeats_answered} | "
+                f"loops cut: {self.loops_cut} | round limit hit: {self.round_limit_hits}")
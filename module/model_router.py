@@ -0,0 +1,175 @@
+# AI_Voice/module/model_router.py
+
+import re
+import time
+from typing import Dict, Optional
+
+from .intent_parser import COMPOUND
+from .ollama_session import OllamaSession
+from .plan_cache import DOMAIN_RE, IDENT_RE, IP_RE, NUMBER_RE
+from .tool_registry import ToolRegistry, ToolValidationError
+
+
+# Set OLLAMA_SMALL_MODEL (e.g. llama3.2:1b) to route simple requests to a smaller model
+SMALL_MODEL_ENV = "OLLAMA_SMALL_MODEL"
+MAX_SIMPLE_WORDS = 12
+MAX_SIMPLE_ENTITIES = 2
+# "if it exists", "if not exists": conditional work the small model tends to get wrong
+CONDITIONAL = re.compile(r"\b(if (it |not |already )?exists?|unless|otherwise|both|each|every)\b", re.IGNORECASE)
+
+
+def _field(obj, name: str, default=None):
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def count_entities(text: str) -> int:
+    """IPs, domains, numbers and identifiers (API_KEY, PORT) mentioned in the utterance"""
+    count = 0
+    for pattern in (IP_RE, DOMAIN_RE, NUMBER_RE, IDENT_RE):
+        text, found = pattern.subn(" ", text)
+        count += found
+    return count
+
+
+def utterance_features(text: str) -> Dict[str, int]:
+    text = text or ""
+    return {
+        'words': len(text.split()),
+        'entities': count_entities(text),
+        'conjunctions': len(COMPOUND.findall(text)) + len(CONDITIONAL.findall(text)),
+    }
+
+
+class ModelRouter:
+    """
+    Chooses the model per turn: simple utterances go to a small model, the rest to the large one
+
+    An utterance is simple when it is short, names few entities and has no
+    conjunction or condition ("and", "then", "if it exists"). A small-model response
+    whose tool calls fail validation is thrown away and the round is asked again of
+    the large model, which then serves the rest of the turn.
+
+    Without a small session every call goes to the large session.
+    """
+
+    def __init__(
+        self,
+        large: OllamaSession,
+        small: Optional[OllamaSession] = None,
+        registry: Optional[ToolRegistry] = None,
+        max_words: int = MAX_SIMPLE_WORDS,
+        max_entities: int = MAX_SIMPLE_ENTITIES
+    ):
+        self.large = large
+        self.small = small
+        self.registry = registry
+        self.max_words = max_words
+        self.max_entities = max_entities
+        self.current = large
+        self.small_calls = 0
+        self.large_calls = 0
+        self.escalations = 0
+        self._small_ok_time = 0.0  # Seconds spent in small-model calls that were kept
+        self._small_ok_count = 0
+        self._wasted_time = 0.0  # Small-model calls thrown away on escalation
+        self._large_time = 0.0
+
+    def is_simple(self, text: str) -> bool:
+        features = utterance_features(text)
+        return (features['words'] <= self.max_words and
+                features['entities'] <= self.max_entities and
+                features['conjunctions'] == 0)
+
+    def start_turn(self, text: str) -> OllamaSession:
+        """Pick the model for this turn's rounds"""
+        self.current = self.small if self.small and self.is_simple(text) else self.large
+        return self.current
+
+    @property
+    def last_stats(self):
+        return self.current.last_stats
+
+    def _invalid_call(self, response) -> Optional[str]:
+        if self.registry is None:
+            return None
+        for call in _field(_field(response, 'message'), 'tool_calls') or []:
+            function = _field(call, 'function')
+            try:
+                self.registry.validate(_field(function, 'name'), _field(function, 'arguments'))
+            except ToolValidationError as e:
+                return str(e)
+        return None
+
+    def chat(self, messages: list, stream: bool = False, **kwargs):
+        """
+        OllamaSession.chat() on the model chosen for this turn, escalating on invalid tool calls
+
+        Small-model turns are never streamed, so their tool calls can be checked before
+        anything runs: with stream=True the checked (or escalated) response is returned
+        as a one-chunk stream. Streamed large-model calls are not counted in report()
+        or latency_saved().
+        """
+        if self.current is not self.small:
+            return self._timed(self.current, messages, stream, kwargs)
+        response = self._small_chat(messages, kwargs)
+        return iter([response]) if stream else response
+
+    def _small_chat(self, messages: list, kwargs: dict):
+        start = time.perf_counter()
+        compact_failures = self.small.compact_failures
+        try:
+            response = self.small.chat(messages, **kwargs)
+            problem = self._invalid_call(response)
+            if problem is None and self.small.compact_failures != compact_failures:
+                problem = "compact output could not be decoded"
+        except Exception as e:
+            problem = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        self.small_calls += 1
+
+        if problem is None:
+            self._small_ok_time += elapsed
+            self._small_ok_count += 1
+            return response
+
+        print(f"⤴️  Small model failed ({problem}), asking {self.large.model}")
+        self.escalations += 1
+        self._wasted_time += elapsed
+        self.current = self.large
+        return self._timed(self.large, messages, False, kwargs)
+
+    def _timed(self, session: OllamaSession, messages: list, stream: bool, kwargs: dict):
+        if stream:
+            # A stream's duration is not comparable with a whole call, so it is left out
+            # of both the call counts and the times that latency_saved() averages
+            return session.chat(messages, stream=True, **kwargs)
+        start = time.perf_counter()
+        response = session.chat(messages, **kwargs)
+        elapsed = time.perf_counter() - start
+        if session is self.large:
+            self.large_calls += 1
+            self._large_time += elapsed
+        else:
+            self.small_calls += 1
+            self._small_ok_time += elapsed
+            self._small_ok_count += 1
+        return response
+
+    def latency_saved(self) -> Optional[float]:
+        """
+        Estimated seconds saved versus sending every routed call to the large model
+
+        Uses the large model's average call time; None until it has been measured.
+        """
+        if not self.large_calls or not self._large_time:
+            return None
+        large_average = self._large_time / self.large_calls
+        return large_average * self._small_ok_count - self._small_ok_time - self._wasted_time
+
+    def report(self) -> str:
+        saved = self.latency_saved()
+        saved_text = f"~{saved:.1f}s saved" if saved is not None else "saving unknown until the large model has run"
+        return (f"🔀 Router: {self.small_calls} small, {self.large_calls} large, "
+                f"{self.escalations} escalated | {saved_text}")
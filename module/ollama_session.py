@@ -0,0 +1,240 @@
+# AI_Voice/module/ollama_session.py
+
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional
+
+from .compact_calls import compact_instructions, compact_schema, decode_compact
+from .tracing import tracer
+
+
+DEFAULT_KEEP_ALIVE = "30m"
+NS_PER_SECOND = 1_000_000_000
+
+
+def _field(obj, name: str, default=None):
+    """Read a field from a dict response or an ollama response object"""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def preload_model(client, model: str, keep_alive: str = DEFAULT_KEEP_ALIVE, num_ctx: Optional[int] = None):
+    """
+    Load a model into Ollama without generating anything (empty prompt) and keep it resident
+
+    Args:
+        client: ollama.Client
+        model: Model to load
+        keep_alive: How long Ollama keeps the model loaded
+        num_ctx: Context size later chat calls use; a different value reloads the model
+    """
+    return client.generate(
+        model=model,
+        prompt='',
+        keep_alive=keep_alive,
+        options={'num_ctx': num_ctx} if num_ctx else None,
+    )
+
+
+class CallStats:
+    """Token counts and timings Ollama reports for one chat call"""
+
+    def __init__(self, response):
+        self.prompt_eval_count = _field(response, 'prompt_eval_count') or 0
+        self.prompt_eval_duration = (_field(response, 'prompt_eval_duration') or 0) / NS_PER_SECOND
+        self.eval_count = _field(response, 'eval_count') or 0
+        self.eval_duration = (_field(response, 'eval_duration') or 0) / NS_PER_SECOND
+        self.load_duration = (_field(response, 'load_duration') or 0) / NS_PER_SECOND
+        self.total_duration = (_field(response, 'total_duration') or 0) / NS_PER_SECOND
+
+    def report(self) -> str:
+        return (f"prefill {self.prompt_eval_count} tok/{self.prompt_eval_duration:.2f}s, "
+                f"gen {self.eval_count} tok/{self.eval_duration:.2f}s, "
+                f"load {self.load_duration:.2f}s")
+
+
+class OllamaSession:
+    """
+    Chat session that keeps the model resident and the prompt prefix byte-stable
+
+    Every call sends the same system message object, the same tool list and the same
+    context size, so Ollama can reuse the KV cache for the shared prefix and only
+    prefill the new messages. keep_alive stops the model being unloaded between turns.
+
+    With compact_tools, the tools are described in the system prompt instead and the
+    output is constrained by a JSON schema (Ollama's `format`) to a short
+    {"calls": [{tool: {args}}], "reply": ...} object, which is decoded back into
+    message.tool_calls and message.content, so callers see ordinary responses.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        client=None,
+        system_prompt: Optional[str] = None,
+        tools: Optional[List[dict]] = None,
+        options: Optional[dict] = None,
+        keep_alive: str = DEFAULT_KEEP_ALIVE,
+        compact_tools: bool = False,
+        max_reply_chars: Optional[int] = None
+    ):
+        if client is None:
+            import ollama
+            client = ollama.Client()
+        self.client = client
+        self.model = model
+        self.tools = tools
+        self.options = dict(options or {})
+        self.keep_alive = keep_alive
+        self.compact_tools = compact_tools and bool(tools)
+        self.format = None
+        if self.compact_tools:
+            self.format = compact_schema(tools, max_reply_chars)
+            system_prompt = "\n\n".join(p for p in (system_prompt, compact_instructions(tools)) if p)
+        self.system_message = {'role': 'system', 'content': system_prompt} if system_prompt else None
+        self.compact_failures = 0  # Compact outputs that could not be decoded
+        self.prefix_hash = self._hash_prefix()
+        # Running totals rather than every CallStats, so a long-lived session stays small
+        self.totals: Dict[str, float] = dict.fromkeys(
+            ('calls', 'prompt_eval_count', 'prompt_eval_duration', 'load_duration'), 0
+        )
+        self.last_stats: Optional[CallStats] = None
+        self.lock = threading.Lock()
+
+    def _hash_prefix(self) -> str:
+        """Fingerprint of everything that must stay identical for the prefix cache to hit"""
+        prefix = json.dumps(
+            [self.model, self.system_message, self.tools, self.format, self.options.get('num_ctx')],
+            sort_keys=True, separators=(',', ':')
+        )
+        return hashlib.sha256(prefix.encode()).hexdigest()[:12]
+
+    def _messages(self, messages: list) -> list:
+        if self.system_message is None:
+            return list(messages)
+        # Callers may keep their own copy of the system prompt first; never send it twice
+        if messages and _field(messages[0], 'role') == 'system' and \
+                _field(messages[0], 'content') == self.system_message['content']:
+            messages = messages[1:]
+        return [self.system_message, *messages]
+
+    def chat(self, messages: list, stream: bool = False, tools: bool = True, **option_overrides):
+        """
+        Send one chat request with the session's fixed prefix
+
+        Args:
+            messages: Conversation messages after the system prompt
+            stream: Return a generator of chunks instead of one response
+            tools: Send the session's tools (keep True to preserve the prefix); False
+                sends neither tools nor the compact format and returns the reply as is
+            **option_overrides: Per-call options such as num_predict; num_ctx is
+                always the session's value because changing it reloads the model
+
+        Returns:
+            The ollama response (or chunk generator when stream=True)
+        """
+        span = tracer.start_span("llm.chat", model=self.model, stream=stream, messages=len(messages))
+        # Compact output is JSON until the last token, so it is never streamed
+        stream_request = stream and not self.compact_tools
+        try:
+            response = self.client.chat(stream=stream_request, **self._request(messages, tools, option_overrides))
+        except Exception as e:
+            span.end(error=e)
+            raise
+        if stream_request:
+            return self._record_stream(response, span)
+        if tools:
+            response = self._decode(response)
+        self._record(response, span)
+        return iter([response]) if stream else response
+
+    async def achat(self, messages: list, tools: bool = True, **option_overrides):
+        """Same as chat() for an ollama.AsyncClient session (non-streaming)"""
+        span = tracer.start_span("llm.chat", model=self.model, stream=False, messages=len(messages))
+        try:
+            response = await self.client.chat(**self._request(messages, tools, option_overrides))
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        if tools:
+            response = self._decode(response)
+        self._record(response, span)
+        return response
+
+    def preload(self):
+        """Load the session's model with the same num_ctx and keep_alive as its chat calls"""
+        return preload_model(self.client, self.model, self.keep_alive, self.options.get('num_ctx'))
+
+    def _request(self, messages: list, tools: bool, option_overrides: dict) -> dict:
+        options = {**self.options, **option_overrides}
+        if 'num_ctx' in self.options:
+            options['num_ctx'] = self.options['num_ctx']
+        request = {
+            'model': self.model,
+            'messages': self._messages(messages),
+            'tools': self.tools if tools and not self.compact_tools else None,
+            'options': options or None,
+            'keep_alive': self.keep_alive,
+        }
+        if self.format and tools:
+            request['format'] = self.format
+        return request
+
+    def _decode(self, response):
+        """Replace compact JSON content with the reply text and real tool calls"""
+        if not self.compact_tools:
+            return response
+        message = _field(response, 'message')
+        if message is None:
+            return response
+        calls, reply = decode_compact(_field(message, 'content') or '')
+        if calls is None:
+            with self.lock:
+                self.compact_failures += 1
+            return response
+
+        if isinstance(message, dict):
+            message['content'] = reply
+            message['tool_calls'] = [{'function': {'name': n, 'arguments': a}} for n, a in calls] or None
+        else:
+            message.content = reply
+            message.tool_calls = [
+                message.ToolCall(function=message.ToolCall.Function(name=n, arguments=a)) for n, a in calls
+            ] or None
+        return response
+
+    def _record_stream(self, chunks, span):
+        try:
+            for chunk in chunks:
+                if _field(chunk, 'done'):
+                    self._record(chunk, span)
+                yield chunk
+        except Exception as e:
+            span.end(error=e)
+            raise
+
+    def _record(self, response, span) -> None:
+        stats = CallStats(response)
+        with self.lock:
+            self.totals['calls'] += 1
+            self.totals['prompt_eval_count'] += stats.prompt_eval_count
+            self.totals['prompt_eval_duration'] += stats.prompt_eval_duration
+            self.totals['load_duration'] += stats.load_duration
+            self.last_stats = stats
+        message = _field(response, 'message')
+        span.set(
+            prompt_eval_count=stats.prompt_eval_count,
+            prompt_eval_ms=round(stats.prompt_eval_duration * 1000, 1),
+            eval_count=stats.eval_count,
+            eval_ms=round(stats.eval_duration * 1000, 1),
+            load_ms=round(stats.load_duration * 1000, 1),
+            tool_calls=len(_field(message, 'tool_calls') or []) if message is not None else 0,
+        )
+        span.end()
+
+    def summary(self) -> Dict[str, float]:
+        """Totals across every call in this session"""
+        with self.lock:
+            return dict(self.totals)
@@ -0,0 +1,218 @@
+# AI_Voice/module/ollama_stub.py
+
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+
+NS_PER_SECOND = 1_000_000_000
+DEFAULT_REPLY = {'role': 'assistant', 'content': 'Done.'}
+
+
+def tool_call_message(calls, content: str = "") -> dict:
+    """
+    Assistant message that calls tools, in the shape Ollama returns
+
+    Args:
+        calls: [(tool_name, arguments), ...] or [{"name": ..., "arguments": ...}, ...]
+        content: Optional text sent alongside the calls
+    """
+    tool_calls = []
+    for call in calls:
+        name, arguments = (call['name'], call.get('arguments', {})) if isinstance(call, dict) else call
+        tool_calls.append({'function': {'name': name, 'arguments': dict(arguments or {})}})
+    return {'role': 'assistant', 'content': content, 'tool_calls': tool_calls}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        if self.path == "/api/version":
+            self._send_json({'version': 'stub'})
+        elif self.path in ("/api/tags", "/api/ps"):
+            self._send_json({'models': [{'name': stub.model, 'model': stub.model}]})
+        else:
+            self._send_json({'error': f"not found: {self.path}"}, status=404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({'error': 'invalid JSON body'}, status=400)
+            return
+
+        stub = self.server.stub
+        if self.path == "/api/chat":
+            stub._chat(self, request)
+        elif self.path == "/api/generate":
+            # Preload/warm-up requests (empty prompt) just report the model as loaded
+            stub._record_request(self.path, request)
+            time.sleep(stub.latency)
+            self._send_json({**stub._base(request), 'response': '', 'done': True, 'done_reason': 'load'})
+        else:
+            self._send_json({'error': f"not found: {self.path}"}, status=404)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubOllamaServer"
+
+
+class StubOllamaServer:
+    """
+    Local HTTP server that speaks enough of the Ollama API for the agent loops
+
+    Each /api/chat request pops the next scripted assistant message (or replies
+    "Done." when the script is empty) after a configurable delay, so agent code can
+    run unchanged against ollama.Client(host=stub.url) without a GPU or model.
+    """
+
+    def __init__(
+        self,
+        model: str = 'llama3.2',
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.model = model
+        self.latency = latency  # Seconds before the first byte of each reply (prefill)
+        self.token_latency = token_latency  # Seconds per generated token
+        self.host = host
+        self.port = port
+        self.script_queue = deque()
+        self.requests: List[dict] = []
+        self.lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "StubOllamaServer":
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ollama-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def script(self, messages: list, replace: bool = True) -> None:
+        """
+        Queue assistant messages returned by the next chat requests, in order
+
+        Args:
+            messages: Message dicts (see tool_call_message) or plain reply strings
+            replace: Drop whatever is left of the previous script first
+        """
+        with self.lock:
+            if replace:
+                self.script_queue.clear()
+            for message in messages:
+                if isinstance(message, str):
+                    message = {'role': 'assistant', 'content': message}
+                self.script_queue.append(message)
+
+    def request_count(self, path: str = "/api/chat") -> int:
+        with self.lock:
+            return sum(1 for r in self.requests if r['path'] == path)
+
+    def _record_request(self, path: str, request: dict) -> None:
+        with self.lock:
+            self.requests.append({'path': path, 'request': request})
+
+    def _next_message(self) -> dict:
+        with self.lock:
+            return self.script_queue.popleft() if self.script_queue else dict(DEFAULT_REPLY)
+
+    def _base(self, request: dict) -> dict:
+        return {
+            'model': request.get('model') or self.model,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+
+    def _chat(self, handler: _Handler, request: dict) -> None:
+        self._record_request("/api/chat", request)
+        message = self._next_message()
+        prompt_tokens = len(json.dumps(request.get('messages', []))) // 4
+        tokens = (message.get('content') or '').split()
+        eval_count = len(tokens) + 8 * len(message.get('tool_calls') or [])
+
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        prefill = time.perf_counter() - start
+
+        def done_fields():
+            total = time.perf_counter() - start
+            return {
+                'done': True,
+                'done_reason': 'stop',
+                'total_duration': int(total * NS_PER_SECOND),
+                'load_duration': 0,
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': int(prefill * NS_PER_SECOND),
+                'eval_count': eval_count,
+                'eval_duration': int((total - prefill) * NS_PER_SECOND),
+            }
+
+        if not request.get('stream', True):
+            time.sleep(self.token_latency * eval_count)
+            handler._send_json({**self._base(request), 'message': message, **done_fields()})
+            return
+
+        # Streaming: one NDJSON line per token, tool calls in their own chunk, then the stats
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.end_headers()
+
+        def write(payload):
+            handler.wfile.write(json.dumps(payload).encode() + b"\n")
+            handler.wfile.flush()
+
+        for index, token in enumerate(tokens):
+            time.sleep(self.token_latency)
+            text = token if index == 0 else " " + token
+            write({**self._base(request), 'message': {'role': 'assistant', 'content': text}, 'done': False})
+        if message.get('tool_calls'):
+            time.sleep(self.token_latency * 8 * len(message['tool_calls']))
+            write({
+                **self._base(request),
+                'message': {'role': 'assistant', 'content': '', 'tool_calls': message['tool_calls']},
+                'done': False,
+            })
+        write({**self._base(request), 'message': {'role': 'assistant', 'content': ''}, **done_fields()})
@@ -0,0 +1,220 @@
+# AI_Voice/module/plan_cache.py
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_MAX_PLANS = 256
+
+IP_RE = re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}\b")
+DOMAIN_RE = re.compile(r"\b[a-z0-9-]+(?:\.[a-z0-9-]+)+\b", re.IGNORECASE)
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+IDENT_RE = re.compile(r"\b(?:[A-Za-z]+_[A-Za-z0-9_]*|[A-Z][A-Z0-9]{1,})\b")
+SLOT_RE = re.compile(r"\{(s\d+)\}")
+
+# Spoken commands that drop the plan used for the previous turn
+FORGET_COMMANDS = {"forget that", "forget that plan", "forget the last plan", "that was wrong"}
+
+
+def template_utterance(text: str) -> Tuple[str, List[str]]:
+    """
+    Turn an utterance into a cache key with its variable parts pulled out as slots
+
+    IPs, domain labels, numbers and identifiers (API_KEY, PORT) become <s0>, <s1>, ...
+
+    Returns:
+        (template key, slot values in order)
+    """
+    slots: List[str] = []
+
+    def slot(value: str) -> str:
+        slots.append(value)
+        return f"<s{len(slots) - 1}>"
+
+    text = " ".join(text.strip().split()).rstrip(".!?,;")
+    text = IP_RE.sub(lambda m: slot(m.group(0)), text)
+    # Domains become one slot per label so derived parts (zone, record name) can be templated
+    text = DOMAIN_RE.sub(lambda m: ".".join(slot(label.lower()) for label in m.group(0).split(".")), text)
+    text = NUMBER_RE.sub(lambda m: slot(m.group(0)), text)
+    text = IDENT_RE.sub(lambda m: slot(m.group(0)), text)
+    key = re.sub(r"[^\w<>. ]", "", text.lower())
+    return key, slots
+
+
+def _template_value(value, slots: List[str]):
+    """Replace slot values inside one argument with {sN} references"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        for index, slot in enumerate(slots):
+            if slot == str(value):
+                return ("num", f"{{s{index}}}", type(value).__name__)
+        return value
+    if not isinstance(value, str):
+        return value
+
+    # Try the longest slot values first so "1.1.1.1" wins over "1"
+    order = sorted(range(len(slots)), key=lambda i: -len(slots[i]))
+    pattern = re.compile("|".join(
+        rf"(?<![\w]){re.escape(slots[i])}(?![\w])" for i in order
+    ), re.IGNORECASE) if slots else None
+    if pattern is None:
+        return value
+
+    def replace(match):
+        text = match.group(0)
+        index = next(i for i in order if slots[i].lower() == text.lower())
+        return f"{{s{index}}}"
+    return ("str", pattern.sub(replace, value.replace("{", "{{").replace("}", "}}")))
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _grounded(value, template, utterance_words: set) -> bool:
+    """
+    True if an argument is fully determined by the utterance
+
+    Every part of a string or number must be a slot or appear in the utterance, so
+    values the LLM took from the conversation ("delete it" -> FOO) are not replayed.
+    """
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return True
+    if isinstance(template, tuple) and template[0] == "num":
+        return True
+    literal = SLOT_RE.sub(" ", template[1]) if isinstance(template, tuple) else str(template)
+    return _words(literal) <= utterance_words
+
+
+def _fill_value(template, slots: List[str]):
+    if not isinstance(template, tuple):
+        return template
+    if template[0] == "num":
+        raw = slots[int(template[1][2:-1])]
+        return int(raw) if template[2] == "int" else float(raw)
+    filled = SLOT_RE.sub(lambda m: slots[int(m.group(1)[1:])], template[1])
+    return filled.replace("{{", "{").replace("}}", "}")
+
+
+class PlanCache:
+    """
+    LRU cache of LLM tool-call plans keyed on templated utterances
+
+    A plan is stored only after every call in it succeeded, and only when every
+    argument comes from the utterance itself; replaying it fills in the new
+    utterance's slot values and skips inference entirely.
+    """
+
+    def __init__(self, max_plans: int = DEFAULT_MAX_PLANS):
+        self.max_plans = max_plans
+        self.plans: "OrderedDict[str, List[Tuple[str, dict]]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.last_key: Optional[str] = None
+
+    def store(self, utterance: str, tool_calls: List[Tuple[str, dict]]) -> bool:
+        """
+        Remember the tool calls the LLM made for an utterance
+
+        Args:
+            utterance: The user's transcript
+            tool_calls: [(tool_name, arguments), ...] in execution order
+
+        Returns:
+            True if the plan was cached, False if it was empty or used arguments the
+            utterance does not contain (e.g. a pronoun resolved from context)
+        """
+        if not tool_calls:
+            return False
+        key, slots = template_utterance(utterance)
+        utterance_words = _words(utterance)
+        plan = []
+        for name, arguments in tool_calls:
+            templated = {}
+            for arg, value in (arguments or {}).items():
+                templated[arg] = _template_value(value, slots)
+                if not _grounded(value, templated[arg], utterance_words):
+                    return False
+            plan.append((name, templated))
+        with self.lock:
+            self.plans[key] = plan
+            self.plans.move_to_end(key)
+            while len(self.plans) > self.max_plans:
+                self.plans.popitem(last=False)
+        return True
+
+    def lookup(self, utterance: str, record: bool = True) -> Optional[List[Tuple[str, dict]]]:
+        """
+        Find a cached plan and fill in this utterance's slot values
+
+        Args:
+            utterance: The user's transcript
+            record: Count the lookup and mark the plan as the last one replayed
+                (False for a speculative lookup, see record())
+
+        Returns:
+            [(tool_name, arguments), ...] ready to execute, or None on a miss
+        """
+        key, slots = template_utterance(utterance)
+        with self.lock:
+            plan = self.plans.get(key)
+            if record:
+                self._record(key, plan is not None)
+        if plan is None:
+            return None
+        return [
+            (name, {arg: _fill_value(value, slots) for arg, value in arguments.items()})
+            for name, arguments in plan
+        ]
+
+    def record(self, utterance: str, hit: bool) -> None:
+        """Count a speculative lookup that was acted on"""
+        key, _ = template_utterance(utterance)
+        with self.lock:
+            self._record(key, hit and key in self.plans)
+
+    def _record(self, key: str, hit: bool) -> None:
+        if not hit:
+            self.misses += 1
+            return
+        self.plans.move_to_end(key)
+        self.hits += 1
+        self.last_key = key
+
+    def invalidate(self, utterance: str) -> bool:
+        """Drop the plan that an utterance (or any utterance with the same template) maps to"""
+        key, _ = template_utterance(utterance)
+        with self.lock:
+            return self.plans.pop(key, None) is not None
+
+    def invalidate_last(self) -> bool:
+        """Drop the most recently replayed plan (e.g. after the user says it was wrong)"""
+        with self.lock:
+            if self.last_key is None:
+                return False
+            removed = self.plans.pop(self.last_key, None) is not None
+            self.last_key = None
+            return removed
+
+    def clear(self) -> None:
+        with self.lock:
+            self.plans.clear()
+            self.last_key = None
+
+    def __len__(self) -> int:
+        return len(self.plans)
+
+    def is_forget_command(self, utterance: str) -> bool:
+        return " ".join(utterance.lower().split()).rstrip(".!?") in FORGET_COMMANDS
+
+    def stats(self) -> Dict[str, int]:
+        return {"plans": len(self.plans), "hits": self.hits, "misses": self.misses}
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"📦 Plan cache: {self.hits}/{total} replayed ({rate:.0%}), {len(self.plans)} plans"
@@ -0,0 +1,218 @@
+# AI_Voice/module/profiling.py
+
+import argparse
+import atexit
+import cProfile
+import functools
+import io
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+
+# Set VOICE_PROFILE=1 (or run through `python -m module.profiling`) to profile the hot paths.
+# Decorators are resolved at import time, so nothing is wrapped when it is off.
+PROFILE_ENV = "VOICE_PROFILE"
+PROFILE_DIR_ENV = "VOICE_PROFILE_DIR"
+PROFILE_TOP_ENV = "VOICE_PROFILE_TOP"
+PROFILE_ENABLED = os.getenv(PROFILE_ENV, "0") == "1"
+DEFAULT_DIR = "profiles"
+DEFAULT_TOP = 10
+TRACEMALLOC_FRAMES = 5
+
+
+class Profiler:
+    """
+    cProfile + tracemalloc for the functions wrapped with profiled()
+
+    Calls made during one turn are merged into one pstats file
+    (<dir>/turn-0001-<trace>.prof, open it with snakeviz or `python -m pstats`).
+    Next to it, <...>.alloc.txt lists the top-N allocation sites that grew since
+    the previous turn, which is where unbounded state (e.g. conversation history)
+    shows up turn after turn.
+
+    cProfile only sees the thread that enabled it, and Python 3.12 allows one
+    active profiler at a time: a wrapped call that starts while another thread is
+    being profiled runs unprofiled and is counted in `skipped`.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIR, top: int = DEFAULT_TOP, frames: int = TRACEMALLOC_FRAMES):
+        self.directory = directory
+        self.top = top
+        self.turn = 0
+        self.trace_id: Optional[str] = None
+        self.skipped = 0
+        self.files: List[str] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats: Optional[pstats.Stats] = None
+        self._calls: Dict[str, List[float]] = {}  # name -> [count, seconds] this turn
+        os.makedirs(directory, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._snapshot = tracemalloc.take_snapshot()
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        return cls(os.getenv(PROFILE_DIR_ENV, DEFAULT_DIR), int(os.getenv(PROFILE_TOP_ENV, str(DEFAULT_TOP))))
+
+    def call(self, name: str, function, args: tuple, kwargs: dict):
+        """Run function under cProfile unless an outer profiled call already covers it"""
+        local = self._local
+        if getattr(local, 'depth', 0):
+            local.depth += 1
+            try:
+                return function(*args, **kwargs)
+            finally:
+                local.depth -= 1
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Another thread is being profiled
+            self.skipped += 1
+            return function(*args, **kwargs)
+        local.depth = 1
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            local.depth = 0
+            self._add(name, profile, time.perf_counter() - start)
+
+    def _add(self, name: str, profile: cProfile.Profile, elapsed: float) -> None:
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            entry = self._calls.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def new_turn(self, trace_id: Optional[str] = None) -> None:
+        """Write the finished turn's files and start collecting the next one"""
+        self.end_turn()
+        self.turn += 1
+        self.trace_id = trace_id
+
+    def end_turn(self) -> Optional[str]:
+        """
+        Write <turn>.prof and <turn>.alloc.txt for the calls collected so far
+
+        Returns:
+            Path prefix of the written files, or None if nothing was profiled
+        """
+        with self._lock:
+            stats, calls = self._stats, self._calls
+            self._stats, self._calls = None, {}
+        if stats is None:
+            return None
+
+        prefix = os.path.join(self.directory, f"turn-{self.turn:04d}" + (f"-{self.trace_id}" if self.trace_id else ""))
+        stats.dump_stats(f"{prefix}.prof")
+
+        # The profiler's own bookkeeping is not what we are looking for
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        growth = snapshot.compare_to(self._snapshot, "lineno")[:self.top]
+        self._snapshot = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        with open(f"{prefix}.alloc.txt", "w", encoding="utf-8") as f:
+            f.write(f"traced memory: {current / 1024:.1f} KiB (peak {peak / 1024:.1f} KiB)\n")
+            f.write(f"top {self.top} allocation changes since the previous turn:\n")
+            for stat in growth:
+                f.write(f"{stat}\n")
+            f.write("\nprofiled calls:\n")
+            for name, (count, seconds) in calls.items():
+                f.write(f"{name}: {count} call(s), {seconds * 1000:.1f} ms\n")
+            f.write("\n")
+            text = io.StringIO()
+            pstats.Stats(f"{prefix}.prof", stream=text).sort_stats("cumulative").print_stats(self.top)
+            f.write(text.getvalue())
+
+        self.files.append(prefix)
+        grown = sum(stat.size_diff for stat in growth)
+        timing = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, (_, seconds) in calls.items())
+        print(f"🧪 Profile turn {self.turn}: {timing} | top allocations {grown / 1024:+.1f} KiB → {prefix}.prof")
+        return prefix
+
+
+profiler: Optional[Profiler] = None
+if PROFILE_ENABLED:
+    profiler = Profiler.from_env()
+    atexit.register(profiler.end_turn)
+
+
+def profiled(name: str, own_turn: bool = False):
+    """
+    Profile a function when VOICE_PROFILE=1; otherwise return it unchanged (zero overhead)
+
+    Args:
+        name: Shown in the per-turn summary
+        own_turn: Every outermost call is its own turn (for processes without turns,
+            such as the MCP server)
+    """
+    def decorator(function):
+        if profiler is None:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if own_turn and not getattr(profiler._local, 'depth', 0):
+                profiler.new_turn(name)
+                try:
+                    return profiler.call(name, function, args, kwargs)
+                finally:
+                    profiler.end_turn()
+            return profiler.call(name, function, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def profile_turn(trace_id: Optional[str] = None) -> None:
+    """Turn boundary for the profiler; does nothing when profiling is off"""
+    if profiler is not None:
+        profiler.new_turn(trace_id)
+
+
+def child_env() -> Dict[str, str]:
+    """Profiling variables to pass to a child process (e.g. the MCP server)"""
+    return {key: os.environ[key] for key in (PROFILE_ENV, PROFILE_DIR_ENV, PROFILE_TOP_ENV) if key in os.environ}
+
+
+def main(argv=None):
+    """python -m module.profiling [--dir profiles] [--top 10] lamma_in_action | DNS-Server/main.py [args...]"""
+    parser = argparse.ArgumentParser(description="Run the assistant with cProfile and tracemalloc on the hot paths")
+    parser.add_argument("--dir", default=os.getenv(PROFILE_DIR_ENV, DEFAULT_DIR), help="Where .prof files go")
+    parser.add_argument("--top", type=int, default=int(os.getenv(PROFILE_TOP_ENV, str(DEFAULT_TOP))))
+    parser.add_argument("target", help="Module name or path to a .py script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    # Set before the target is imported: profiled() decides when the decorators run
+    os.environ[PROFILE_ENV] = "1"
+    os.environ[PROFILE_DIR_ENV] = os.path.abspath(args.dir)
+    os.environ[PROFILE_TOP_ENV] = str(args.top)
+
+    sys.argv = [args.target, *args.args]
+    if args.target.endswith(".py"):
+        sys.path.insert(0, os.path.dirname(os.path.abspath(args.target)))
+        runpy.run_path(args.target, run_name="__main__")
+    else:
+        sys.path.insert(0, os.getcwd())
+        runpy.run_module(args.target, run_name="__main__", alter_sys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# AI_Voice/module/replay.py
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from .ollama_stub import StubOllamaServer, tool_call_message
+from .tracing import format_summary, summarize, tracer
+
+
+MODEL = 'llama3.2'
+
+
+def _field(message, name: str, default=None):
+    if isinstance(message, dict):
+        return message.get(name, default)
+    return getattr(message, name, default)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, drop punctuation and collapse whitespace for transcript comparison"""
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+
+def normalize_calls(calls) -> list:
+    """Order-independent, type-tolerant form of [(tool_name, arguments), ...]"""
+    return sorted(
+        (name, sorted((key, str(value)) for key, value in (arguments or {}).items()))
+        for name, arguments in calls
+    )
+
+
+def load_session(path: str) -> dict:
+    """
+    Read a recorded session file
+
+    A session is JSON like:
+        {
+          "name": "env basics",
+          "env": {"DEBUG": "false"},
+          "turns": [
+            {
+              "audio": "set_debug.wav",
+              "text": "Set debug to true",
+              "expect": [{"name": "update_env_value", "arguments": {"key": "DEBUG", "value": "true"}}],
+              "llm": [[{"name": "update_env_value", "arguments": {"key": "DEBUG", "value": "true"}}], "Done."]
+            }
+          ]
+        }
+
+    "env" seeds the .env file, "audio" is relative to the session file, "text" is the
+    expected transcript and "llm" scripts the stub's replies for the turn (a list of
+    calls or a reply string per round). Without "llm" the stub calls the expected
+    tools in one round and then replies "Done.".
+    """
+    with open(path, encoding="utf-8") as f:
+        session = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    session.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    for turn in session.get("turns", []):
+        if turn.get("audio"):
+            turn["audio"] = os.path.join(base, turn["audio"])
+        turn["expect"] = [(c["name"], c.get("arguments", {})) for c in turn.get("expect", [])]
+    return session
+
+
+def _scripted_replies(turn: dict) -> list:
+    if "llm" not in turn:
+        return [tool_call_message(turn["expect"]), "Done."] if turn["expect"] else ["OK."]
+    return [tool_call_message(reply) if isinstance(reply, list) else reply for reply in turn["llm"]]
+
+
+class TurnResult:
+    """What happened to one replayed utterance"""
+
+    def __init__(self, session: str, index: int, turn: dict):
+        self.session = session
+        self.index = index
+        self.expected_text = turn.get("text")
+        self.expected_calls = turn["expect"]
+        self.transcript: Optional[str] = None
+        self.calls: list = []
+        self.llm_rounds = 0
+        self.audio_seconds = 0.0
+        self.latency = 0.0
+        self.error: Optional[str] = None
+
+    @property
+    def transcript_ok(self) -> bool:
+        return self.expected_text is None or normalize_text(self.transcript) == normalize_text(self.expected_text)
+
+    @property
+    def calls_ok(self) -> bool:
+        return self.error is None and normalize_calls(self.calls) == normalize_calls(self.expected_calls)
+
+    def to_dict(self) -> dict:
+        return {
+            'session': self.session,
+            'turn': self.index,
+            'transcript': self.transcript,
+            'expected_text': self.expected_text,
+            'transcript_ok': self.transcript_ok,
+            'calls': [[name, args] for name, args in self.calls],
+            'expected_calls': [[name, args] for name, args in self.expected_calls],
+            'calls_ok': self.calls_ok,
+            'llm_rounds': self.llm_rounds,
+            'audio_seconds': round(self.audio_seconds, 3),
+            'latency_s': round(self.latency, 4),
+            'error': self.error,
+        }
+
+
+class ReplayReport:
+    def __init__(self, results: List[TurnResult], spans: List[dict], wall_time: float):
+        self.results = results
+        self.spans = spans
+        self.wall_time = wall_time
+
+    @property
+    def passed(self) -> bool:
+        return all(r.calls_ok for r in self.results)
+
+    def stages(self) -> dict:
+        return summarize(self.spans)
+
+    def to_dict(self) -> dict:
+        return {
+            'turns': len(self.results),
+            'wall_time_s': round(self.wall_time, 3),
+            'stages': self.stages(),
+            'results': [r.to_dict() for r in self.results],
+        }
+
+    def format(self) -> str:
+        total = len(self.results)
+        if not total:
+            return "No turns replayed"
+        calls_ok = sum(r.calls_ok for r in self.results)
+        text_ok = sum(r.transcript_ok for r in self.results)
+        direct = sum(r.llm_rounds == 0 and r.error is None for r in self.results)
+        audio = sum(r.audio_seconds for r in self.results)
+
+        lines = ["=" * 60, "📊 REPLAY RESULTS", "=" * 60]
+        lines.append(f"Turns: {total} in {self.wall_time:.2f}s ({total / self.wall_time:.2f} turns/s)")
+        if audio:
+            lines.append(f"Audio: {audio:.1f}s replayed ({audio / self.wall_time:.2f}x real time)")
+        lines.append(f"Correct tool calls: {calls_ok}/{total} ({calls_ok / total:.0%})")
+        lines.append(f"Exact transcripts: {text_ok}/{total} ({text_ok / total:.0%})")
+        lines.append(f"Answered without the LLM: {direct}/{total}")
+        lines.append("")
+        lines.append(format_summary(self.stages()) if self.spans else "No spans recorded")
+
+        failures = [r for r in self.results if not (r.calls_ok and r.transcript_ok)]
+        if failures:
+            lines.append("")
+            lines.append("❌ Mismatches:")
+            for r in failures:
+                lines.append(f"  {r.session} #{r.index + 1}: \"{r.transcript}\"")
+                if not r.transcript_ok:
+                    lines.append(f"     expected text:  \"{r.expected_text}\"")
+                if not r.calls_ok:
+                    lines.append(f"     expected calls: {r.expected_calls}")
+                    lines.append(f"     got calls:      {r.calls}")
+                if r.error:
+                    lines.append(f"     error: {r.error}")
+        return "\n".join(lines)
+
+
+class ReplayHarness:
+    """
+    Replays recorded sessions through the real agent path without a microphone or Ollama
+
+    Audio files are fed to whisper_transcription() through a FileAudioRecorder, each
+    transcript goes through AsyncVoiceAgent.run_turn() (fast path, plan cache, LLM
+    rounds and tools) and the LLM is a local StubOllamaServer with scripted replies.
+    Tools run against a .env in a temporary directory.
+    """
+
+    def __init__(
+        self,
+        session_paths: List[str],
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+        use_asr: bool = True,
+        model: str = MODEL
+    ):
+        self.sessions = [load_session(path) for path in session_paths]
+        self.latency = latency
+        self.token_latency = token_latency
+        self.use_asr = use_asr
+        self.model = model
+
+    def run(self) -> ReplayReport:
+        spans = []
+        unsubscribe = tracer.subscribe(spans.append)
+        workdir = tempfile.mkdtemp(prefix="ai_voice_replay_")
+        cwd = os.getcwd()
+        # The .env tools resolve the file from the working directory on first use
+        os.chdir(workdir)
+        try:
+            with StubOllamaServer(model=self.model, latency=self.latency, token_latency=self.token_latency) as stub:
+                start = time.perf_counter()
+                results = asyncio.run(self._run_sessions(stub))
+                wall_time = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+            unsubscribe()
+        return ReplayReport(results, spans, wall_time)
+
+    def _seed_env(self, values: dict) -> None:
+        from .env_store import get_env_store
+        with open(".env", "w", encoding="utf-8") as f:
+            for key, value in values.items():
+                f.write(f"{key}={value}\n")
+        get_env_store().refresh()
+
+    async def _run_sessions(self, stub: StubOllamaServer) -> List[TurnResult]:
+        import ollama
+        from .async_agent import AsyncVoiceAgent
+
+        results = []
+        for session in self.sessions:
+            self._seed_env(session.get("env", {}))
+            recorder = None
+            if self.use_asr:
+                from .audio_capture import FileAudioRecorder, set_capture_source
+                recorder = FileAudioRecorder([t["audio"] for t in session["turns"] if t.get("audio")])
+                set_capture_source(recorder)  # whisper_transcription() now reads the session's files
+            agent = AsyncVoiceAgent(
+                capture=recorder.record_audio if recorder else (lambda: None),
+                transcribe=lambda audio: None,  # Turns are transcribed by whisper_transcription below
+                client=ollama.AsyncClient(host=stub.url),
+                model=self.model,
+            )
+            # Summaries would go to the stub and consume its script
+            agent.history.summarizer = None
+            try:
+                for index, turn in enumerate(session["turns"]):
+                    results.append(await self._run_turn(agent, stub, recorder, session["name"], index, turn))
+            finally:
+                if recorder:
+                    set_capture_source(None)
+                await agent.shutdown()
+        return results
+
+    async def _run_turn(self, agent, stub, recorder, session_name: str, index: int, turn: dict) -> TurnResult:
+        result = TurnResult(session_name, index, turn)
+        start = time.perf_counter()
+        try:
+            if recorder and turn.get("audio"):
+                from .audio import whisper_transcription
+                with tracer.span("replay.asr"):
+                    result.transcript = whisper_transcription()
+                result.audio_seconds = recorder.last_duration
+            else:
+                result.transcript = turn.get("text")
+        except SystemExit:
+            result.error = "transcription failed"  # whisper_transcription exits on bad audio
+        except Exception as e:
+            result.error = f"transcription failed: {e}"
+
+        if result.transcript:
+            stub.script(_scripted_replies(turn))
+            rounds_before = stub.request_count()
+            try:
+                with tracer.span("replay.agent_turn"):
+                    await agent.run_turn(result.transcript)
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+            result.llm_rounds = stub.request_count() - rounds_before
+            result.calls = self._executed_calls(agent)
+        elif result.error is None:
+            result.error = "empty transcript"
+
+        result.latency = time.perf_counter() - start
+        return result
+
+    @staticmethod
+    def _executed_calls(agent) -> list:
+        """Tool calls the agent made in its latest turn, read back from its history"""
+        if not agent.history.turns:
+            return []
+        calls = []
+        for message in agent.history.turns[-1]:
+            for call in _field(message, 'tool_calls') or []:
+                function = _field(call, 'function')
+                calls.append((_field(function, 'name'), dict(_field(function, 'arguments') or {})))
+        return calls
+
+
+def main(argv: Optional[List[str]] = None):
+    """python -m module.replay sessions/*.json [--latency 0.3] [--no-asr]"""
+    parser = argparse.ArgumentParser(description="Replay recorded voice sessions against a stub Ollama server")
+    parser.add_argument("sessions", nargs="+", help="Session JSON files")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub delay before each reply, in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Stub delay per generated token, in seconds")
+    parser.add_argument("--no-asr", action="store_true", help="Use each turn's expected text instead of Whisper")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--json", help="Also write the full results to this file")
+    args = parser.parse_args(argv)
+
+    report = ReplayHarness(
+        [os.path.abspath(p) for p in args.sessions],
+        latency=args.latency,
+        token_latency=args.token_latency,
+        use_asr=not args.no_asr,
+        model=args.model,
+    ).run()
+    print(report.format())
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, indent=2, default=str)
+        print(f"\n💾 Results saved to: {args.json}")
+    sys.exit(0 if report.passed else 1)
+
+
+if __name__ == "__main__":
+    main()
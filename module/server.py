@@ -0,0 +1,334 @@
+# AI_Voice/module/server.py
+
+import argparse
+import asyncio
+import base64
+import io
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from .async_agent import MODEL, AsyncVoiceAgent
+from .env_tools import registry
+from .ollama_session import OllamaSession
+from .tracing import in_context
+
+
+DEFAULT_PORT = 8765
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024  # One JSON line; base64 audio of a few minutes fits
+
+# Limits (each can also be set on the command line)
+MAX_SESSIONS = int(os.getenv("VOICE_SERVER_MAX_SESSIONS", "16"))
+MAX_LLM_REQUESTS = int(os.getenv("VOICE_SERVER_MAX_LLM", os.getenv("OLLAMA_NUM_PARALLEL", "2")))
+MAX_TRANSCRIPTIONS = int(os.getenv("VOICE_SERVER_MAX_ASR", "2"))
+MAX_TOOL_WORKERS = int(os.getenv("VOICE_SERVER_MAX_TOOLS", "4"))
+
+
+class FairScheduler:
+    """
+    Admits at most max_concurrent LLM requests, round-robin across sessions
+
+    When all slots are busy, waiting requests are queued per session and each freed
+    slot goes to the next session in turn, so a session running a long tool loop
+    cannot starve the others.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        self.active = 0
+        self.waiting: "OrderedDict[str, deque]" = OrderedDict()  # session -> waiting futures
+        self.granted = 0
+        self.queued = 0
+
+    async def acquire(self, session_id: str) -> None:
+        if self.active < self.max_concurrent and not self.waiting:
+            self.active += 1
+            self.granted += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(session_id, deque()).append(future)
+        self.queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # The slot was granted just before the cancel landed
+            else:
+                self._discard(session_id, future)
+            raise
+
+    def release(self) -> None:
+        self.active -= 1
+        self._grant_next()
+
+    @asynccontextmanager
+    async def slot(self, session_id: str):
+        await self.acquire(session_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self.waiting.values())
+
+    def _grant_next(self) -> None:
+        while self.active < self.max_concurrent and self.waiting:
+            session_id, queue = next(iter(self.waiting.items()))
+            future = queue.popleft()
+            # The served session moves to the back of the rotation
+            del self.waiting[session_id]
+            if queue:
+                self.waiting[session_id] = queue
+            if future.cancelled():
+                continue
+            self.active += 1
+            self.granted += 1
+            future.set_result(None)
+
+    def _discard(self, session_id: str, future) -> None:
+        queue = self.waiting.get(session_id)
+        if queue and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self.waiting[session_id]
+
+
+def decode_audio_payload(payload: str):
+    """Base64 audio file (wav, flac, mp3, ...) -> float32 mono 16 kHz array for Whisper"""
+    from faster_whisper.audio import decode_audio
+    return decode_audio(io.BytesIO(base64.b64decode(payload)), sampling_rate=16000)
+
+
+def turn_result(agent: AsyncVoiceAgent) -> dict:
+    """Reply text and tool calls of the agent's latest turn, read from its history"""
+    def field(message, name):
+        return message.get(name) if isinstance(message, dict) else getattr(message, name, None)
+
+    reply, tool_calls, results = "", [], []
+    for message in agent.history.turns[-1] if agent.history.turns else []:
+        role = field(message, 'role')
+        if role == 'assistant':
+            reply = field(message, 'content') or reply
+            for call in field(message, 'tool_calls') or []:
+                function = field(call, 'function')
+                tool_calls.append({'name': field(function, 'name'), 'arguments': dict(field(function, 'arguments') or {})})
+        elif role == 'tool':
+            results.append(field(message, 'content'))
+    for call, result in zip(tool_calls, results):
+        call['result'] = result
+    return {'reply': reply, 'tool_calls': tool_calls}
+
+
+class VoiceServer:
+    """
+    Serves the assistant to many clients over a local socket
+
+    Protocol: one JSON object per line in each direction. Every connection is one
+    session with its own conversation history and plan cache; the Whisper model,
+    the Ollama client (and its connection pool) and the tool workers are shared.
+    LLM requests are admitted by a FairScheduler, transcriptions by a semaphore.
+
+        -> {"type": "text", "text": "set debug to true"}
+        -> {"type": "audio", "audio": "<base64 wav>"}
+        -> {"type": "reset"} | {"type": "status"}
+        <- {"type": "ready", "session": "s1"}
+        <- {"type": "result", "transcript": ..., "reply": ..., "tool_calls": [...], "latency_ms": ...}
+        <- {"type": "error", "error": ...}
+    """
+
+    def __init__(
+        self,
+        model: str = MODEL,
+        max_sessions: int = MAX_SESSIONS,
+        max_llm_requests: int = MAX_LLM_REQUESTS,
+        max_transcriptions: int = MAX_TRANSCRIPTIONS,
+        max_tool_workers: int = MAX_TOOL_WORKERS,
+        client=None,
+        transcribe=None
+    ):
+        if client is None:
+            import ollama
+            client = ollama.AsyncClient()
+        if transcribe is None:
+            # Single-pass small.en, like AsyncVoiceAgent (WHISPER_TWO_PASS is not used here)
+            from .audio import transcribe_audio
+            transcribe = transcribe_audio
+
+        self.model = model
+        self.max_sessions = max_sessions
+        self.transcribe = transcribe
+        self.session = OllamaSession(model=model, client=client, tools=registry.ollama_tools())
+        self.scheduler = FairScheduler(max_llm_requests)
+        self.asr_limit = asyncio.Semaphore(max_transcriptions)
+        self.asr_executor = ThreadPoolExecutor(max_workers=max_transcriptions, thread_name_prefix="asr")
+        self.tool_executor = ThreadPoolExecutor(max_workers=max_tool_workers, thread_name_prefix="tools")
+        self.agents: Dict[str, AsyncVoiceAgent] = {}
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.turns = 0
+        self.rejected = 0
+
+    def _new_agent(self, session_id: str) -> AsyncVoiceAgent:
+        return AsyncVoiceAgent(
+            capture=lambda: None,  # Audio arrives over the socket
+            transcribe=self.transcribe,
+            session=self.session,
+            scheduler=self.scheduler,
+            name=session_id,
+            tool_executor=self.tool_executor,
+        )
+
+    def status(self) -> dict:
+        return {
+            'sessions': len(self.agents),
+            'max_sessions': self.max_sessions,
+            'llm_active': self.scheduler.active,
+            'llm_waiting': self.scheduler.pending(),
+            'max_llm_requests': self.scheduler.max_concurrent,
+            'turns': self.turns,
+            'rejected': self.rejected,
+            'ollama': self.session.summary(),
+        }
+
+    async def transcribe_payload(self, payload: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        async with self.asr_limit:
+            audio = await loop.run_in_executor(self.asr_executor, in_context(decode_audio_payload, payload))
+            return await loop.run_in_executor(self.asr_executor, in_context(self.transcribe, audio))
+
+    async def handle_request(self, agent: AsyncVoiceAgent, request: dict) -> dict:
+        kind = request.get('type', 'text')
+        if kind == 'status':
+            return {'type': 'status', **self.status()}
+        if kind == 'reset':
+            agent.history.clear()
+            agent.plan_cache.clear()
+            return {'type': 'reset'}
+
+        start = time.perf_counter()
+        if kind == 'audio':
+            text = await self.transcribe_payload(request.get('audio') or '')
+            if not text:
+                return {'type': 'error', 'error': 'No speech detected'}
+        elif kind == 'text':
+            text = (request.get('text') or '').strip()
+            if not text:
+                return {'type': 'error', 'error': 'Empty text'}
+        else:
+            return {'type': 'error', 'error': f"Unknown request type: {kind}"}
+
+        await agent.run_turn(text)
+        self.turns += 1
+        return {
+            'type': 'result',
+            'transcript': text,
+            **turn_result(agent),
+            'latency_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def send(payload: dict):
+            writer.write(json.dumps(payload, default=str).encode() + b"\n")
+            await writer.drain()
+
+        if len(self.agents) >= self.max_sessions:
+            self.rejected += 1
+            await send({'type': 'error', 'error': f"Server full ({self.max_sessions} sessions)"})
+            writer.close()
+            return
+
+        session_id = f"s{next(self._ids)}"
+        agent = self._new_agent(session_id)
+        self.agents[session_id] = agent
+        print(f"🔌 Session {session_id} connected ({len(self.agents)} active)")
+        try:
+            await send({'type': 'ready', 'session': session_id})
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await send({'type': 'error', 'error': f"Message larger than {MAX_MESSAGE_BYTES} bytes"})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    response = await self.handle_request(agent, request)
+                except json.JSONDecodeError:
+                    response = {'type': 'error', 'error': 'Invalid JSON'}
+                except Exception as e:
+                    response = {'type': 'error', 'error': f"{type(e).__name__}: {e}"}
+                await send(response)
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            del self.agents[session_id]
+            await agent.shutdown()
+            writer.close()
+            print(f"🔌 Session {session_id} closed ({len(self.agents)} active)")
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, unix_path: Optional[str] = None):
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self.handle_connection, path=unix_path, limit=MAX_MESSAGE_BYTES)
+            print(f"🟢 Listening on {unix_path}")
+        else:
+            self._server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_MESSAGE_BYTES)
+            port = self._server.sockets[0].getsockname()[1]
+            print(f"🟢 Listening on {host}:{port}")
+        return self._server
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        self.asr_executor.shutdown(wait=False, cancel_futures=True)
+        self.tool_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    """python -m module.server [--port 8765 | --unix /tmp/ai_voice.sock]"""
+    parser = argparse.ArgumentParser(description="Serve the voice assistant to local clients")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--max-llm", type=int, default=MAX_LLM_REQUESTS, help="Concurrent Ollama requests")
+    parser.add_argument("--max-asr", type=int, default=MAX_TRANSCRIPTIONS, help="Concurrent transcriptions")
+    parser.add_argument("--max-tools", type=int, default=MAX_TOOL_WORKERS, help="Tool worker threads")
+    args = parser.parse_args()
+
+    print("🤖 Ollama Assistant Server with .env Tools")
+    print("=" * 50)
+
+    async def run():
+        server = VoiceServer(
+            model=args.model,
+            max_sessions=args.max_sessions,
+            max_llm_requests=args.max_llm,
+            max_transcriptions=args.max_asr,
+            max_tool_workers=args.max_tools,
+        )
+        listener = await server.start(args.host, args.port, args.unix)
+        try:
+            async with listener:
+                await listener.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+
+
+if __name__ == "__main__":
+    main()
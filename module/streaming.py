@@ -0,0 +1,142 @@
+# AI_Voice/module/streaming.py
+
+import time
+from typing import Callable, Optional
+
+
+class StreamTiming:
+    """Per-turn timings for a streamed chat call (seconds from request start)"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_chunk = None  # First chunk of any kind received
+        self.first_output = None  # First content token printed
+        self.first_action = None  # First tool call started
+        self.total = None
+
+    def mark_chunk(self) -> None:
+        if self.first_chunk is None:
+            self.first_chunk = time.perf_counter() - self.start
+
+    def mark_output(self) -> None:
+        if self.first_output is None:
+            self.first_output = time.perf_counter() - self.start
+
+    def mark_action(self) -> None:
+        if self.first_action is None:
+            self.first_action = time.perf_counter() - self.start
+
+    def finish(self) -> None:
+        self.total = time.perf_counter() - self.start
+
+    def report(self) -> str:
+        def fmt(value):
+            return f"{value:.2f}s" if value is not None else "-"
+        chunk = f"first chunk: {fmt(self.first_chunk)} | " if self.first_chunk is not None else ""
+        return (f"⏱️  {chunk}first output: {fmt(self.first_output)} | "
+                f"first action: {fmt(self.first_action)} | total: {fmt(self.total)}")
+
+
+def _field(obj, name: str, default=None):
+    """Read a field from a dict chunk or an ollama response object"""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def stream_chat(
+    chat_fn: Callable,
+    on_tool_call: Optional[Callable] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    timing: Optional[StreamTiming] = None,
+    **chat_kwargs
+):
+    """
+    Run a streaming chat call, handing out tokens and tool calls as they arrive
+
+    Args:
+        chat_fn: ollama.chat or Client.chat
+        on_tool_call: Called with each tool call as soon as it is complete
+        on_token: Called with each content fragment (defaults to printing it)
+        timing: StreamTiming to fill in; a new one is created when None
+        **chat_kwargs: model, messages, tools, options, ... passed to chat_fn
+
+    Returns:
+        (assistant message dict, StreamTiming)
+    """
+    timing = timing or StreamTiming()
+    if on_token is None:
+        def on_token(text):
+            print(text, end='', flush=True)
+
+    content_parts = []
+    tool_calls = []
+
+    for chunk in chat_fn(stream=True, **chat_kwargs):
+        message = _field(chunk, 'message')
+        if message is None:
+            continue
+
+        text = _field(message, 'content')
+        if text:
+            timing.mark_output()
+            content_parts.append(text)
+            on_token(text)
+
+        # Ollama emits each tool call whole inside a single chunk, so it can run right away
+        for call in _field(message, 'tool_calls') or []:
+            tool_calls.append(call)
+            if on_tool_call:
+                timing.mark_action()
+                on_tool_call(call)
+
+    timing.finish()
+    assistant_message = {'role': 'assistant', 'content': "".join(content_parts)}
+    if tool_calls:
+        assistant_message['tool_calls'] = tool_calls
+    return assistant_message, timing
+
+
+def stream_gemini(
+    chat,
+    message,
+    on_token: Optional[Callable[[str], None]] = None,
+    on_function_call: Optional[Callable] = None,
+    timing: Optional[StreamTiming] = None
+):
+    """
+    Send one message with a google-genai chat's send_message_stream()
+
+    Args:
+        chat: genai Chat (or the offline FakeChat)
+        message: User text or a list of function-response parts
+        on_token: Called with each text fragment (defaults to printing it)
+        on_function_call: Called with each function call as soon as its chunk arrives
+        timing: StreamTiming to fill in; a new one is created when None
+
+    Returns:
+        (full text, [function_call, ...], StreamTiming)
+    """
+    timing = timing or StreamTiming()
+    if on_token is None:
+        def on_token(text):
+            print(text, end='', flush=True)
+
+    texts = []
+    calls = []
+    for chunk in chat.send_message_stream(message):
+        timing.mark_chunk()
+        content = chunk.candidates[0].content if chunk.candidates else None
+        for part in (content.parts if content and content.parts else []):
+            if getattr(part, 'function_call', None):
+                calls.append(part.function_call)
+                timing.mark_action()
+                if on_function_call:
+                    on_function_call(part.function_call)
+            elif part.text:
+                timing.mark_output()
+                texts.append(part.text)
+                on_token(part.text)
+
+    timing.finish()
+    return "".join(texts), calls, timing
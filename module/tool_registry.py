@@ -0,0 +1,303 @@
+# AI_Voice/module/tool_registry.py
+
+import inspect
+import json
+import re
+import typing
+from typing import Any, Callable, Dict, List, Optional
+
+from .profiling import profiled
+from .tracing import tracer
+
+
+# Python annotation -> JSON schema type
+JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    dict: "object",
+    list: "array",
+}
+
+
+class ToolValidationError(ValueError):
+    """Raised when a tool is unknown or called with invalid arguments"""
+
+
+def _json_type(annotation) -> str:
+    """Map a parameter annotation (including Optional[X]) to a JSON schema type"""
+    if annotation is inspect.Parameter.empty:
+        return "string"
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    if args:
+        annotation = args[0]
+    return JSON_TYPES.get(typing.get_origin(annotation) or annotation, "string")
+
+
+def _parse_docstring(doc: str):
+    """Split a Google-style docstring into (summary, {arg: description})"""
+    doc = inspect.cleandoc(doc or "")
+    summary_lines, arg_docs = [], {}
+    section = None
+    current = None
+    for line in doc.splitlines():
+        stripped = line.strip()
+        if re.match(r"^(Args|Arguments|Parameters):$", stripped):
+            section = "args"
+            continue
+        if re.match(r"^(Returns|Raises|Examples?[^:]*):$", stripped):
+            section = "other"
+            continue
+        if section == "args":
+            match = re.match(r"^(\w+)\s*(\([^)]*\))?:\s*(.*)$", stripped)
+            if match and line.startswith((" ", "\t")):
+                current = match.group(1)
+                arg_docs[current] = match.group(3)
+            elif current and stripped:
+                arg_docs[current] += " " + stripped
+        elif section is None and stripped:
+            summary_lines.append(stripped)
+    return " ".join(summary_lines), arg_docs
+
+
+class Tool:
+    """One tool: its handler plus a JSON schema computed once at registration"""
+
+    def __init__(self, name: str, description: str, parameters: dict, handler: Callable):
+        self.name = name
+        self.description = description
+        self.parameters = parameters
+        self.handler = handler
+        self.properties = parameters.get("properties", {})
+        self.required = set(parameters.get("required", []))
+
+    @classmethod
+    def from_function(cls, function: Callable, name: Optional[str] = None) -> "Tool":
+        """Build the schema from the signature and Google-style docstring"""
+        summary, arg_docs = _parse_docstring(function.__doc__)
+        properties, required = {}, []
+        for param in inspect.signature(function).parameters.values():
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                continue
+            properties[param.name] = {
+                "type": _json_type(param.annotation),
+                "description": arg_docs.get(param.name, ""),
+            }
+            if param.default is inspect.Parameter.empty:
+                required.append(param.name)
+        parameters = {"type": "object", "properties": properties, "required": required}
+        return cls(name or function.__name__, summary, parameters, function)
+
+    def validate(self, arguments: Optional[dict]) -> dict:
+        """
+        Check arguments against the schema, coercing simple scalar types
+
+        Args:
+            arguments: Arguments from the model (may be None or a JSON string)
+
+        Returns:
+            Arguments ready to pass to the handler
+        """
+        if arguments is None:
+            arguments = {}
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            except json.JSONDecodeError:
+                raise ToolValidationError(f"{self.name}: arguments are not valid JSON")
+        if not isinstance(arguments, dict):
+            raise ToolValidationError(f"{self.name}: arguments must be an object")
+
+        errors = []
+        missing = self.required - arguments.keys()
+        if missing:
+            errors.append(f"missing {', '.join(sorted(missing))}")
+        unknown = arguments.keys() - self.properties.keys()
+        if unknown:
+            errors.append(f"unknown {', '.join(sorted(unknown))}")
+
+        validated = {}
+        for key, value in arguments.items():
+            if key in unknown:
+                continue
+            expected = self.properties[key].get("type")
+            try:
+                validated[key] = _coerce(value, expected)
+            except (TypeError, ValueError):
+                errors.append(f"{key} must be {expected}")
+
+        if errors:
+            raise ToolValidationError(f"{self.name}: " + "; ".join(errors))
+        return validated
+
+    def ollama_schema(self) -> dict:
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters,
+            },
+        }
+
+    def mcp_schema(self) -> dict:
+        return {"name": self.name, "description": self.description, "inputSchema": self.parameters}
+
+
+def _coerce(value, expected: Optional[str]):
+    """Coerce a model-produced value to the schema type (models often send numbers as strings)"""
+    if value is None or expected in (None, "object", "array"):
+        return value
+    if expected == "string":
+        return value if isinstance(value, str) else str(value)
+    if expected == "boolean":
+        if isinstance(value, bool):
+            return value
+        if str(value).strip().lower() in ("true", "1", "yes"):
+            return True
+        if str(value).strip().lower() in ("false", "0", "no"):
+            return False
+        raise ValueError(value)
+    if expected == "integer":
+        if isinstance(value, bool):
+            raise TypeError(value)
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(value)
+        return int(value)
+    if expected == "number":
+        return float(value)
+    return value
+
+
+class ToolRegistry:
+    """
+    Tools shared by every entry point
+
+    Schemas are computed once when a tool is registered and each provider format
+    (Ollama, Gemini, MCP) is built and serialized once, then reused for every call.
+    """
+
+    def __init__(self):
+        self.tools: Dict[str, Tool] = {}
+        self._formats: Dict[str, Any] = {}
+
+    def register(self, function: Callable = None, *, name: Optional[str] = None):
+        """Register a Python function as a tool (usable as a decorator)"""
+        def decorator(fn):
+            self.add(Tool.from_function(fn, name=name))
+            return fn
+        return decorator(function) if function else decorator
+
+    def register_schema(self, name: str, description: str, parameters: dict, handler: Callable) -> None:
+        """Register a tool whose schema is already known (e.g. listed by an MCP server)"""
+        parameters = {
+            "type": "object",
+            "properties": dict(parameters.get("properties", {})),
+            "required": list(parameters.get("required", [])),
+        }
+        self.add(Tool(name, description or "", parameters, handler))
+
+    def register_mcp_tools(self, mcp_tools, call_tool: Callable) -> None:
+        """
+        Register tools listed by an MCP client
+
+        Args:
+            mcp_tools: Result of client.list_tools()
+            call_tool: async function(name, arguments) that runs the tool on the server
+        """
+        for tool in mcp_tools:
+            def handler(_name=tool.name, **arguments):
+                return call_tool(_name, arguments)
+            self.register_schema(tool.name, tool.description, getattr(tool, "inputSchema", None) or {}, handler)
+
+    def add(self, tool: Tool) -> None:
+        self.tools[tool.name] = tool
+        self._formats.clear()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tools
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self.tools.get(name)
+
+    def names(self) -> List[str]:
+        return list(self.tools)
+
+    def _cached(self, key: str, build: Callable):
+        if key not in self._formats:
+            self._formats[key] = build()
+        return self._formats[key]
+
+    def ollama_tools(self) -> List[dict]:
+        """Tool list for ollama.chat(tools=...), built once"""
+        return self._cached("ollama", lambda: [t.ollama_schema() for t in self.tools.values()])
+
+    def ollama_tools_json(self) -> str:
+        """The Ollama tool list serialized once, byte-stable between calls"""
+        return self._cached("ollama_json", lambda: json.dumps(self.ollama_tools(), sort_keys=True, separators=(",", ":")))
+
+    def mcp_tools(self) -> List[dict]:
+        return self._cached("mcp", lambda: [t.mcp_schema() for t in self.tools.values()])
+
+    def gemini_tools(self) -> list:
+        """Tool list for google-genai GenerateContentConfig(tools=...), built once"""
+        def build():
+            from google.genai import types
+            declarations = [
+                types.FunctionDeclaration(
+                    name=t.name,
+                    description=t.description,
+                    parameters_json_schema=t.parameters,
+                )
+                for t in self.tools.values()
+            ]
+            return [types.Tool(function_declarations=declarations)]
+        return self._cached("gemini", build)
+
+    def validate(self, name: str, arguments: Optional[dict]) -> dict:
+        tool = self.tools.get(name)
+        if tool is None:
+            raise ToolValidationError(f"Unknown tool: {name}")
+        return tool.validate(arguments)
+
+    @profiled("tool.dispatch")
+    def dispatch(self, name: str, arguments: Optional[dict] = None):
+        """
+        Validate arguments and call the tool (one dict lookup)
+
+        Returns:
+            Whatever the handler returns (an awaitable for async handlers)
+
+        Raises:
+            ToolValidationError: Unknown tool or invalid arguments
+        """
+        tool = self.tools.get(name)
+        if tool is None:
+            raise ToolValidationError(f"Unknown tool: {name}")
+        arguments = tool.validate(arguments)
+
+        span = tracer.start_span("tool.call", tool=name)
+        try:
+            result = tool.handler(**arguments)
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        if inspect.isawaitable(result):
+            return self._traced_await(result, span)
+        span.end()
+        return result
+
+    @staticmethod
+    async def _traced_await(awaitable, span):
+        """End the tool span when an async handler (e.g. an MCP call) completes"""
+        try:
+            result = await awaitable
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        span.end()
+        return result
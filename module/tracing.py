@@ -0,0 +1,258 @@
+# AI_Voice/module/tracing.py
+
+import contextvars
+import functools
+import glob
+import inspect
+import json
+import logging
+import math
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Callable, Dict, List, Optional
+
+
+# Set VOICE_TRACE=<path> (e.g. traces/spans.jsonl) to record spans
+TRACE_ENV = "VOICE_TRACE"
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+_parent_id = contextvars.ContextVar("parent_span_id", default=None)
+
+
+class Span:
+    """One timed stage; attributes can be added while it is open"""
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start", "wall_start", "attrs")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        # Read-only: a span opened outside any turn is recorded as an orphan (trace_id None)
+        self.trace_id = _trace_id.get()
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = _parent_id.get()
+        self.attrs = attrs
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.wall_start, 6),
+            "duration_ms": round(duration_ms, 3),
+        }
+        if self.attrs:
+            record["attrs"] = self.attrs
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        self.tracer.emit(record)
+
+
+class _NoopSpan:
+    """Returned when tracing is off so call sites never need to check"""
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Writes spans as JSON lines to a size-rotated file"""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = MAX_BYTES, backup_count: int = BACKUP_COUNT):
+        self.path = path
+        self.enabled = bool(path)
+        self._logger = None
+        self._listeners = []
+        if self.enabled:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger = logging.getLogger(f"ai_voice.trace.{id(self)}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            self._logger.addHandler(handler)
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        return cls(os.getenv(TRACE_ENV) or None)
+
+    def new_turn(self) -> str:
+        """Start a new trace; spans opened after this (in this context) belong to it"""
+        trace_id = uuid.uuid4().hex[:16]
+        _trace_id.set(trace_id)
+        _parent_id.set(None)
+        return trace_id
+
+    def start_span(self, name: str, **attrs):
+        """Open a span that is ended explicitly with span.end() (e.g. across a stream)"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attrs)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time the enclosed block; nested spans record this one as their parent"""
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        span = Span(self, name, attrs)
+        token = _parent_id.set(span.span_id)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        else:
+            span.end()
+        finally:
+            _parent_id.reset(token)
+
+    def traced(self, name: str):
+        """Decorator form of span() for sync and async functions"""
+        def decorator(function):
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def subscribe(self, listener: Callable[[dict], None]) -> Callable[[], None]:
+        """
+        Also pass every finished span record to listener (enables tracing without a file)
+
+        Returns:
+            Function that removes the listener again
+        """
+        self._listeners.append(listener)
+        self.enabled = True
+
+        def unsubscribe():
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+            self.enabled = bool(self.path) or bool(self._listeners)
+        return unsubscribe
+
+    def emit(self, record: dict) -> None:
+        if self._logger:
+            self._logger.info(json.dumps(record, default=str, separators=(",", ":")))
+        for listener in list(self._listeners):
+            listener(record)
+
+
+tracer = Tracer.from_env()
+
+
+def in_context(function: Callable, *args) -> Callable[[], object]:
+    """
+    function(*args) bound to a copy of the current context (trace id, parent span)
+
+    Executor and thread workers don't inherit contextvars; pass them this instead of
+    the bare function so their spans stay in the caller's turn.
+    """
+    return functools.partial(contextvars.copy_context().run, function, *args)
+
+
+# Report
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def load_spans(path: str) -> List[dict]:
+    """Read a span file plus its rotated backups (path.1, path.2, ...)"""
+    spans = []
+    backups = [f for f in glob.glob(path + ".*") if f[len(path) + 1:].isdigit()]
+    backups.sort(key=lambda f: -int(f[len(path) + 1:]))  # Oldest first
+    for file in backups + [path]:
+        if not os.path.exists(file):
+            continue
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        spans.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    return spans
+
+
+def summarize(spans: List[dict]) -> Dict[str, dict]:
+    by_name = defaultdict(list)
+    errors = defaultdict(int)
+    for span in spans:
+        by_name[span["name"]].append(span["duration_ms"])
+        if "error" in span:
+            errors[span["name"]] += 1
+    return {
+        name: {
+            "count": len(values),
+            "errors": errors[name],
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "total": sum(values),
+        }
+        for name, values in by_name.items()
+    }
+
+
+def report(path: str) -> str:
+    stats = summarize(load_spans(path))
+    if not stats:
+        return f"No spans found in {path}"
+    return format_summary(stats)
+
+
+def format_summary(stats: Dict[str, dict]) -> str:
+    """Table of per-stage latency percentiles, slowest total first"""
+    lines = [f"{'stage':<28} {'count':>6} {'err':>4} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"]
+    lines.append("-" * len(lines[0]))
+    for name, s in sorted(stats.items(), key=lambda item: -item[1]["total"]):
+        lines.append(f"{name:<28} {s['count']:>6} {s['errors']:>4} {s['p50']:>10.1f} {s['p95']:>10.1f} {s['p99']:>10.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    """python -m module.tracing [spans.jsonl]"""
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else (os.getenv(TRACE_ENV) or "traces/spans.jsonl")
+    print(report(path))
+
+
+if __name__ == "__main__":
+    main()
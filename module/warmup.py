@@ -0,0 +1,129 @@
+# AI_Voice/module/warmup.py
+
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .tracing import tracer
+
+
+# Set VOICE_WARMUP=0 to skip the start-up warm-up (everything then loads on first use)
+WARMUP_ENABLED = os.getenv("VOICE_WARMUP", "1") == "1"
+
+
+class WarmupTask:
+    """One piece of start-up work and how long it took"""
+
+    def __init__(self, name: str, function: Callable, args: tuple, required: bool):
+        self.name = name
+        self.function = function
+        self.args = args
+        self.required = required
+        self.duration: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self.result = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.duration is not None and self.error is None
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        try:
+            with tracer.span(f"warmup.{self.name}"):
+                self.result = self.function(*self.args)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.duration = time.perf_counter() - start
+
+
+class Warmup:
+    """
+    Runs start-up work (imports, model loads, device open) concurrently
+
+    Each task runs in its own thread, so loading Whisper, loading the Ollama model
+    and opening the microphone overlap instead of adding up on the first turn.
+    """
+
+    def __init__(self):
+        self.tasks: List[WarmupTask] = []
+        self.started: Optional[float] = None
+        self.ready_after: Optional[float] = None
+
+    def add(self, name: str, function: Callable, *args, required: bool = False) -> "Warmup":
+        """
+        Add a task
+
+        Args:
+            name: Shown in the report
+            function: Called with *args in a worker thread
+            required: The assistant is not ready if this task fails
+        """
+        self.tasks.append(WarmupTask(name, function, args, required))
+        return self
+
+    def start(self) -> "Warmup":
+        self.started = time.perf_counter()
+        for task in self.tasks:
+            task.thread = threading.Thread(target=task.run, name=f"warmup-{task.name}", daemon=True)
+            task.thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every task finished (or timeout)
+
+        Returns:
+            True when every required task succeeded
+        """
+        if self.started is None:
+            self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for task in self.tasks:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            task.thread.join(remaining)
+        self.ready_after = time.perf_counter() - self.started
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return all(task.ok for task in self.tasks if task.required)
+
+    def task(self, name: str) -> Optional[WarmupTask]:
+        return next((t for t in self.tasks if t.name == name), None)
+
+    def report(self) -> str:
+        lines = []
+        for task in self.tasks:
+            if task.duration is None:
+                lines.append(f"   ⏳ {task.name}: still running")
+            elif task.error:
+                lines.append(f"   ❌ {task.name}: {task.error} [{task.duration:.2f}s]")
+            else:
+                lines.append(f"   ✅ {task.name} [{task.duration:.2f}s]")
+        sequential = sum(t.duration or 0 for t in self.tasks)
+        status = "✅ Ready" if self.ready else "⚠️  Not ready"
+        lines.append(f"{status} in {self.ready_after or 0:.2f}s (one after another: {sequential:.2f}s)")
+        return "\n".join(lines)
+
+    def run(self, timeout: Optional[float] = None) -> bool:
+        """start(), wait() and print the report"""
+        print("🔥 Warming up...")
+        ready = self.start().wait(timeout)
+        print(self.report())
+        return ready
+
+
+# Standard tasks; heavy modules are imported inside the worker thread
+
+def warm_up_whisper(model_size: Optional[str] = None, compute_type: str = "float32") -> None:
+    from .audio import REFINE_MODEL, warm_up_whisper_model
+    warm_up_whisper_model(model_size or REFINE_MODEL, compute_type)
+
+
+def open_microphone() -> str:
+    from .audio_capture import open_input_device
+    return open_input_device()
@@ -0,0 +1,26 @@
+import pytest
+
+from module.env_store import EnvStore
+
+
+@pytest.fixture
+def env_file(tmp_path):
+    path = tmp_path / ".env"
+    path.write_text("FOO=1\nBAR=x\nFOO=2\n")
+    return path
+
+
+def test_set_replaces_every_binding_of_a_duplicated_key(env_file):
+    store = EnvStore(str(env_file))
+    store.set("FOO", "3", export=False)
+
+    assert env_file.read_text() == "BAR=x\nFOO='3'\n"
+    assert store.get("FOO") == "3"
+
+
+def test_unset_removes_every_binding_of_a_duplicated_key(env_file):
+    store = EnvStore(str(env_file))
+    store.unset("FOO", export=False)
+
+    assert env_file.read_text() == "BAR=x\n"
+    assert "FOO" not in store
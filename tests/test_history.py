@@ -0,0 +1,70 @@
+import threading
+import time
+
+from module.history import ConversationHistory
+
+
+def fill(history, turns):
+    for i in range(turns):
+        history.append({'role': 'user', 'content': f"question {i} " + "x" * 100})
+        history.append({'role': 'assistant', 'content': f"answer {i} " + "y" * 100})
+
+
+def test_append_does_not_wait_for_the_summarizer():
+    release = threading.Event()
+
+    def summarizer(transcript):
+        release.wait(5)
+        return "summary"
+
+    history = ConversationHistory(token_budget=50, keep_recent_turns=1, summarizer=summarizer)
+    start = time.perf_counter()
+    fill(history, 4)
+    assert time.perf_counter() - start < 1
+    assert history.summary == ""  # Still running
+
+    release.set()
+    assert history.wait(5)
+    assert history.summary == "summary"
+    assert len(history.turns) == 1
+
+
+def test_failed_summary_drops_old_turns():
+    def summarizer(transcript):
+        raise ConnectionError("ollama is down")
+
+    history = ConversationHistory(token_budget=50, keep_recent_turns=1, summarizer=summarizer)
+    fill(history, 3)
+    assert history.wait(5)
+    assert history.summary == ""
+    assert len(history.turns) == 1
+
+
+def test_summary_of_cleared_history_is_discarded():
+    release = threading.Event()
+    history = ConversationHistory(
+        token_budget=50, keep_recent_turns=1, summarizer=lambda transcript: release.wait(5) and "stale"
+    )
+    fill(history, 3)
+    history.clear()
+    release.set()
+    assert history.wait(5)
+    assert history.summary == ""
+    assert history.turns == []
+
+
+def test_ollama_summarizer_keeps_the_session_settings():
+    from module.history import make_ollama_summarizer
+    from module.ollama_session import OllamaSession
+
+    class Client:
+        def chat(self, **request):
+            self.request = request
+            return {'message': {'role': 'assistant', 'content': " summary "}}
+
+    client = Client()
+    session = OllamaSession(model="m", client=client, options={'num_ctx': 4096}, keep_alive="30m")
+
+    assert make_ollama_summarizer(session)("transcript") == "summary"
+    assert client.request['keep_alive'] == "30m"
+    assert client.request['options']['num_ctx'] == 4096
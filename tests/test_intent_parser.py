@@ -0,0 +1,38 @@
+import pytest
+
+from module import env_store
+from module.env_tools import registry
+from module.intent_parser import IntentParser
+from module.tool_registry import ToolRegistry
+
+
+@pytest.fixture
+def parser(tmp_path, monkeypatch):
+    (tmp_path / ".env").write_text("DEBUG='false'\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(env_store, "_default_store", None)
+    return IntentParser(registry)
+
+
+def test_bare_update_only_matches_an_existing_key(parser):
+    assert parser.parse("set debug to true") == ("update_env_value", {"key": "DEBUG", "value": "true"})
+    assert parser.parse("change the plan to tomorrow") is None
+
+
+def test_explicit_key_form_may_create_a_key(parser):
+    assert parser.parse("set the key api url to http://x") == (
+        "update_env_value", {"key": "API_URL", "value": "http://x"}
+    )
+
+
+def test_add_record_leaves_the_zone_to_the_server():
+    dns = ToolRegistry()
+
+    def add_dns_record(domain: str, name: str, ip: str, ttl: int = 3600) -> dict:
+        """Add a DNS A record"""
+        return {}
+
+    dns.register(add_dns_record)
+    assert IntentParser(dns).parse("add x.example.co.uk to 10.0.0.1") == (
+        "add_dns_record", {"domain": "x.example.co.uk", "name": "@", "ip": "10.0.0.1"}
+    )
@@ -0,0 +1,127 @@
+import time
+
+import pytest
+
+from module.llm_backends import MAX_FAILURES, MIN_HEDGE_SAMPLES, BackendRouter, FakeBackend
+
+
+def measured(backend, seconds, samples=MIN_HEDGE_SAMPLES):
+    for _ in range(samples):
+        backend.latency.record(seconds)
+    return backend
+
+
+def test_unmeasured_backend_ranks_first_then_fastest_median():
+    slow = measured(FakeBackend("slow"), 0.5)
+    fast = measured(FakeBackend("fast"), 0.1)
+    new = FakeBackend("new")
+    router = BackendRouter([slow, fast, new])
+
+    assert [backend.name for backend in router.ranked()] == ["new", "fast", "slow"]
+
+
+def test_chat_goes_to_the_fastest_backend():
+    slow = measured(FakeBackend("slow", replies=["from slow"]), 0.5)
+    fast = measured(FakeBackend("fast", replies=["from fast"]), 0.1)
+    router = BackendRouter([slow, fast])
+
+    assert router.chat([]).message.content == "from fast"
+    assert router.model == "fast"
+    assert slow.requests == 0
+
+
+def test_failover_to_next_backend():
+    down = measured(FakeBackend("down", fail=True), 0.1)
+    up = measured(FakeBackend("up", replies=["ok"]), 0.5)
+    router = BackendRouter([down, up])
+
+    assert router.chat([]).message.content == "ok"
+    assert router.failovers == 1
+    assert down.latency.failures == 1
+
+
+def test_every_backend_failing_raises_the_last_error():
+    router = BackendRouter([FakeBackend("a", fail=True), FakeBackend("b", fail=True)])
+
+    with pytest.raises(ConnectionError, match="is down"):
+        router.chat([])
+
+
+def test_backend_cools_down_after_consecutive_failures():
+    down = measured(FakeBackend("down", fail=True), 0.1)
+    up = measured(FakeBackend("up"), 0.5)
+    router = BackendRouter([down, up])
+
+    for _ in range(MAX_FAILURES):
+        router.chat([])
+    assert not down.latency.healthy
+    assert router.ranked()[-1] is down
+
+    requests = down.requests
+    router.chat([])
+    assert down.requests == requests  # Sits out while cooling down
+
+    down.latency.unhealthy_until = time.monotonic()
+    assert down.latency.healthy
+
+
+def test_hedge_backup_wins_when_primary_is_slow():
+    primary = measured(FakeBackend("primary", latency=0.5, replies=["late"]), 0.05)
+    backup = measured(FakeBackend("backup", replies=["early"]), 0.1)
+    router = BackendRouter([primary, backup], hedge=True)
+
+    assert router.chat([]).message.content == "early"
+    assert router.hedges == 1
+    assert router.hedge_wins == 1
+
+
+def test_hedge_not_sent_when_primary_is_on_time():
+    primary = measured(FakeBackend("primary", replies=["on time"]), 0.5)
+    backup = measured(FakeBackend("backup"), 1.0)
+    router = BackendRouter([primary, backup], hedge=True)
+
+    assert router.chat([]).message.content == "on time"
+    assert router.hedges == 0
+    assert backup.requests == 0
+
+
+def test_primary_failing_before_hedge_deadline_fails_over_to_backup():
+    primary = measured(FakeBackend("primary", fail=True), 0.5)
+    backup = measured(FakeBackend("backup", replies=["ok"]), 1.0)
+    router = BackendRouter([primary, backup], hedge=True)
+
+    assert router.chat([]).message.content == "ok"
+    assert backup.requests == 1
+    assert router.hedges == 0
+
+
+def test_stream_fails_over_before_the_first_chunk():
+    down = FakeBackend("down", fail=True)
+    up = FakeBackend("up", replies=["streamed"])
+    router = BackendRouter([down, up])
+
+    chunks = list(router.chat([], stream=True))
+
+    assert [chunk.message.content for chunk in chunks] == ["streamed"]
+    assert down.latency.failures == 1
+    assert len(up.latency.samples) == 1  # Time to first chunk
+
+
+def test_gemini_groups_function_responses_and_keeps_system_messages():
+    pytest.importorskip("google.genai")
+    from module.llm_backends import GeminiBackend
+
+    backend = GeminiBackend(system_prompt="base", client=object())
+    contents, system = backend._contents([
+        {'role': 'system', 'content': "Summary of earlier turns"},
+        {'role': 'user', 'content': "set both"},
+        {'role': 'assistant', 'content': '', 'tool_calls': [
+            {'function': {'name': 'a', 'arguments': {}}}, {'function': {'name': 'b', 'arguments': {}}}
+        ]},
+        {'role': 'tool', 'content': "ok a"},
+        {'role': 'tool', 'content': "ok b", 'tool_name': 'b'},
+    ])
+
+    assert [content.role for content in contents] == ["user", "model", "user"]
+    assert [part.function_response.name for part in contents[2].parts] == ["a", "b"]
+    assert system == "base\n\nSummary of earlier turns"
@@ -0,0 +1,50 @@
+from module.model_router import ModelRouter
+from module.ollama_session import OllamaSession
+from module.tool_registry import ToolRegistry
+
+
+def reply(content="", tool_calls=None):
+    return {'message': {'role': 'assistant', 'content': content, 'tool_calls': tool_calls}, 'done': True}
+
+
+class Client:
+    def __init__(self, response):
+        self.response = response
+        self.requests = 0
+
+    def chat(self, **request):
+        self.requests += 1
+        return self.response
+
+
+def set_port(port: int) -> str:
+    """Set the port"""
+    return "ok"
+
+
+def router(small_response):
+    registry = ToolRegistry()
+    registry.register(set_port)
+    large = OllamaSession(model="large", client=Client(reply("from large")), tools=registry.ollama_tools())
+    small = OllamaSession(
+        model="small", client=Client(small_response), tools=registry.ollama_tools(), compact_tools=True
+    )
+    return ModelRouter(large=large, small=small, registry=registry)
+
+
+def test_streamed_small_turn_escalates_an_invalid_tool_call():
+    model_router = router(reply('{"calls": [{"set_port": {"port": "not a number"}}]}'))
+    model_router.start_turn("set port")
+
+    chunks = list(model_router.chat([], stream=True))
+
+    assert [chunk['message']['content'] for chunk in chunks] == ["from large"]
+    assert model_router.escalations == 1
+
+
+def test_compact_decode_failure_escalates():
+    model_router = router(reply('{"calls": [{"set_po'))
+    model_router.start_turn("set port")
+
+    assert model_router.chat([])['message']['content'] == "from large"
+    assert model_router.escalations == 1
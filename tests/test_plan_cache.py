@@ -0,0 +1,24 @@
+from module.plan_cache import PlanCache
+
+
+def test_plan_with_slot_arguments_is_replayed_with_new_values():
+    cache = PlanCache()
+    assert cache.store("set port to 8080", [("update_env_value", {"key": "PORT", "value": "8080"})])
+
+    assert cache.lookup("set port to 9090") == [("update_env_value", {"key": "PORT", "value": "9090"})]
+
+
+def test_plan_with_arguments_from_context_is_not_cached():
+    cache = PlanCache()
+
+    assert not cache.store("delete it", [("delete_env_value", {"key": "FOO"})])
+    assert cache.lookup("delete it") is None
+    assert len(cache) == 0
+
+
+def test_spoken_key_names_count_as_grounded():
+    cache = PlanCache()
+
+    assert cache.store("set the api url to localhost", [
+        ("update_env_value", {"key": "API_URL", "value": "localhost"})
+    ])